@@ -1,16 +1,29 @@
 from services.openai_service import run_openai_prompt
-from pathlib import Path
+from services.intent_model import classify_intent
 
-PROMPT_PATH = Path(__file__).parent.parent / "prompts/intent_prompt.txt"
+PROMPT = "prompts/intent_prompt"              # services.prompt_registry
+
+# labels the /message router branches on
+ROUTED_INTENTS = {
+    "Cold",
+    "Interested in Product",
+    "Interested in Services",
+    "Info Request",
+    "Ready to engage",
+}
 
 async def run_intent_agent(user_message: str, history: str) -> str:
-    with open(PROMPT_PATH, "r") as file:
-        prompt_template = file.read()
+    # Local nearest-centroid classifier first; the LLM only when unsure
+    label = await classify_intent(user_message, accept=ROUTED_INTENTS)
+    if label:
+        return label
+    return await classify_with_llm(user_message, history)
+
 
+async def classify_with_llm(user_message: str, history: str) -> str:
     prompt = (
-        f"{prompt_template}\n\n"
         f"User: {user_message}\n"
         f"History: {history}\n→"
     )
-    response = await run_openai_prompt(prompt)
+    response = await run_openai_prompt(prompt, template=PROMPT)
     return response
@@ -1,20 +1,24 @@
 from services.openai_service import run_openai_prompt
-from pathlib import Path
 from services.bot_response_formatter_md import ensure_markdown
+from services.prompt_registry import PROMPTS, DEFAULT_PERSONA
+from services.token_budget import pack
 
-PROMPT_PATH = Path(__file__).parent.parent / "prompts/objection_prompt.txt"
+PROMPT = "prompts/objection_prompt"           # services.prompt_registry
 
 async def run_objection_agent(user_message: str, context: str = "", history: str = "") -> str:
-    with open(PROMPT_PATH, "r") as file:
-        prompt_template = file.read()
-
+    packed = pack(
+        "objection", model="gpt-4o",
+        instructions = PROMPTS.system(PROMPT, DEFAULT_PERSONA),
+        context      = context,
+        history      = history,
+        user         = user_message,
+    )
     prompt = (
-        f"{prompt_template}\n\n"
-        f"User Objection: {user_message}\n\n"
-        f"Context (if needed):\n{context}\n\n"
-        f"Chat History (if needed):\n{history}\n\n"
+        f"User Objection: {packed.user}\n\n"
+        f"Context (if needed):\n{packed.context_text()}\n\n"
+        f"Chat History (if needed):\n{packed.history_text()}\n\n"
         f"Your Response:"
     )
 
-    response = await run_openai_prompt(prompt)
+    response = await run_openai_prompt(prompt, stream=True, template=PROMPT)
     return await ensure_markdown(response)
@@ -1,20 +1,27 @@
+from typing import Any, Dict, List, Union
 from services.openai_service import run_openai_prompt
-from pathlib import Path
 from services.bot_response_formatter_md import ensure_markdown
+from services.prompt_registry import PROMPTS, DEFAULT_PERSONA
+from services.token_budget import pack
 
-PROMPT_PATH = Path(__file__).parent.parent / "prompts/sales_prompt.txt"
-
-async def run_sales_agent(user_message: str, context: str, history: str) -> str:
-    with open(PROMPT_PATH, "r") as file:
-        prompt_template = file.read()
+PROMPT = "prompts/sales_prompt"               # services.prompt_registry
 
+async def run_sales_agent(user_message: str,
+                          context: Union[str, List[Dict[str, Any]]], history: str) -> str:
+    """*context*: Pinecone matches ({"text", "score"}) or pre-joined text."""
+    packed = pack(
+        "sales", model="gpt-4.1",
+        instructions = PROMPTS.system(PROMPT, DEFAULT_PERSONA),
+        context      = context,
+        history      = history,
+        user         = user_message,
+    )
     prompt = (
-        f"{prompt_template}\n\n"
-        f"User message: {user_message}\n\n"
-        f"Context:\n{context}\n\n"
-        f"Chat History:\n{history}\n\n"
+        f"User message: {packed.user}\n\n"
+        f"Context:\n{packed.context_text()}\n\n"
+        f"Chat History:\n{packed.history_text()}\n\n"
         f"Sales Agent:"
     )
 
-    response = await run_openai_prompt(prompt, model="gpt-4.1")
+    response = await run_openai_prompt(prompt, model="gpt-4.1", stream=True, template=PROMPT)
     return await ensure_markdown(response)
\ No newline at end of file
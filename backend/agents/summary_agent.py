@@ -1,45 +1,92 @@
 
-from typing import List
-from openai import OpenAI # or your LLM SDK
+from typing import List, Optional
 import logging
 from services.openai_service import run_openai_prompt
+from services.supabase_service import upsert_conversation_memory
+
+PROMPT = "prompts/summary_prompt"             # services.prompt_registry
+
+# Upper bound on history lines folded in one call – keeps every update O(1)
+# even when catching up on a conversation that predates the rolling summary.
+MAX_FOLD_LINES = 12
+
+
 async def run_summary_agent(history: List[str]) -> str:
     """
     Runs the summary agent to generate a concise summary of the chat history.
-    
+
     Args:
         history (List[str]): The chat history to summarize.
-        
+
     Returns:
         str: The generated summary of the conversation.
     """
     logging.info("Running summary agent on chat history.")
     summary = await summarize_history(history)
     return summary
-async def summarize_history(history: List[str]) -> str:
-    if not history:
-        return ""
 
-    try:
-        # Format history into a chat transcript
-        formatted_history = "\n".join([f"User: {history[i]}" if i % 2 == 0 else f"Bot: {history[i]}" for i in range(len(history))])
-
-        system_prompt = (
-            "You are a concise summarizer for a sales chatbot. "
-            "Write 3–4 sentences covering: "
-            "1) the visitor’s main goals or pains, "
-            "2) any objections raised so far, "
-            "3) their current buying stage (cold / curious / hot)."
-        )
+async def summarize_history(history: List[str]) -> str:
+    return await fold_summary("", history[-MAX_FOLD_LINES:])
 
 
-        prompt = f"{system_prompt}\n\nConversation:\n{formatted_history}\n\n---\nSummary:"
+async def fold_summary(previous: str, new_lines: List[str]) -> str:
+    """
+    Fold *new_lines* ("User: …" / "Bot: …") into an existing summary.
+    Cost depends only on the new lines, never on the conversation length.
+    """
+    if not new_lines:
+        return previous
 
-        summary = await run_openai_prompt(prompt)
+    try:
+        # lines already carry their "User:" / "Bot:" prefix
+        transcript = "\n".join(new_lines)
+        if previous:
+            prompt = (
+                f"Summary so far:\n{previous}\n\n"
+                f"New messages:\n{transcript}\n\n"
+                f"---\nUpdated summary:"
+            )
+        else:
+            prompt = f"Conversation:\n{transcript}\n\n---\nSummary:"
 
-        # logging.info(f"Generated conversation summary: {summary}")
-        return summary
+        return await run_openai_prompt(prompt, template=PROMPT)
 
     except Exception as e:
         logging.exception("Failed to summarize chat history.")
-        return ""
+        return previous
+
+
+async def update_rolling_summary(user_id: str, row: Optional[dict], history: List[str]) -> None:
+    """
+    Background job – folds the turns added since the last update into the
+    `conv_summary` stored on the conversation_memory row and advances the
+    `summary_turns` high-water mark.
+
+    Args:
+        user_id: Visitor/session UUID.
+        row: conversation_memory row as loaded at the start of the turn.
+        history: Full history as persisted for this turn (User:/Bot: strings).
+    """
+    row = row or {}
+    previous = row.get("conv_summary") or ""
+    folded   = int(row.get("summary_turns") or 0)
+
+    if folded > len(history):            # history was reset – start over
+        previous, folded = "", 0
+
+    new_lines = history[folded:][-MAX_FOLD_LINES:]
+    if not new_lines:
+        return
+
+    summary = await fold_summary(previous, new_lines)
+    if summary == previous:
+        return
+
+    try:
+        await upsert_conversation_memory(
+            user_id=user_id,
+            memory={"conv_summary": summary, "summary_turns": len(history)},
+        )
+        logging.info("Rolling summary for %s advanced to %s lines", user_id, len(history))
+    except Exception:
+        logging.exception("Failed to persist rolling summary")
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -14,3 +15,87 @@ MAILERSEND_API_KEY = os.getenv("MAILERSENDAPIKEYIND")
 FROM_NAME = os.getenv("FROMNAMEIND")
 ROLLING_WINDOW_MIN = os.getenv("ROLLINGWINDOWMININD")
 TEAMS_WEBHOOK_URL = os.getenv("TEAMSWEBHOOKURLIND")
+
+# write-behind persistence queue (services/write_behind.py)
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITEBEHINDMAXPENDINGIND", "1000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITEBEHINDBATCHSIZEIND", "25"))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITEBEHINDFLUSHSECONDSIND", "0.25"))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITEBEHINDMAXRETRIESIND", "5"))
+
+# conversation_turns – how many recent turns a chat request reads
+CONVERSATION_TURNS_LIMIT = int(os.getenv("CONVERSATIONTURNSLIMITIND", "20"))
+
+# semantic response cache (services/semantic_cache.py)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTICCACHETHRESHOLDIND", "0.93"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTICCACHETTLSECONDSIND", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTICCACHEMAXENTRIESIND", "2000"))
+# how long a worker trusts the shared knowledge-base version before re-reading it
+SEMANTIC_CACHE_VERSION_SECONDS = float(os.getenv("SEMANTICCACHEVERSIONSECONDSIND", "5"))
+
+# exact-match LLM completion cache (services/completion_cache.py)
+COMPLETION_CACHE_TTL_SECONDS = int(os.getenv("COMPLETIONCACHETTLSECONDSIND", "3600"))
+COMPLETION_CACHE_MAX_ENTRIES = int(os.getenv("COMPLETIONCACHEMAXENTRIESIND", "2048"))
+COMPLETION_CACHE_SQLITE_PATH = os.getenv("COMPLETIONCACHESQLITEPATHIND", "")   # empty → memory only
+
+# local intent classifier (services/intent_model.py)
+INTENT_LOCAL_THRESHOLD = float(os.getenv("INTENTLOCALTHRESHOLDIND", "0.6"))
+
+# skill registry – poll skills/ for changed manifests / handlers / prompts
+SKILL_RELOAD_SECONDS = float(os.getenv("SKILLRELOADSECONDSIND", "2"))   # 0 → no hot reload
+
+# live Conversation cache for the MCP router (services/conversation_cache.py)
+CONVERSATION_CACHE_MAX_ENTRIES = int(os.getenv("CONVERSATIONCACHEMAXENTRIESIND", "1000"))
+CONVERSATION_CACHE_TTL_SECONDS = int(os.getenv("CONVERSATIONCACHETTLSECONDSIND", "1800"))
+# skip the turn_count version probe for entries checked / written this
+# recently – within the window a cache hit reads nothing from Supabase
+# (0 → probe on every hit)
+CONVERSATION_CACHE_REVALIDATE_SECONDS = float(os.getenv("CONVERSATIONCACHEREVALIDATESECONDSIND", "300"))
+
+# end-to-end latency budget for one MCP turn (services/deadline.py); skills,
+# LLM and Pinecone calls get whatever is left, then a partial answer is sent
+MCP_TURN_BUDGET_SECONDS = float(os.getenv("MCPTURNBUDGETSECONDSIND", "25"))
+
+# start an opted-in domain skill on a guessed intent while the classifier
+# is still running (mcp/speculation.py); 0 → always wait for the label
+MCP_SPECULATION = os.getenv("MCPSPECULATIONIND", "1") != "0"
+
+# /mcp/batch and mcp.dispatcher.dispatch_batch – turns in flight at once
+# (turns of one user_id always run in order) and max turns per request
+MCP_BATCH_CONCURRENCY = int(os.getenv("MCPBATCHCONCURRENCYIND", "8"))
+MCP_BATCH_MAX_TURNS = int(os.getenv("MCPBATCHMAXTURNSIND", "5000"))
+
+# LLM gateway (services/llm_gateway.py) – every chat / embedding call
+LLM_MAX_CONNECTIONS = int(os.getenv("LLMMAXCONNECTIONSIND", "64"))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLMREQUESTTIMEOUTSECONDSIND", "60"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLMRETRYMAXSECONDSIND", "30"))
+# per-model limits; models not listed in LLM_MODEL_LIMITS get the defaults, e.g.
+# LLMMODELLIMITSIND='{"gpt-4.1": {"concurrency": 8, "rpm": 500, "tpm": 30000}}'
+LLM_DEFAULT_CONCURRENCY = int(os.getenv("LLMDEFAULTCONCURRENCYIND", "16"))
+LLM_DEFAULT_RPM = int(os.getenv("LLMDEFAULTRPMIND", "500"))
+LLM_DEFAULT_TPM = int(os.getenv("LLMDEFAULTTPMIND", "200000"))
+LLM_MODEL_LIMITS = json.loads(os.getenv("LLMMODELLIMITSIND", "{}"))
+
+# prompt templates (services/prompt_registry.py) are read once; a file edited
+# on disk is picked up on its next use, checked at most this often
+PROMPT_RELOAD_SECONDS = float(os.getenv("PROMPTRELOADSECONDSIND", "2"))
+
+# per-caller prompt token budgets (services/token_budget.py); unlisted
+# sections keep their defaults, e.g.
+# PROMPTTOKENBUDGETSIND='{"sales": {"context": 1200, "history": 400}}'
+PROMPT_TOKEN_BUDGETS = json.loads(os.getenv("PROMPTTOKENBUDGETSIND", "{}"))
+
+# cascade classifiers (services/cascade.py): the in-process lexical tier
+# answers when the nearest seed example is at least this similar (cosine),
+# otherwise the hosted model does; per cascade e.g.
+# CASCADETHRESHOLDSIND='{"objection": 0.6}'
+CASCADE_LOCAL_THRESHOLD = float(os.getenv("CASCADELOCALTHRESHOLDIND", "0.5"))
+CASCADE_THRESHOLDS = json.loads(os.getenv("CASCADETHRESHOLDSIND", "{}"))
+
+# hedged chat requests (services/llm_gateway.py): a call that opts in
+# (hedge=True, or every call with LLMHEDGEIND=1) sends a second identical
+# request once the first has run longer than this percentile of the model's
+# recent latencies; at most LLM_HEDGE_BUDGET extra requests per hedgeable call
+LLM_HEDGE = os.getenv("LLMHEDGEIND", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLMHEDGEPERCENTILEIND", "95"))
+LLM_HEDGE_BUDGET = float(os.getenv("LLMHEDGEBUDGETIND", "0.05"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLMHEDGEMINSAMPLESIND", "20"))
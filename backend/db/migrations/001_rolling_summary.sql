@@ -0,0 +1,7 @@
+-- Rolling conversation summary
+-- Stores the incremental summary maintained by agents/summary_agent.py and
+-- the number of history lines already folded into it (high-water mark).
+
+ALTER TABLE public.conversation_memory
+ADD COLUMN IF NOT EXISTS conv_summary TEXT,
+ADD COLUMN IF NOT EXISTS summary_turns INTEGER DEFAULT 0;
@@ -0,0 +1,18 @@
+-- Conflict targets for single-round-trip upserts (services/supabase_service.py)
+-- conversation_memory: one row per visitor, upserted on user_id.
+-- lead_logs / qualified_leads: `dedup_key` = "<email or user_id>:<window index>";
+-- a repeat inside the same ROLLING_WINDOW_MIN window is ignored by the
+-- database.  Existing rows keep a NULL key (NULLs never conflict).
+
+CREATE UNIQUE INDEX IF NOT EXISTS conversation_memory_user_id_key
+    ON public.conversation_memory (user_id);
+
+ALTER TABLE public.lead_logs
+ADD COLUMN IF NOT EXISTS dedup_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS lead_logs_dedup_key_key
+    ON public.lead_logs (dedup_key);
+
+ALTER TABLE public.qualified_leads
+ADD COLUMN IF NOT EXISTS dedup_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS qualified_leads_dedup_key_key
+    ON public.qualified_leads (dedup_key);
@@ -0,0 +1,41 @@
+-- Append-only conversation transcript
+-- One row per user/bot pair keyed by (user_id, seq); chat requests read the
+-- last CONVERSATION_TURNS_LIMIT rows and append only the new pair.
+-- conversation_memory.turn_count is the next seq to write.
+
+CREATE TABLE IF NOT EXISTS public.conversation_turns (
+    user_id    TEXT        NOT NULL,
+    seq        INTEGER     NOT NULL,
+    user_text  TEXT        NOT NULL DEFAULT '',
+    bot_text   TEXT        NOT NULL DEFAULT '',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, seq)
+);
+
+ALTER TABLE public.conversation_memory
+ADD COLUMN IF NOT EXISTS turn_count INTEGER DEFAULT 0;
+
+-- Backfill from the structured conv_history JSONB ([{"user": …, "bot": …}]).
+-- Rows still holding the old ["User: …", "Bot: …"] string format are
+-- migrated lazily by ConversationSnapshot on the visitor's next message.
+INSERT INTO public.conversation_turns (user_id, seq, user_text, bot_text, created_at)
+SELECT m.user_id,
+       (t.ord - 1)::INTEGER,
+       COALESCE(t.pair->>'user', ''),
+       COALESCE(t.pair->>'bot', ''),
+       COALESCE(m.updated_at, now())
+FROM public.conversation_memory m
+CROSS JOIN LATERAL jsonb_array_elements(m.conv_history) WITH ORDINALITY AS t(pair, ord)
+WHERE jsonb_typeof(m.conv_history) = 'array'
+  AND jsonb_typeof(t.pair) = 'object'
+ON CONFLICT (user_id, seq) DO NOTHING;
+
+UPDATE public.conversation_memory m
+SET turn_count = jsonb_array_length(m.conv_history)
+WHERE jsonb_typeof(m.conv_history) = 'array'
+  AND jsonb_typeof(m.conv_history->0) = 'object'
+  AND COALESCE(m.turn_count, 0) = 0;
+
+-- conv_history is no longer written.  Drop it once every worker runs the
+-- turns-based code:
+--   ALTER TABLE public.conversation_memory DROP COLUMN conv_history;
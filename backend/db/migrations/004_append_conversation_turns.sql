@@ -0,0 +1,70 @@
+-- Atomic turn append
+-- Workers pick a turn's seq from the turn_count they read at the start of
+-- the request, so two concurrent turns of one visitor (second tab, two
+-- workers, a batch) could ask for the same seq.  This function appends
+-- under a per-visitor lock instead:
+--   • a row already stored with the same turn_id (generated by the app for
+--     each new pair) is a retry – its existing seq is returned, nothing is
+--     written.  Equal text is not a duplicate: a visitor may ask the same
+--     question twice and get the same canned reply.
+--   • otherwise it gets GREATEST(requested seq, MAX(seq) + 1)
+--   • conversation_memory.turn_count is raised (never lowered) to seq + 1
+--     in the same transaction
+-- Returns one (user_id, requested_seq, seq) per input row.
+
+ALTER TABLE public.conversation_turns
+ADD COLUMN IF NOT EXISTS turn_id TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS conversation_turns_turn_id_key
+    ON public.conversation_turns (user_id, turn_id);
+
+CREATE OR REPLACE FUNCTION public.append_conversation_turns(p_rows JSONB)
+RETURNS TABLE (user_id TEXT, requested_seq INTEGER, seq INTEGER)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    r         JSONB;
+    v_user    TEXT;
+    v_turn_id TEXT;
+    v_seq     INTEGER;
+    v_stored  INTEGER;
+BEGIN
+    FOR r IN
+        SELECT value FROM jsonb_array_elements(p_rows)
+        ORDER BY value->>'user_id', (value->>'seq')::INTEGER
+    LOOP
+        v_user    := r->>'user_id';
+        v_turn_id := r->>'turn_id';
+        v_seq     := (r->>'seq')::INTEGER;
+        v_stored  := NULL;
+        PERFORM pg_advisory_xact_lock(hashtext('conversation_turns:' || v_user));
+
+        IF v_turn_id IS NOT NULL THEN
+            SELECT t.seq INTO v_stored
+            FROM public.conversation_turns t
+            WHERE t.user_id = v_user
+              AND t.turn_id = v_turn_id;
+        END IF;
+
+        IF v_stored IS NULL THEN
+            SELECT GREATEST(v_seq, COALESCE(MAX(t.seq) + 1, 0)) INTO v_stored
+            FROM public.conversation_turns t
+            WHERE t.user_id = v_user;
+
+            INSERT INTO public.conversation_turns (user_id, seq, turn_id, user_text, bot_text)
+            VALUES (v_user, v_stored, v_turn_id,
+                    COALESCE(r->>'user_text', ''), COALESCE(r->>'bot_text', ''));
+        END IF;
+
+        INSERT INTO public.conversation_memory AS m (user_id, turn_count)
+        VALUES (v_user, v_stored + 1)
+        ON CONFLICT (user_id) DO UPDATE
+            SET turn_count = GREATEST(COALESCE(m.turn_count, 0), EXCLUDED.turn_count);
+
+        user_id       := v_user;
+        requested_seq := v_seq;
+        seq           := v_stored;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$;
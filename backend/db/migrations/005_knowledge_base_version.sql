@@ -0,0 +1,24 @@
+-- Shared knowledge-base version (services/semantic_cache.py)
+-- Each worker keeps its own semantic response cache.  Ingestion bumps this
+-- counter whenever Pinecone chunks are rewritten; the version is part of
+-- every cache key, so all workers stop serving answers built on the old
+-- chunks once they re-read it.
+
+CREATE TABLE IF NOT EXISTS public.knowledge_base_version (
+    id         SMALLINT    PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version    BIGINT      NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO public.knowledge_base_version (id) VALUES (1)
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION public.bump_knowledge_base_version()
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+    UPDATE public.knowledge_base_version
+    SET version = version + 1, updated_at = now()
+    WHERE id = 1
+    RETURNING version;
+$$;
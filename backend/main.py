@@ -10,6 +10,9 @@ from apscheduler.schedulers.background import BackgroundScheduler
 import logging
 from fastapi.responses import Response
 from services.sales_content_check import sales_content_changed
+from services.write_behind import WRITE_BEHIND
+from mcp.registry import REGISTRY
+from services.llm_gateway import GATEWAY
 import uvicorn
 
 logging.basicConfig(level=logging.INFO)
@@ -51,6 +54,11 @@ async def lifespan(app: FastAPI):
 
         loop = asyncio.get_event_loop()
         loop.create_task(refresh_task())
+
+        # Background flusher for conversation memory / lead writes
+        await WRITE_BEHIND.start()
+        # Hot reload of changed skills (manifest / handler / prompts)
+        await REGISTRY.start()
         yield
     except Exception as e:
         logging.error(f"Error during lifespan startup: {e}")
@@ -59,7 +67,10 @@ async def lifespan(app: FastAPI):
         # Cleanup resources in finally block to ensure they run even on errors
         if hasattr(app.state, 'scheduler'):
             app.state.scheduler.shutdown()
-        pass
+        # Drain queued Supabase writes before the worker exits
+        await WRITE_BEHIND.stop()
+        await REGISTRY.stop()
+        await GATEWAY.aclose()
 
 # Create the FastAPI app once
 app = FastAPI(
@@ -10,36 +10,61 @@ and returns its Result.
   * Async / cancellation-safe
   * Robust logging + error handling
   * Graceful fallback when no Skill claims the turn
+  * Honours the per-turn deadline (services.deadline) – a turn that runs
+    out of budget gets the best partial answer instead of an error
 """
 
 from __future__ import annotations
 
 import asyncio
 import logging
+from dataclasses import dataclass, field
 from pathlib  import Path
-from typing   import Optional, List
-
-from mcp.schema       import Conversation, Turn, Result, Skill
-from mcp.skill_loader import SkillLoader
+from time     import perf_counter
+from typing   import (Any, AsyncIterator, Awaitable, Callable, Dict, Iterable,
+                      Optional, List, Sequence, Set, Tuple)
+
+from config.settings  import MCP_BATCH_CONCURRENCY, MCP_TURN_BUDGET_SECONDS
+from mcp.schema       import BOT, Conversation, Turn, Result, Skill
+from mcp.registry     import REGISTRY
+from mcp.triggers     import TriggerIndex
+from mcp.metrics      import METRICS
+from mcp.speculation  import SPECULATOR, Speculation, fork
+from services         import deadline
 
 LOGGER = logging.getLogger("mcp.dispatcher")
 
-# ──────────────────────────────────────────────────────────────────────
-#  Load all skills once at import-time
-# ──────────────────────────────────────────────────────────────────────
-_loader  = SkillLoader(Path(__file__).parent.parent / "skills")
-_SKILLS: List[Skill] = _loader.load_all()    # already ordered by priority
+# Skills come from the shared, hot-reloadable mcp.registry.REGISTRY: each
+# turn routes on the SkillSet that was current when it started.
 
-# Log both name and priority, e.g. "sales(700)"
-LOGGER.info(
-    "Skill order: %s",
-    [f"{s.name}({s.priority})" for s in _SKILLS],
-)
 
+@dataclass(slots=True)
+class _Routing:
+    """Per-turn routing state: trigger hits (one text scan) + skills invoked."""
+    triggers: TriggerIndex
+    hits:     Set[str]
+    invoked:  List[str] = field(default_factory=list)
+    speculation: Optional[Speculation] = None
 
-_FALLBACK: Optional[Skill] = next(                     # optional catch-all
-    (s for s in _SKILLS if s.kind == "fallback"), None
-)
+    def matches(self, skill: Skill, turn: Turn, convo: Conversation) -> bool:
+        try:
+            return self.triggers.matches(skill, turn, convo, self.hits)
+        except Exception as exc:
+            LOGGER.exception("match() failed in %s: %s", skill.name, exc)
+            return False
+
+    def claim(self, skill: Skill, convo: Conversation) -> Optional[Speculation]:
+        """The pending speculation if it ran *skill* on the label convo ended up with."""
+        spec, self.speculation = self.speculation, None
+        if spec is not None and not spec.fits(skill, convo):
+            spec.discard()
+            spec = None
+        return spec
+
+    def discard(self) -> None:
+        if self.speculation is not None:
+            self.speculation.discard()
+            self.speculation = None
 
 
 # ──────────────────────────────────────────────────────────────────────
@@ -48,97 +73,258 @@ _FALLBACK: Optional[Skill] = next(                     # optional catch-all
 
 async def dispatch(turn: Turn, convo: Conversation) -> Result:
     """
-    Route *turn* through one or more skills.
+    Route *turn* through the skills in priority order.
+
+    Consecutive `utility` skills form a *stage*: every one whose match()
+    is True runs concurrently (own timeout each), then their meta is
+    merged into convo.extras in priority order.  A failed / timed-out
+    utility is skipped – the turn carries on without its meta.
+
+    The first matching non-utility skill ends the turn, as does a utility
+    that returns finished / user-visible text.
+
+    The message text is scanned once against every skill's manifest
+    triggers; each skill then only checks its state predicates.
+
+    Every skill invocation (latency, outcome, tokens) and the chain depth
+    of the turn are recorded in mcp.metrics.METRICS.
+
+    Inside a `deadline.turn_budget()` each skill gets min(own timeout,
+    time left); once the budget is spent the remaining stages are skipped
+    and a partial Result (RAG snippet or canned CTA) is returned.
 
-    The loop stops when we get a Result that is either:
-      • finished      == True      OR
-      • text.strip()  != ""        OR
-      • skill.kind    not in {"utility"}
+    While a classifier utility (manifest `speculation: predicts`) is still
+    running, an opted-in domain skill may already be started on a guessed
+    label – see mcp.speculation.
     """
     LOGGER.info("MCP-dispatch turn=%s text=%s", turn.id, turn.text)
+    t0        = perf_counter()
+    skill_set = REGISTRY.current
+    routing   = _Routing(skill_set.triggers, skill_set.triggers.scan(turn.text))
+
+    try:
+        result = await _route(turn, convo, skill_set.skills, skill_set.fallback, routing)
+    finally:
+        routing.discard()                       # speculation nobody claimed
+    METRICS.observe_turn(result.routed_skill, depth=len(routing.invoked),
+                         seconds=perf_counter() - t0)
+    return result
+
+
+async def _route(turn: Turn, convo: Conversation, skills: Sequence[Skill],
+                 fallback: Optional[Skill], routing: _Routing) -> Result:
+    stages = _stages(skills)
+    for pos, stage in enumerate(stages):
+        if deadline.expired():
+            LOGGER.warning("turn %s out of budget before %s", turn.id, stage[0].name)
+            return _partial(turn, convo, cut_at=stage[0].name)
+
+        if stage[0].kind == "utility":
+            later  = [s for st in stages[pos + 1:] for s in st]
+            result = await _run_utility_stage(stage, turn, convo, routing, later)
+            if result is not None:
+                return result
+            continue
 
-    executed: set[str] = set()
-    while True:                                         # chain
-        skill = _select_skill(turn, convo, executed)
-        LOGGER.info("→ routed to skill «%s»", skill.name)
+        skill = stage[0]
+        if routing.matches(skill, turn, convo):
+            LOGGER.info("→ routed to skill «%s»", skill.name)
+            routing.invoked.append(skill.name)
+            return await _run(skill, turn, convo, routing.claim(skill, convo))
 
-        timeout = getattr(skill, "timeout", 20)
+    fallback = fallback or _make_inline_fallback()
+    LOGGER.info("→ routed to skill «%s»", fallback.name)
+    routing.invoked.append(fallback.name)
+    return await _run(fallback, turn, convo, routing.claim(fallback, convo))
 
-        try:
-            result: Result = await asyncio.wait_for(
-                skill.handle(turn, convo), timeout
-            )
-            LOGGER.debug("skill %s returned %s", skill.name, result)
-
-        except asyncio.TimeoutError:
-            LOGGER.error("skill %s timed-out", skill.name)
-            return Result.make_error(
-                turn_id=turn.id,
-                err_msg=f"{skill.name} timed-out — please try again."
-            )
 
-        except Exception as exc:
-            LOGGER.exception("skill %s crashed: %s", skill.name, exc)
-            return Result.make_error(
-                turn_id=turn.id,
-                err_msg="Sorry, I hit an internal error. Please try again."
-            )
+async def _invoke(skill: Skill, turn: Turn, convo: Conversation) -> Result:
+    """
+    skill.handle() under min(its timeout, turn budget left), recorded in
+    METRICS (re-raises).  Outcome "deadline" = the turn budget cut it off.
+    """
+    t0 = perf_counter()
+    outcome, usage = "error", None
+    try:
+        result: Result = await deadline.within(skill.handle(turn, convo),
+                                               getattr(skill, "timeout", 20))
+        outcome, usage = "ok", (result.meta or {}).get("openai_usage")
+        return result
+    except asyncio.TimeoutError:
+        outcome = "deadline" if deadline.expired() else "timeout"
+        raise
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        METRICS.observe_skill(skill.name, perf_counter() - t0, outcome, usage)
+
+
+async def _run(skill: Skill, turn: Turn, convo: Conversation,
+               speculation: Optional[Speculation] = None) -> Result:
+    """
+    Execute one skill (or commit its speculative run); timeouts become a
+    partial Result, crashes an error.
+    """
+    try:
+        if speculation is not None:
+            result = await speculation.commit(convo)
+        else:
+            result = await _invoke(skill, turn, convo)
+        LOGGER.debug("skill %s returned %s", skill.name, result)
+        return result
+
+    except asyncio.TimeoutError:
+        LOGGER.error("skill %s timed-out", skill.name)
+        return _partial(turn, convo, cut_at=skill.name)
+
+    except Exception as exc:
+        LOGGER.exception("skill %s crashed: %s", skill.name, exc)
+        return Result.make_error(
+            turn_id=turn.id,
+            err_msg="Sorry, I hit an internal error. Please try again."
+        )
+
+
+async def _run_utility_stage(
+    stage: List[Skill], turn: Turn, convo: Conversation, routing: _Routing,
+    later: Sequence[Skill] = (),
+) -> Optional[Result]:
+    """
+    Run the matching utilities of *stage* concurrently and merge their
+    meta.  Returns a Result only if one of them wants to end the turn.
+    *later* (the skills after this stage) are the speculation candidates.
+    """
+    active = [s for s in stage if routing.matches(s, turn, convo)]
+    if not active:
+        return None
+    routing.invoked.extend(s.name for s in active)
+
+    t0 = perf_counter()
+    tasks = [asyncio.ensure_future(_invoke(s, turn, convo)) for s in active]
+    predicted = [(s, t) for s, t in zip(active, tasks) if _predicts(s)]
+    if len(predicted) == 1 and later:
+        routing.speculation = _speculate(predicted[0], active, tasks,
+                                         turn, convo, routing, later)
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    LOGGER.info(
+        "utility stage %s finished in %d ms",
+        [s.name for s in active], (perf_counter() - t0) * 1000,
+    )
+
+    final: Optional[Result] = None
+    for skill, outcome in zip(active, outcomes):            # priority order
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, deadline.BudgetExhausted):
+                reason = "deadline"
+            elif isinstance(outcome, asyncio.TimeoutError):
+                reason = "timeout"
+            else:
+                reason = "error"
+            LOGGER.error("utility %s failed (%s): %r – continuing without it",
+                         skill.name, reason, outcome)
+            convo.extras.setdefault("utility_errors", {})[skill.name] = reason
+            continue
 
-        # ── stop-condition ────────────────────────────────────────────
-        if (
-            result.finished
-            or result.text.strip()                       # user-visible text
-            or skill.kind != "utility"                  # non-utility skill
-        ):
-            return result
+        _merge_meta(skill, outcome, convo)
+        if final is None and (outcome.finished or outcome.text.strip()):
+            final = outcome
 
-        # no-op utility → keep chaining
-        executed.add(skill.name)
-        LOGGER.info("Skill %s produced no user text – continuing chain", skill.name)
+    for skill, _ in predicted:
+        SPECULATOR.remember(convo.user_id, _predicts(skill), convo.extras.get(_predicts(skill)))
+    return final
 
-# async def dispatch(turn: Turn, convo: Conversation) -> Result:
-#     """Route *turn* to the first Skill whose `match()` returns True."""
-#     LOGGER.info("MCP-dispatch turn=%s  text=%s meta=%s", turn.id, turn.text, turn.meta)
 
-#     skill = _select_skill(turn, convo)
-#     LOGGER.info("→ routed to skill «%s»", skill.name)
+def _predicts(skill: Skill) -> Optional[str]:
+    """extras key a utility produces that later skills may be started on."""
+    return (skill.metadata.get("speculation") or {}).get("predicts")
 
-#     timeout = getattr(skill, "timeout", 20)  # seconds  (optional in manifest)
 
-#     try:
-#         result: Result = await asyncio.wait_for(skill.handle(turn, convo), timeout)
-#         LOGGER.info("skill %s completed in %s ms", skill.name, result.latency_ms)
-#         return result
+def _speculate(
+    predicted: tuple, active: List[Skill], tasks: List[asyncio.Future],
+    turn: Turn, convo: Conversation, routing: _Routing, later: Sequence[Skill],
+) -> Optional[Speculation]:
+    """
+    Start, alongside the stage, the skill the guessed label would route
+    to.  It runs once the other utilities (its inputs) are done – not
+    after the classifier – and gives up if the label is already known
+    and differs from the guess.
+    """
+    classifier, task = predicted
+    key      = _predicts(classifier)
+    siblings = [(s, t) for s, t in zip(active, tasks) if t is not task]
+
+    async def _prepare(probe: Conversation) -> None:
+        if siblings:
+            await asyncio.wait([t for _, t in siblings])
+        for skill, other in siblings:
+            if not other.cancelled() and other.exception() is None:
+                _merge_meta(skill, other.result(), probe)
+        if task.done() and not task.cancelled() and task.exception() is None:
+            if (task.result().meta or {}).get(key) != probe.extras.get(key):
+                raise asyncio.CancelledError      # guessed wrong – don't spend tokens
+
+    return SPECULATOR.start(
+        key, turn, fork(convo), later, routing.matches,
+        lambda skill, spec_convo: _invoke(skill, turn, spec_convo),
+        _prepare,
+    )
+
 
-#     except asyncio.TimeoutError:
-#         LOGGER.error("skill %s timed-out after %s s", skill.name, timeout)
-#         return Result.make_error(turn.id, f"Skill {skill.name} timed-out — please try again.")
+def _merge_meta(skill: Skill, result: Result, convo: Conversation) -> None:
+    """Copy a utility's meta into convo.extras (usage is kept per skill)."""
+    for key, value in (result.meta or {}).items():
+        if key == "openai_usage":
+            convo.extras.setdefault("openai_usage", {})[skill.name] = value
+        else:
+            convo.extras[key] = value
 
-#     except Exception as exc:                 # pylint: disable=broad-except
-#         LOGGER.exception("skill %s crashed: %s", skill.name, exc)
-#         return Result.make_error(turn.id, "Sorry, I hit an internal error. Please try again.")
+
+def _stages(skills: Sequence[Skill]) -> List[List[Skill]]:
+    """Group consecutive utility skills; every other skill is its own stage."""
+    stages: List[List[Skill]] = []
+    for skill in skills:
+        if skill.kind == "utility" and stages and stages[-1][0].kind == "utility":
+            stages[-1].append(skill)
+        else:
+            stages.append([skill])
+    return stages
 
 
 # ──────────────────────────────────────────────────────────────────────
 #  Internal helpers
 # ──────────────────────────────────────────────────────────────────────
-def _select_skill(
-    turn: Turn, convo: Conversation, skip: set[str]
-) -> Skill:
+_PARTIAL_SNIPPET_CHARS = 400
+_PARTIAL_CTA = (
+    "Sorry, that's taking longer than it should. Our team can walk you "
+    "through it directly – would you like to book a demo or contact us?"
+)
+
+
+def _partial(turn: Turn, convo: Conversation, *, cut_at: str) -> Result:
     """
-    First skill whose match() returns True **and** is not in *skip*.
-    Falls back to inline-fallback.
+    Best answer available when the turn ran out of time: a snippet of the
+    retrieved context if the RAG utility got that far, else a canned CTA.
     """
-    for skill in _SKILLS:
-        if skill.name in skip:
-            continue
-        try:
-            if skill.match(turn, convo):
-                return skill
-        except Exception as exc:
-            LOGGER.exception("match() failed in %s: %s", skill.name, exc)
-
-    return _FALLBACK if _FALLBACK else _make_inline_fallback()
+    chunks  = convo.extras.get("rag_chunks") or []
+    snippet = str(chunks[0]).strip() if chunks else ""
+    if snippet:
+        kind = "rag"
+        if len(snippet) > _PARTIAL_SNIPPET_CHARS:
+            snippet = snippet[:_PARTIAL_SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+        text = f"Here's what I found so far:\n\n{snippet}"
+    else:
+        kind, text = "cta", _PARTIAL_CTA
+
+    METRICS.observe_partial(kind, cut_at)
+    return Result(
+        turn_id      = turn.id,
+        text         = text,
+        routed_skill = "partial",
+        finished     = False,
+        suggested    = ["Book a demo", "Contact us"],
+        meta         = {"partial": kind, "cut_at": cut_at},
+    )
 
 
 def _make_inline_fallback() -> Skill:
@@ -162,6 +348,143 @@ def _make_inline_fallback() -> Skill:
         priority = 99_999
     )
 
+# ──────────────────────────────────────────────────────────────────────
+#  Batch API – many (user_id, text) turns
+# ──────────────────────────────────────────────────────────────────────
+TurnRunner = Callable[[str, str], Awaitable[Any]]
+
+
+@dataclass(slots=True)
+class BatchOutcome:
+    index:      int                     # position in the submitted turns
+    user_id:    str
+    response:   Any = None              # whatever the runner returned
+    error:      Optional[str] = None
+    latency_ms: int = 0
+
+
+class Batch:
+    """
+    Runs many (user_id, text) turns with at most *concurrency* in flight.
+    Turns of one user_id run one after another in submission order;
+    different conversations interleave.
+
+        batch = dispatch_batch([("u1", "hi"), ("u1", "pricing?"), ("u2", "demo")])
+        async for outcome in batch:          # completion order
+            ...
+        batch.report()                       # turns/s, p50/p95 latency, errors
+
+    The default runner dispatches on an in-memory Conversation per user_id
+    and persists nothing; /mcp/batch passes one that goes through the
+    full chat pipeline (conversation cache, Supabase write-behind).
+    """
+
+    def __init__(self, turns: Iterable[Tuple[str, str]], *,
+                 concurrency: int = MCP_BATCH_CONCURRENCY,
+                 run: Optional[TurnRunner] = None):
+        self.concurrency = max(1, concurrency)
+        self._run = run or _InMemoryRunner()
+        self._lanes: Dict[str, List[Tuple[int, str]]] = {}
+        for index, (user_id, text) in enumerate(turns):
+            self._lanes.setdefault(user_id, []).append((index, text))
+        self._total = sum(len(lane) for lane in self._lanes.values())
+        self._latencies: List[int] = []
+        self._errors  = 0
+        self._started:  Optional[float] = None
+        self._finished: Optional[float] = None
+
+    async def __aiter__(self) -> AsyncIterator[BatchOutcome]:
+        self._started = perf_counter()
+        queue: asyncio.Queue[Optional[BatchOutcome]] = asyncio.Queue()
+        lanes = iter(self._lanes.items())           # shared: each worker takes the next lane
+
+        async def _worker() -> None:
+            for user_id, items in lanes:
+                for index, text in items:
+                    queue.put_nowait(await self._one(index, user_id, text))
+
+        workers = [asyncio.create_task(_worker())
+                   for _ in range(min(self.concurrency, len(self._lanes)))]
+        def _closed(fut: asyncio.Future) -> None:
+            if not fut.cancelled():
+                fut.exception()                     # workers only end by cancellation
+            queue.put_nowait(None)
+
+        asyncio.gather(*workers).add_done_callback(_closed)
+        try:
+            while (outcome := await queue.get()) is not None:
+                yield outcome
+        finally:
+            for worker in workers:                  # consumer went away
+                worker.cancel()
+            self._finished = perf_counter()
+
+    async def _one(self, index: int, user_id: str, text: str) -> BatchOutcome:
+        outcome = BatchOutcome(index, user_id)
+        t0 = perf_counter()
+        try:
+            outcome.response = await self._run(user_id, text)
+            if isinstance(outcome.response, Result) and outcome.response.error:
+                outcome.error = outcome.response.error
+        except Exception as exc:
+            LOGGER.exception("batch turn %s (%s) failed: %s", index, user_id, exc)
+            outcome.error = str(getattr(exc, "detail", "") or exc) or type(exc).__name__
+        outcome.latency_ms = int((perf_counter() - t0) * 1_000)
+        self._latencies.append(outcome.latency_ms)
+        self._errors += outcome.error is not None
+        return outcome
+
+    def report(self) -> Dict[str, Any]:
+        end     = self._finished or perf_counter()
+        elapsed = end - self._started if self._started else 0.0
+        done    = len(self._latencies)
+        ordered = sorted(self._latencies)
+        return {
+            "turns":            self._total,
+            "completed":        done,
+            "errors":           self._errors,
+            "conversations":    len(self._lanes),
+            "concurrency":      self.concurrency,
+            "seconds":          round(elapsed, 3),
+            "turns_per_second": round(done / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": _percentile(ordered, 0.50),
+                "p95": _percentile(ordered, 0.95),
+                "max": ordered[-1] if ordered else 0,
+            },
+        }
+
+
+def dispatch_batch(turns: Iterable[Tuple[str, str]], *,
+                   concurrency: int = MCP_BATCH_CONCURRENCY,
+                   run: Optional[TurnRunner] = None) -> Batch:
+    """Batch of (user_id, text) turns – iterate it for results, then report()."""
+    return Batch(turns, concurrency=concurrency, run=run)
+
+
+class _InMemoryRunner:
+    """One Conversation per user_id for the life of the batch; nothing persisted."""
+
+    def __init__(self) -> None:
+        self._convos: Dict[str, Conversation] = {}
+
+    async def __call__(self, user_id: str, text: str) -> Result:
+        # fresh memory each turn, like the router's conversation cache
+        convo = self._convos.get(user_id, Conversation(user_id)).copy()
+        turn  = Turn(id=convo.next_turn_id, text=text)
+        convo.add_turn(turn)
+        with deadline.turn_budget(MCP_TURN_BUDGET_SECONDS):
+            result = await dispatch(turn, convo)
+        if result.text and not result.error:
+            convo.add_turn(Turn(id=turn.id + 1, text=result.text, role=BOT))
+        self._convos[user_id] = convo
+        return result
+
+
+def _percentile(ordered: List[int], q: float) -> int:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0
+
+
 # ──────────────────────────────────────────────────────────────────────
 #  Class façade for routers / tests that want their own instance
 # ──────────────────────────────────────────────────────────────────────
@@ -175,7 +498,12 @@ class Dispatcher:
     (useful in tests) while still re-using the global routing logic.
     """
     def __init__(self, skills: Optional[List[Skill]] | None = None) -> None:
-        self.skills: List[Skill] = skills or _SKILLS            # fall back to global list
+        self._skills = skills
+
+    @property
+    def skills(self) -> List[Skill]:
+        # fall back to the live (hot-reloaded) global set
+        return self._skills or list(REGISTRY.current.skills)
 
     # keep parity with old call-site
     @staticmethod
@@ -186,4 +514,9 @@ class Dispatcher:
     async def dispatch(self, turn: Turn, convo: Conversation) -> Result:
         return await dispatch(turn, convo)
 
+    def dispatch_batch(self, turns: Iterable[Tuple[str, str]], *,
+                       concurrency: int = MCP_BATCH_CONCURRENCY,
+                       run: Optional[TurnRunner] = None) -> Batch:
+        return dispatch_batch(turns, concurrency=concurrency, run=run)
+
 
@@ -0,0 +1,205 @@
+# mcp/metrics.py
+"""
+Per-skill runtime metrics
+-------------------------
+
+The dispatcher records every skill invocation here: latency, outcome
+(ok / timeout / deadline / cancelled / error) and the token usage a skill
+returns in `Result.meta["openai_usage"]`, plus how many skills ran per
+turn (chain depth), end-to-end turn latency, turns that ran out of budget
+and got a partial answer, and how speculative skill runs fared
+(mcp.speculation).  `render()` produces the Prometheus text exposition
+format served at GET /v1/routes/mcp/metrics.
+
+    METRICS.observe_skill("sales", 1.42, "ok", usage)
+    METRICS.observe_turn("sales", depth=4, seconds=3.1)
+    METRICS.observe_partial("rag", cut_at="sales")
+    METRICS.observe_speculation("sales", "miss", usage)
+
+Counts are per worker process, like the other /mcp stats endpoints.
+"""
+
+from __future__ import annotations
+
+import bisect
+from collections import defaultdict
+from typing      import Any, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0,
+)
+DEPTH_BUCKETS: Tuple[float, ...] = (1, 2, 3, 4, 5, 6, 8)
+
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens")
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * len(self.bounds)       # non-cumulative, one per bound
+        self.total  = 0.0
+        self.count  = 0
+
+    def observe(self, value: float) -> None:
+        pos = bisect.bisect_left(self.bounds, value)
+        if pos < len(self.counts):
+            self.counts[pos] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        sep = "," if labels else ""
+        out, running = [], 0
+        for bound, n in zip(self.bounds, self.counts):
+            running += n
+            out.append(f'{name}_bucket{{{labels}{sep}le="{_num(bound)}"}} {running}')
+        out.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        out.append(f"{name}_sum{suffix} {_num(self.total)}")
+        out.append(f"{name}_count{suffix} {self.count}")
+        return out
+
+
+class SkillMetrics:
+    def __init__(self) -> None:
+        self._latency: Dict[str, _Histogram] = {}
+        self._outcomes: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._tokens:   Dict[Tuple[str, str], int] = defaultdict(int)
+        self._cached:   Dict[str, int] = defaultdict(int)
+        self._routed:   Dict[str, int] = defaultdict(int)
+        self._depth     = _Histogram(DEPTH_BUCKETS)
+        self._turn_latency = _Histogram(LATENCY_BUCKETS)
+        self._partials: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._speculations: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._wasted:       Dict[Tuple[str, str], int] = defaultdict(int)
+
+    # ------------------------------------------------------------------ #
+    #  Recording (called by mcp.dispatcher)
+    # ------------------------------------------------------------------ #
+    def observe_skill(self, skill: str, seconds: float, outcome: str,
+                      usage: Optional[Dict[str, Any]] = None) -> None:
+        hist = self._latency.get(skill)
+        if hist is None:
+            hist = self._latency[skill] = _Histogram(LATENCY_BUCKETS)
+        hist.observe(seconds)
+        self._outcomes[(skill, outcome)] += 1
+
+        if not usage:
+            return
+        if usage.get("cached") or usage.get("coalesced"):   # no upstream call of its own
+            self._cached[skill] += 1
+            return
+        for fld in TOKEN_FIELDS:
+            if isinstance(usage.get(fld), int):
+                self._tokens[(skill, fld.split("_")[0])] += usage[fld]
+
+    def observe_turn(self, routed_skill: str, depth: int,
+                     seconds: Optional[float] = None) -> None:
+        self._routed[routed_skill] += 1
+        self._depth.observe(depth)
+        if seconds is not None:
+            self._turn_latency.observe(seconds)
+
+    def observe_partial(self, kind: str, cut_at: str) -> None:
+        """A turn answered with a partial Result (*kind* = rag / cta)."""
+        self._partials[(kind, cut_at)] += 1
+
+    def observe_speculation(self, skill: str, outcome: str,
+                            usage: Optional[Dict[str, Any]] = None) -> None:
+        """hit = committed, miss = discarded (*usage* of a finished, unused run)."""
+        self._speculations[(skill, outcome)] += 1
+        if usage and not (usage.get("cached") or usage.get("coalesced")):
+            for fld in TOKEN_FIELDS:
+                if isinstance(usage.get(fld), int):
+                    self._wasted[(skill, fld.split("_")[0])] += usage[fld]
+
+    # ------------------------------------------------------------------ #
+    #  Export
+    # ------------------------------------------------------------------ #
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        out: List[str] = [
+            "# HELP mcp_skill_latency_seconds Skill handle() wall time.",
+            "# TYPE mcp_skill_latency_seconds histogram",
+        ]
+        for skill in sorted(self._latency):
+            out += self._latency[skill].lines("mcp_skill_latency_seconds",
+                                              f'skill="{_esc(skill)}"')
+
+        out += [
+            "# HELP mcp_skill_invocations_total Skill invocations by outcome.",
+            "# TYPE mcp_skill_invocations_total counter",
+        ]
+        for (skill, outcome), n in sorted(self._outcomes.items()):
+            out.append(f'mcp_skill_invocations_total{{skill="{_esc(skill)}",'
+                       f'outcome="{outcome}"}} {n}')
+
+        out += [
+            "# HELP mcp_skill_tokens_total OpenAI tokens spent per skill.",
+            "# TYPE mcp_skill_tokens_total counter",
+        ]
+        for (skill, kind), n in sorted(self._tokens.items()):
+            out.append(f'mcp_skill_tokens_total{{skill="{_esc(skill)}",type="{kind}"}} {n}')
+
+        out += [
+            "# HELP mcp_skill_cached_completions_total Skill invocations answered from the completion cache or a coalesced in-flight call.",
+            "# TYPE mcp_skill_cached_completions_total counter",
+        ]
+        for skill, n in sorted(self._cached.items()):
+            out.append(f'mcp_skill_cached_completions_total{{skill="{_esc(skill)}"}} {n}')
+
+        out += [
+            "# HELP mcp_turns_total Turns by the skill that produced the reply.",
+            "# TYPE mcp_turns_total counter",
+        ]
+        for skill, n in sorted(self._routed.items()):
+            out.append(f'mcp_turns_total{{routed_skill="{_esc(skill)}"}} {n}')
+
+        out += [
+            "# HELP mcp_chain_depth Skills invoked per turn.",
+            "# TYPE mcp_chain_depth histogram",
+        ]
+        out += self._depth.lines("mcp_chain_depth", "")
+
+        out += [
+            "# HELP mcp_turn_latency_seconds End-to-end dispatch time per turn.",
+            "# TYPE mcp_turn_latency_seconds histogram",
+        ]
+        out += self._turn_latency.lines("mcp_turn_latency_seconds", "")
+
+        out += [
+            "# HELP mcp_partial_results_total Turns cut short by their deadline, by fallback kind.",
+            "# TYPE mcp_partial_results_total counter",
+        ]
+        for (kind, cut_at), n in sorted(self._partials.items()):
+            out.append(f'mcp_partial_results_total{{kind="{kind}",'
+                       f'cut_at="{_esc(cut_at)}"}} {n}')
+
+        out += [
+            "# HELP mcp_speculations_total Speculative skill runs by outcome (hit / miss).",
+            "# TYPE mcp_speculations_total counter",
+        ]
+        for (skill, outcome), n in sorted(self._speculations.items()):
+            out.append(f'mcp_speculations_total{{skill="{_esc(skill)}",outcome="{outcome}"}} {n}')
+
+        out += [
+            "# HELP mcp_speculation_wasted_tokens_total Tokens spent on discarded speculative runs.",
+            "# TYPE mcp_speculation_wasted_tokens_total counter",
+        ]
+        for (skill, kind), n in sorted(self._wasted.items()):
+            out.append(f'mcp_speculation_wasted_tokens_total{{skill="{_esc(skill)}",type="{kind}"}} {n}')
+        return "\n".join(out) + "\n"
+
+
+def _esc(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value: float) -> str:
+    return repr(float(value))
+
+
+# One registry per worker process
+METRICS = SkillMetrics()
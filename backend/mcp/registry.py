@@ -0,0 +1,148 @@
+# mcp/registry.py
+"""
+Shared skill registry
+---------------------
+
+One per worker process.  Manifests are read eagerly (routing needs them),
+handlers are imported lazily by mcp.skill_loader, and a watcher started in
+the app lifespan polls skills/ by mtime:
+
+    • changed folder  → that skill is rebuilt (handler re-imported on next use)
+    • new folder      → added
+    • removed folder  → dropped
+
+Every change produces a new immutable SkillSet that replaces `current` in
+a single assignment.  A turn takes `REGISTRY.current` once and keeps
+using it, so in-flight turns finish on the skills they started with.
+
+    skill_set = REGISTRY.current
+    for skill in skill_set.skills: ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from pathlib     import Path
+from typing      import Any, Dict, List, Optional, Tuple
+
+from config.settings  import SKILL_RELOAD_SECONDS
+from mcp.schema       import Skill
+from mcp.skill_loader import SkillLoader, folder_signature, sort_key
+from mcp.triggers     import TriggerIndex
+
+LOGGER = logging.getLogger("mcp.registry")
+
+
+@dataclass(frozen=True)
+class SkillSet:
+    skills:   Tuple[Skill, ...]          # ordered by priority
+    triggers: TriggerIndex
+    fallback: Optional[Skill]
+    version:  int
+
+
+class SkillRegistry:
+    def __init__(self, root: Path, *, poll_seconds: float = SKILL_RELOAD_SECONDS):
+        self.root         = root
+        self.poll_seconds = poll_seconds
+        self._loader      = SkillLoader(root)
+        self._by_folder:  Dict[str, Skill] = {}
+        self._signatures: Dict[str, tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._reloads     = 0
+
+        for folder in self._loader.folders():
+            self._load(folder)
+        self.current: SkillSet = self._build(version=0)
+
+    # ------------------------------------------------------------------ #
+    #  Reload
+    # ------------------------------------------------------------------ #
+    def reload_changed(self) -> List[str]:
+        """Rebuild skills whose folder changed on disk; returns their folder names."""
+        folders = {f.name: f for f in self._loader.folders()}
+        changed = [name for name in self._by_folder.keys() | self._signatures.keys()
+                   if name not in folders]
+        for name in changed:                                # removed
+            self._by_folder.pop(name, None)
+            self._signatures.pop(name, None)
+
+        for name, folder in folders.items():
+            try:
+                signature = folder_signature(folder)
+            except OSError:                                 # mid-write / vanished
+                continue
+            if signature != self._signatures.get(name):
+                self._load(folder, signature)
+                changed.append(name)
+
+        if changed:
+            self._reloads += 1
+            self.current = self._build(version=self.current.version + 1)
+            LOGGER.info("Skills reloaded (%s): %s", self.current.version, sorted(changed))
+        return changed
+
+    def _load(self, folder: Path, signature: Optional[tuple] = None) -> None:
+        self._signatures[folder.name] = signature or folder_signature(folder)
+        try:
+            self._by_folder[folder.name] = self._loader.load_single(folder)
+        except Exception as exc:                    # keep serving the previous version
+            LOGGER.exception("Failed loading skill in %s: %s", folder.name, exc)
+
+    def _build(self, *, version: int) -> SkillSet:
+        skills: List[Skill] = []
+        seen_names: set[str] = set()
+        for folder, skill in sorted(self._by_folder.items()):
+            if skill.name in seen_names:
+                LOGGER.error("Duplicate skill name «%s» in %s – skipped", skill.name, folder)
+                continue
+            seen_names.add(skill.name)
+            skills.append(skill)
+        skills.sort(key=sort_key)
+
+        LOGGER.info("Skill order: %s", [f"{s.name}({s.priority})" for s in skills])
+        return SkillSet(
+            skills   = tuple(skills),
+            triggers = TriggerIndex(skills),
+            fallback = next((s for s in skills if s.kind == "fallback"), None),
+            version  = version,
+        )
+
+    # ------------------------------------------------------------------ #
+    #  Watcher lifecycle (app lifespan)
+    # ------------------------------------------------------------------ #
+    async def start(self) -> None:
+        if self._task is None and self.poll_seconds > 0:
+            self._task = asyncio.create_task(self._watch(), name="skill-watcher")
+            LOGGER.info("Skill watcher started (every %ss)", self.poll_seconds)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await asyncio.to_thread(self.reload_changed)
+            except Exception as exc:
+                LOGGER.exception("Skill reload failed: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version":  self.current.version,
+            "reloads":  self._reloads,
+            "skills":   len(self.current.skills),
+            "watching": self._task is not None,
+        }
+
+
+# One registry per worker process
+REGISTRY = SkillRegistry(Path(__file__).parent.parent / "skills")
@@ -1,56 +1,194 @@
 # mcp/schema.py
 """
 Lightweight data-layer objects shared across the MCP runtime.
-Uses `dataclasses` for speed + static type hints.
+Uses `dataclasses` / __slots__ for speed + static type hints.
 """
 
 from __future__ import annotations
 
+import sys
 import time
-from dataclasses import dataclass, field
-from typing      import Callable, Awaitable, List, Dict, Any, Optional
+from array           import array
+from collections.abc import Sequence
+from dataclasses     import dataclass, field
+from typing          import Callable, Awaitable, Iterable, List, Dict, Any, Optional, Union
 
 
 # ╭───────────────────────────╮
 # │  I.  Conversation objects │
 # ╰───────────────────────────╯
+USER = sys.intern("user")                  # interned role tags – compare with `is`
+BOT  = sys.intern("bot")
+_ROLES = (USER, BOT)                       # role code (0 / 1) → tag
+
+
 @dataclass(slots=True)
 class Turn:
-    """A single end-user utterance."""
-    id:   str
+    """
+    A single utterance.  `id` is an int unique within its Conversation:
+    2·seq for the visitor, 2·seq+1 for the bot (seq = conversation_turns.seq).
+    """
+    id:   int
     text: str
+    role: str   = USER
     ts:   float = field(default_factory=time.time)     # seconds since epoch
-    meta: Dict[str, Any] = field(default_factory=dict)
+    meta: Optional[Dict[str, Any]] = None              # rarely set – no dict per turn
+
+    def __post_init__(self) -> None:
+        # legacy call-sites tag bot turns with meta={"role": "bot"}
+        if self.meta and self.meta.get("role") == BOT:
+            self.role = BOT
+        self.role = BOT if self.role == BOT else USER       # intern
 
     @property
     def is_user(self) -> bool:
         """True for visitor messages, False for bot messages."""
-        # we tag bot turns with meta={"role": "bot"} in the router
-        return self.meta.get("role") != "bot"
+        return self.role is USER
+
+    @property
+    def seq(self) -> int:
+        return self.id // 2
+
+
+class _TurnView(Sequence):
+    """Read-only list-like view; Turn objects are built on access."""
+    __slots__ = ("_convo",)
+
+    def __init__(self, convo: "Conversation"):
+        self._convo = convo
+
+    def __len__(self) -> int:
+        return len(self._convo._texts)
+
+    def __getitem__(self, index):
+        c = self._convo
+        if isinstance(index, slice):
+            return [c._turn(i) for i in range(*index.indices(len(c._texts)))]
+        if index < 0:
+            index += len(c._texts)
+        if not 0 <= index < len(c._texts):
+            raise IndexError("turn index out of range")
+        return c._turn(index)
 
 
-@dataclass(slots=True)
 class Conversation:
-    """Full chat transcript plus any arbitrary metadata."""
-    user_id: str
-    turns:   List[Turn] = field(default_factory=list)
-    memory:  Dict[str, Any] = field(default_factory=dict)
+    """
+    Chat transcript plus arbitrary metadata, stored column-wise (ids, roles,
+    timestamps in compact arrays, texts in a list) with O(1) user / bot
+    counters and cached indexes of the last user and bot turn.
+    """
+    __slots__ = ("user_id", "memory", "_ids", "_roles", "_ts", "_texts",
+                 "_meta", "_n_user", "_last_user", "_last_bot")
 
-    # --- helpers --------------------------------------------------------
+    def __init__(self, user_id: str, turns: Optional[Iterable[Turn]] = None,
+                 memory: Optional[Dict[str, Any]] = None):
+        self.user_id = user_id
+        self.memory: Dict[str, Any] = memory if memory is not None else {}
+        self._ids    = array("q")
+        self._roles  = bytearray()
+        self._ts     = array("d")
+        self._texts: List[str] = []
+        self._meta:  Dict[int, Dict[str, Any]] = {}     # index → extra meta (sparse)
+        self._n_user    = 0
+        self._last_user = -1
+        self._last_bot  = -1
+        for turn in turns or ():
+            self.add_turn(turn)
+
+    # --- mutation -------------------------------------------------------
     def add_turn(self, turn: Turn) -> None:
-        self.turns.append(turn)
+        self._append(turn.id, turn.text, turn.role is BOT, turn.ts)
+        extra = {k: v for k, v in (turn.meta or {}).items() if k != "role"}
+        if extra:
+            self._meta[len(self._texts) - 1] = extra
+
+    def _append(self, turn_id: int, text: str, is_bot: bool, ts: float) -> None:
+        index = len(self._texts)
+        self._ids.append(turn_id)
+        self._roles.append(1 if is_bot else 0)
+        self._ts.append(ts)
+        self._texts.append(text)
+        if is_bot:
+            self._last_bot = index
+        else:
+            self._last_user = index
+            self._n_user += 1
+
+    def _turn(self, index: int) -> Turn:
+        return Turn(id=self._ids[index], text=self._texts[index],
+                    role=_ROLES[self._roles[index]], ts=self._ts[index],
+                    meta=self._meta.get(index))
+
+    def copy(self) -> "Conversation":
+        """Independent transcript (arrays copied, texts shared); fresh memory."""
+        clone = Conversation(self.user_id)
+        clone._ids, clone._roles, clone._ts = array("q", self._ids), bytearray(self._roles), array("d", self._ts)
+        clone._texts = list(self._texts)
+        clone._meta  = {i: dict(m) for i, m in self._meta.items()}
+        clone._n_user, clone._last_user, clone._last_bot = self._n_user, self._last_user, self._last_bot
+        return clone
+
+    # --- serialisation (conversation_turns rows) ------------------------
+    @classmethod
+    def from_structured(cls, user_id: str, rows: Iterable[Dict[str, Any]]) -> "Conversation":
+        """From [{"seq", "user", "bot"}, …] oldest first (ConversationSnapshot form)."""
+        convo = cls(user_id)
+        now = time.time()
+        for row in rows:
+            seq = int(row["seq"])
+            if row.get("user"):
+                convo._append(2 * seq, row["user"], False, now)
+            if row.get("bot"):
+                convo._append(2 * seq + 1, row["bot"], True, now)
+        return convo
+
+    def to_structured(self) -> List[Dict[str, Any]]:
+        """Inverse of from_structured(): one {"seq", "user", "bot"} per seq."""
+        rows: Dict[int, Dict[str, Any]] = {}
+        for turn_id, role, text in zip(self._ids, self._roles, self._texts):
+            row = rows.setdefault(turn_id // 2, {"seq": turn_id // 2, "user": "", "bot": ""})
+            row["bot" if role else "user"] = text
+        return list(rows.values())
+
+    def to_legacy_strings(self) -> List[str]:
+        """["User: …", "Bot: …"] – the history format older agents parse."""
+        return [f"{'Bot' if role else 'User'}: {text}"
+                for role, text in zip(self._roles, self._texts)]
+
+    # --- helpers --------------------------------------------------------
+    @property
+    def turns(self) -> Sequence[Turn]:
+        return _TurnView(self)
+
+    @property
+    def next_turn_id(self) -> int:
+        """Id for the next visitor turn (first id of the next seq)."""
+        return (self._ids[-1] // 2 + 1) * 2 if self._ids else 0
 
     @property
     def num_user_turns(self) -> int:
-        return sum(1 for t in self.turns if t.is_user)
+        return self._n_user
+
+    @property
+    def num_bot_turns(self) -> int:
+        return len(self._texts) - self._n_user
 
     @property
     def last_user_turn(self) -> Optional[Turn]:
-        return next((t for t in reversed(self.turns)), None)
+        return self._turn(self._last_user) if self._last_user >= 0 else None
+
+    @property
+    def last_bot_turn(self) -> Optional[Turn]:
+        return self._turn(self._last_bot) if self._last_bot >= 0 else None
+
+    def latest_bot_message(self) -> str:
+        """Text of the most recent bot turn ('' when the bot has not spoken)."""
+        return self._texts[self._last_bot] if self._last_bot >= 0 else ""
+
     # Legacy-skill aliases
     # --------------------
     @property
-    def messages(self) -> List[Turn]:      # summariser expects .messages
+    def messages(self) -> Sequence[Turn]:  # summariser expects .messages
         return self.turns
 
     @property
@@ -63,11 +201,11 @@ class Conversation:
         if "_extras" not in self.memory:
             self.memory["_extras"] = {}
         return self.memory["_extras"]
-    
+
     @property
     def turn_index(self) -> int:
         """0-based index of the **current** turn (len-1)."""
-        return len(self.turns) - 1            # == -1 until first add_turn()
+        return len(self._texts) - 1           # == -1 until first add_turn()
 
     @property
     def extra(self) -> Dict[str, Any]:
@@ -82,13 +220,15 @@ class Conversation:
 # ╭───────────────────────────╮
 # │ II.  Result object        │
 # ╰───────────────────────────╯
+TurnId = Union[int, str]                   # Turn.id; "" before the dispatcher fills it
+
 @dataclass(slots=True)
 class Result:
     """
     Returned by every skill.  Unifies the schema the dispatcher passes
     back to FastAPI (or any other entry-point).
     """
-    turn_id:      str
+    turn_id:      TurnId
     text:         str
     routed_skill: str
     finished:     bool
@@ -101,7 +241,7 @@ class Result:
 
     # ----- factory helpers ---------------------------------------------
     @classmethod
-    def make_error(cls, *, turn_id: str, err_msg: str) -> "Result":
+    def make_error(cls, *, turn_id: TurnId, err_msg: str) -> "Result":
         return cls(
             turn_id      = turn_id,
             text         = err_msg,
@@ -111,6 +251,16 @@ class Result:
             error        = err_msg,
         )
 
+    @classmethod
+    def noop(cls, turn_id: TurnId, routed_skill: str) -> "Result":
+        """Utility skill had nothing to do this turn – chain continues."""
+        return cls(
+            turn_id      = turn_id,
+            text         = "",
+            routed_skill = routed_skill,
+            finished     = False,
+        )
+
     # FastAPI “jsonable” version
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -138,8 +288,8 @@ class Skill:
     """
     name:      str
     kind:      str
-    match:     MatchFn         # sync  / fast predicate
     handle:    HandleFn        # async / heavy work
+    match:     Optional[MatchFn] = None   # sync / fast predicate; None → manifest triggers only
     priority:  int      = 50
     timeout:   int      = 20   # seconds
     metadata:  Dict[str, Any] = field(default_factory=dict)
@@ -3,9 +3,15 @@
 Disk loader for skills.
 
 • Reads every sub-folder in /skills
-• Parses manifest.yaml  → basic metadata
-• Imports handler.py    → match(), handle()
+• Parses manifest.yaml  → name, kind, priority, timeout, triggers (eager)
+• Imports handler.py    → match(), handle()  (lazily, on first use)
 • Returns sorted list[Skill]
+
+Routing only needs the manifest, so cold start reads a few YAML files and
+a skill's handler (prompt files, API clients, …) is imported the first
+time that skill is matched or run.  The manifest is authoritative for the
+routing fields (name, kind, priority, timeout); a handler-exported `skill`
+object only contributes match() / handle().
 """
 
 from __future__ import annotations
@@ -14,14 +20,16 @@ import importlib.util
 import logging
 import sys
 from pathlib import Path
-from typing  import List, Dict, Any
+from typing  import List, Dict, Any, Optional, Tuple
 
 import yaml
 
-from mcp.schema import Skill
+from mcp.schema import Conversation, Result, Skill, Turn
 
 LOGGER = logging.getLogger("mcp.skill_loader")
 
+_ROUTING_KEYS = {"name", "kind", "priority", "timeout"}
+
 
 class SkillLoader:
     def __init__(self, skills_root: Path):
@@ -32,13 +40,11 @@ class SkillLoader:
     # ------------------------------------------------------------------ #
     def load_all(self) -> List[Skill]:
         skills: List[Skill] = []
-        seen_names: set[str] = set() 
+        seen_names: set[str] = set()
 
-        for folder in sorted(self.root.iterdir()):
-            if not folder.is_dir():
-                continue
+        for folder in self.folders():
             try:
-                skill = self._load_single_skill(folder)
+                skill = self.load_single(folder)
 
                 # ── duplicate-name guard ──────────────────────────────
                 if skill.name in seen_names:
@@ -54,16 +60,18 @@ class SkillLoader:
         #   1. lower `priority`   → earlier
         #   2. alphabetical name → deterministic tiebreaker
         # ------------------------------------------------------------------
-        skills.sort(key=lambda s: (s.priority, s.name.lower()))
+        skills.sort(key=sort_key)
 
         LOGGER.info("Loaded %s skills: %s",
                     len(skills), [s.name for s in skills])
         return skills
 
-    # ------------------------------------------------------------------ #
-    #  Private
-    # ------------------------------------------------------------------ #
-    def _load_single_skill(self, folder: Path) -> Skill:
+    def folders(self) -> List[Path]:
+        return [f for f in sorted(self.root.iterdir())
+                if f.is_dir() and not f.name.startswith(("_", "."))]
+
+    def load_single(self, folder: Path) -> Skill:
+        """Skill for *folder* built from its manifest; handler.py is not imported yet."""
         manifest_path = folder / "manifest.yaml"
         handler_path  = folder / "handler.py"
 
@@ -71,10 +79,73 @@ class SkillLoader:
             raise FileNotFoundError(f"{folder.name} missing manifest/handler")
 
         meta = _read_yaml(manifest_path)
+        if "name" not in meta:
+            raise KeyError(f"{folder.name}/manifest.yaml has no `name`")
+
+        lazy = _LazyHandler(folder, meta)
+        skill = Skill(
+            name     = meta["name"],
+            kind     = meta.get("kind", "utility"),
+            priority = int(meta.get("priority", 50)),
+            timeout  = int(meta.get("timeout", 20)),
+            match    = lazy.match,
+            handle   = lazy.handle,
+            metadata = {k: v for k, v in meta.items() if k not in _ROUTING_KEYS},
+        )
+        skill.metadata["folder"] = folder.name
+
+        LOGGER.debug("Skill loaded: %s (prio=%s)", skill.name, skill.priority)
+        return skill
+
+
+def sort_key(skill: Skill) -> Tuple[int, str]:
+    return skill.priority, skill.name.lower()
+
+
+def folder_signature(folder: Path) -> Tuple[Tuple[str, int], ...]:
+    """(relative path, mtime_ns) of every source / prompt file in *folder*."""
+    return tuple(sorted(
+        (str(p.relative_to(folder)), p.stat().st_mtime_ns)
+        for p in folder.rglob("*")
+        if p.is_file() and "__pycache__" not in p.parts
+    ))
+
+
+# ---------------------------------------------------------------------- #
+#  Lazy handler import
+# ---------------------------------------------------------------------- #
+class _LazyHandler:
+    """Stands in for a skill's match()/handle() until handler.py is imported."""
+
+    def __init__(self, folder: Path, meta: Dict[str, Any]):
+        self.folder = folder
+        self.meta   = meta
+        self._target: Optional[Skill] = None
+
+    def target(self) -> Skill:
+        if self._target is None:
+            self._target = self._import()
+        return self._target
+
+    def match(self, turn: Turn, convo: Conversation) -> bool:
+        fn = self.target().match
+        return bool(fn and fn(turn, convo))
+
+    async def handle(self, turn: Turn, convo: Conversation) -> Result:
+        return await self.target().handle(turn, convo)
+
+    def _import(self) -> Skill:
+        folder = self.folder
+        package = f"skills.{folder.name}"
+
+        # fresh import on hot reload – drop this skill's modules (incl. siblings
+        # such as follow_up/stage_detect.py) from sys.modules first
+        for name in [m for m in sys.modules if m.startswith(package + ".")]:
+            del sys.modules[name]
 
         # --- dynamic import --------------------------------------------
-        module_name = f"skills.{folder.name}.handler"
-        spec        = importlib.util.spec_from_file_location(module_name, handler_path)
+        module_name = f"{package}.handler"
+        spec        = importlib.util.spec_from_file_location(module_name, folder / "handler.py")
         if spec is None or spec.loader is None:
             raise ImportError(f"Cannot import handler for {folder.name}")
         module = importlib.util.module_from_spec(spec)
@@ -83,29 +154,30 @@ class SkillLoader:
 
         # ── 1. Prefer a top-level `skill` object ───────────────────────
         if hasattr(module, "skill"):
-            skill = module.skill
+            target = module.skill
             # lightweight validation
-            if not isinstance(skill, Skill):
+            if not isinstance(target, Skill):
                 raise TypeError(f"{folder.name}/handler.py exports ‘skill’ but it's not an mcp.schema.Skill")
+            if target.name != self.meta["name"]:
+                LOGGER.warning("%s: handler calls itself %r, manifest %r – using manifest",
+                               folder.name, target.name, self.meta["name"])
 
         # ── 2. Otherwise fall back to legacy match()/handle()  ─────────
         else:
-            if not hasattr(module, "match") or not hasattr(module, "handle"):
+            if not hasattr(module, "handle"):
                 raise AttributeError(f"{folder.name}/handler.py must export either a ‘skill’ object **or** match() + handle()")
-
-            skill = Skill(
-                name     = meta["name"],
-                kind     = meta.get("kind", "utility"),
-                priority = int(meta.get("priority", 50)),
-                timeout  = int(meta.get("timeout", 20)),
-                match    = getattr(module, "match"),
-                handle   = getattr(module, "handle"),
-                metadata = {k: v for k, v in meta.items() if k not in {"name", "kind", "priority", "timeout"}}
+            target = Skill(
+                name   = self.meta["name"],
+                kind   = self.meta.get("kind", "utility"),
+                match  = getattr(module, "match", None),
+                handle = getattr(module, "handle"),
             )
 
+        if target.match is None and not self.meta.get("triggers"):
+            raise AttributeError(f"{folder.name}: no match() and no `triggers:` in manifest.yaml")
 
-        LOGGER.debug("Skill loaded: %s (prio=%s)", skill.name, skill.priority)
-        return skill
+        LOGGER.info("Skill handler imported: %s", folder.name)
+        return target
 
 
 # ---------------------------------------------------------------------- #
@@ -0,0 +1,196 @@
+# mcp/speculation.py
+"""
+Speculative domain-skill execution
+----------------------------------
+
+The domain skills only start once the utility stage is done, and its
+slowest member is usually the intent classifier (a gpt-4.1 call whenever
+the local model is unsure).  The label is mostly predictable from cheap
+signals:
+
+    • demo trigger (fuzzy match)          → Ready to engage
+    • product / service keyword           → Interested in Product / Services
+    • the visitor's previous label        (kept per user_id, in-process)
+
+A utility whose manifest declares
+
+    speculation:
+      predicts: intent
+
+lets the dispatcher start – together with the stage – the domain skill
+that would win for the guessed label, provided that skill opted in:
+
+    speculation:
+      enabled: true
+
+The run works on a fork of the conversation and streams into a
+DeferredSink.  Its `prepare` step waits for the utilities that don't
+produce the guessed key (RAG, summary – the skill's inputs) and merges
+their meta into the fork; the skill's handle() starts the moment the last
+of them lands.  If the classifier has already answered differently by
+then, the run stops before spending anything.  If routing then lands on the same skill with the same
+label the result is committed – buffered tokens are replayed to the
+client, the rest of the run streams live, and only the memory / extras
+keys the skill itself wrote are copied back; otherwise the run is
+cancelled.  Hits, misses and the tokens spent on
+discarded runs are recorded in mcp.metrics.METRICS.
+
+    spec = SPECULATOR.start("intent", turn, fork(convo), later, matches, run, prepare)
+    ...
+    result = await spec.commit(convo) if spec.fits(skill, convo) else ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing      import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from config.settings import MCP_SPECULATION, CONVERSATION_CACHE_MAX_ENTRIES
+from mcp.metrics     import METRICS
+from mcp.schema      import Conversation, Result, Skill, Turn
+from services.detect_intent_service import detect_interest, is_demo_request
+from services.token_stream import DeferredSink, current_sink, use_sink
+
+LOGGER = logging.getLogger("mcp.speculation")
+
+MatchFn   = Callable[[Skill, Turn, Conversation], bool]
+RunFn     = Callable[[Skill, Conversation], Awaitable[Result]]
+PrepareFn = Callable[[Conversation], Awaitable[None]]
+
+
+def fork(convo: Conversation) -> Conversation:
+    """Copy of *convo* whose memory / extras can be written without touching it."""
+    clone = convo.copy()
+    clone.memory = {**convo.memory, "_extras": dict(convo.extras)}
+    return clone
+
+
+def _snapshot(convo: Conversation) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    return ({k: v for k, v in convo.memory.items() if k != "_extras"}, dict(convo.extras))
+
+
+def _written(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Keys of *after* that are new or were re-assigned since *before* (a shallow copy)."""
+    return {k: v for k, v in after.items() if k not in before or before[k] is not v}
+
+
+@dataclass(slots=True)
+class Speculation:
+    skill:  Skill
+    key:    str
+    guess:  str
+    convo:  Conversation                  # the fork the run works on
+    task:   asyncio.Task
+    sink:   Optional[DeferredSink]
+    baseline: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None   # fork right before handle()
+
+    def fits(self, skill: Skill, convo: Conversation) -> bool:
+        return skill is self.skill and convo.extras.get(self.key) == self.guess
+
+    async def commit(self, convo: Conversation) -> Result:
+        """Result of the speculative run; its memory writes land in *convo*."""
+        if self.sink is not None and current_sink() is not None:
+            await self.sink.attach(current_sink())      # catch up, then stream live
+        try:
+            result = await self.task
+        except BaseException:
+            METRICS.observe_speculation(self.skill.name, "miss")
+            raise
+        METRICS.observe_speculation(self.skill.name, "hit")
+        memory, extras = _snapshot(self.convo)
+        before_memory, before_extras = self.baseline or ({}, {})
+        convo.memory.update(_written(before_memory, memory))     # only what the skill wrote –
+        convo.extras.update(_written(before_extras, extras))     # not the probe's stale inputs
+        LOGGER.info("speculative %s committed (%s=%s)", self.skill.name, self.key, self.guess)
+        return result
+
+    def discard(self) -> None:
+        usage = None
+        if not self.task.done():
+            self.task.cancel()
+        elif not self.task.cancelled() and self.task.exception() is None:
+            usage = (self.task.result().meta or {}).get("openai_usage")
+        METRICS.observe_speculation(self.skill.name, "miss", usage)
+        LOGGER.info("speculative %s discarded (guessed %s=%s)", self.skill.name, self.key, self.guess)
+
+
+class Speculator:
+    def __init__(self, *, enabled: bool = MCP_SPECULATION,
+                 max_users: int = CONVERSATION_CACHE_MAX_ENTRIES):
+        self.enabled   = enabled
+        self.max_users = max_users
+        self._last: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    # ------------------------------------------------------------------ #
+    #  Prediction
+    # ------------------------------------------------------------------ #
+    def guess(self, key: str, turn: Turn, convo: Conversation) -> Optional[str]:
+        if key == "intent":
+            if is_demo_request(turn.text):
+                return "Ready to engage"
+            product, service = detect_interest(turn.text)
+            if product:
+                return "Interested in Product"
+            if service:
+                return "Interested in Services"
+        return self._last.get((convo.user_id, key))
+
+    def remember(self, user_id: str, key: str, label: Any) -> None:
+        if not isinstance(label, str) or not label:
+            return
+        self._last[(user_id, key)] = label
+        self._last.move_to_end((user_id, key))
+        while len(self._last) > self.max_users:
+            self._last.popitem(last=False)
+
+    # ------------------------------------------------------------------ #
+    #  Launch
+    # ------------------------------------------------------------------ #
+    def start(self, key: str, turn: Turn, probe: Conversation,
+              later: Sequence[Skill], matches: MatchFn, run: RunFn,
+              prepare: Optional[PrepareFn] = None) -> Optional[Speculation]:
+        """
+        Start the skill that would win on *probe* (a fork) with the guessed
+        label, if it opted in.  *later* = the skills after this stage.
+        *prepare(probe)* runs first in the same task (fill in the skill's
+        inputs; raise CancelledError to give up).
+        """
+        if not self.enabled:
+            return None
+        guess = self.guess(key, turn, probe)
+        if guess is None:
+            return None
+        probe.extras[key] = guess
+
+        for skill in later:
+            if skill.kind == "utility":          # would change extras first
+                return None
+            if matches(skill, turn, probe):
+                if not (skill.metadata.get("speculation") or {}).get("enabled"):
+                    return None
+                break
+        else:
+            return None
+
+        async def _speculative() -> Result:
+            if prepare is not None:
+                await prepare(probe)
+            spec.baseline = _snapshot(probe)
+            return await run(skill, probe)
+
+        sink = DeferredSink() if current_sink() is not None else None
+        with use_sink(sink):
+            task = asyncio.create_task(_speculative(), name=f"speculate-{skill.name}")
+        spec = Speculation(skill, key, guess, probe, task, sink)     # before the task first runs
+        LOGGER.info("speculating %s on %s=%s", skill.name, key, guess)
+        return spec
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "remembered": len(self._last)}
+
+
+# One speculator per worker process
+SPECULATOR = Speculator()
@@ -0,0 +1,214 @@
+# mcp/triggers.py
+"""
+Declarative skill triggers
+--------------------------
+
+Skills declare *when* they want a turn in manifest.yaml instead of
+hand-written keyword scans in match():
+
+    triggers:
+      keywords: [book a demo, schedule demo]    # case-insensitive substrings
+      exact:    [show memory]                   # whole message, stripped
+      regex:    ['\\bpric(e|ing)\\b']            # case-insensitive search
+      when:                                     # cheap state predicates
+        - state: demo_stage
+          equals: collecting_info
+        - extras: intent
+          in: [Interested in Product, Info Request]
+        - extras: intent
+          present: false
+        - first_turn: true
+        - min_words: 3
+        - always: true
+      match: true      # also consult the handler's match() (escape hatch)
+
+A skill is a candidate when *any* of its triggers fires.
+
+At load time every skill's keywords go into ONE Aho-Corasick automaton,
+every exact phrase into ONE dict and every regex into ONE alternation, so
+`scan()` reads the message once no matter how many skills exist.  `when`
+predicates look at convo state that earlier skills in the chain may still
+change (e.g. intent), so they are evaluated lazily per skill.
+
+Skills whose manifest has no `triggers:` keep using match() unchanged.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing      import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from mcp.schema import Conversation, Skill, Turn
+
+LOGGER = logging.getLogger("mcp.triggers")
+
+Predicate = Callable[[Turn, Conversation], bool]
+
+
+# ──────────────────────────────────────────────────────────────────────
+#  Keyword automaton (Aho-Corasick)
+# ──────────────────────────────────────────────────────────────────────
+class _Automaton:
+    """All keywords of all skills; one left-to-right pass per message."""
+
+    def __init__(self, keywords: Dict[str, Set[str]]):   # keyword → skill names
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int]            = [0]
+        self._out:  List[FrozenSet[str]] = [frozenset()]
+
+        for word, owners in keywords.items():
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(frozenset())
+                    self._goto[node][ch] = nxt
+                node = nxt
+            self._out[node] = self._out[node] | owners
+
+        # breadth-first: failure links + inherited outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> Set[str]:
+        hits: Set[str] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                hits |= out[node]
+        return hits
+
+
+# ──────────────────────────────────────────────────────────────────────
+#  State predicates
+# ──────────────────────────────────────────────────────────────────────
+def _predicate(spec: Dict[str, Any]) -> Predicate:
+    if spec.get("always"):
+        return lambda t, c: True
+    if "first_turn" in spec:
+        want = bool(spec["first_turn"])
+        return lambda t, c: (c.num_user_turns == 0) is want
+    if "min_words" in spec:
+        n = int(spec["min_words"])
+        return lambda t, c: len(t.text.split()) >= n
+
+    for scope, source in (("extras", lambda c: c.extras), ("state", lambda c: c.state)):
+        if scope not in spec:
+            continue
+        key = spec[scope]
+        if "equals" in spec:
+            value = spec["equals"]
+            return lambda t, c: source(c).get(key) == value
+        if "in" in spec:
+            values = frozenset(spec["in"])
+            return lambda t, c: source(c).get(key) in values
+        if "present" in spec:
+            want = bool(spec["present"])
+            return lambda t, c: (key in source(c)) is want
+        raise ValueError(f"`{scope}: {key}` needs one of equals / in / present")
+
+    raise ValueError(f"Unknown trigger predicate: {spec!r}")
+
+
+# ──────────────────────────────────────────────────────────────────────
+#  Index
+# ──────────────────────────────────────────────────────────────────────
+@dataclass(slots=True)
+class _SkillTriggers:
+    predicates: List[Predicate] = field(default_factory=list)
+    use_match:  bool            = False
+
+
+class TriggerIndex:
+    """
+    Compiled triggers for a skill list.
+
+        hits = index.scan(turn.text)                  # once per turn
+        index.matches(skill, turn, convo, hits)       # per skill in the chain
+    """
+
+    def __init__(self, skills: Iterable[Skill]):
+        self._skills: Dict[str, _SkillTriggers] = {}
+        keywords: Dict[str, Set[str]] = {}
+        self._exact: Dict[str, Set[str]] = {}
+        regex_parts: List[str] = []
+        self._regex_owner: Dict[str, str] = {}
+
+        for skill in skills:
+            spec = (skill.metadata or {}).get("triggers")
+            if not spec:
+                continue
+            compiled = _SkillTriggers(use_match=bool(spec.get("match", False)))
+            try:
+                compiled.predicates = [_predicate(p) for p in spec.get("when", [])]
+            except ValueError as exc:
+                LOGGER.error("Bad trigger in %s (%s) – falling back to match()", skill.name, exc)
+                continue
+
+            for word in spec.get("keywords", []):
+                keywords.setdefault(str(word).lower(), set()).add(skill.name)
+            for phrase in spec.get("exact", []):
+                self._exact.setdefault(str(phrase).strip().lower(), set()).add(skill.name)
+            for pattern in spec.get("regex", []):
+                try:
+                    re.compile(pattern)
+                except re.error as exc:
+                    LOGGER.error("Bad trigger regex in %s: %r (%s)", skill.name, pattern, exc)
+                    continue
+                group = f"t{len(regex_parts)}"
+                regex_parts.append(f"(?P<{group}>{pattern})")
+                self._regex_owner[group] = skill.name
+
+            self._skills[skill.name] = compiled
+
+        self._automaton = _Automaton(keywords) if keywords else None
+        self._regex: Optional[re.Pattern] = (
+            re.compile("|".join(regex_parts), re.IGNORECASE) if regex_parts else None
+        )
+        LOGGER.info(
+            "Trigger index: %s skills, %s keywords, %s phrases, %s regexes",
+            len(self._skills), len(keywords), len(self._exact), len(regex_parts),
+        )
+
+    # ------------------------------------------------------------------ #
+    def scan(self, text: str) -> Set[str]:
+        """Names of skills whose text triggers fire on *text* (one pass)."""
+        lowered = text.lower()
+        hits: Set[str] = set(self._exact.get(lowered.strip(), ()))
+        if self._automaton is not None:
+            hits |= self._automaton.scan(lowered)
+        if self._regex is not None:
+            # overlapping patterns of different skills can shadow each other
+            hits.update(self._regex_owner[m.lastgroup] for m in self._regex.finditer(text))
+        return hits
+
+    def declares(self, skill: Skill) -> bool:
+        return skill.name in self._skills
+
+    def matches(self, skill: Skill, turn: Turn, convo: Conversation, hits: Set[str]) -> bool:
+        compiled = self._skills.get(skill.name)
+        if compiled is None:                                   # no triggers → legacy
+            return bool(skill.match and skill.match(turn, convo))
+        if skill.name in hits:
+            return True
+        if any(p(turn, convo) for p in compiled.predicates):
+            return True
+        return compiled.use_match and bool(skill.match and skill.match(turn, convo))
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional, Union
 
 
@@ -12,6 +12,16 @@ class ChatRequest(BaseModel):
     user_id: str | None = None
     text: str
 
+# Batch of MCP turns (/mcp/batch)
+class BatchTurn(BaseModel):
+    user_id: str
+    text: str
+
+class BatchRequest(BaseModel):
+    turns: List[BatchTurn]
+    concurrency: Optional[int] = Field(None, ge=1, le=64)   # default MCP_BATCH_CONCURRENCY
+    persist: bool = True       # False → in-memory conversations, nothing written
+
 class ContactForm(BaseModel):
     user_id: str
     name: str
@@ -6,7 +6,7 @@ from services.email_service import process_contact
 from services.teams_service import format_teams_message
 from services.supabase_service import sync_qualified_lead, insert_lead_log
 from services.detect_intent_service import detect_interest
-from services.supabase_service import get_conversation_history
+from services.conversation_snapshot import ConversationSnapshot
 
 setup_logging()
 
@@ -52,16 +52,13 @@ async def contact_handler(
             detail="Failed to send notification. Please try again."
         )
 
-    # ---------------- pull chat history for richer context ----------
+    # ---------- auto-tag product / service from chat history ----------
+    snapshot = ConversationSnapshot(form.user_id)
     try:
-        # This returns ["User: …", "Bot: …", …"] newest last
-        hist_lines = await get_conversation_history(form.user_id, as_strings=True)
-        history_txt = "\n".join(hist_lines[-30:])   # last ~30 exchanges is plenty
+        # last ~30 exchanges of stored history is plenty
+        product, service = await snapshot.interest(form.message or "")
     except Exception:
-        history_txt = ""
-
-    # ---------- auto-tag product / service ----------
-    product, service = detect_interest(history_txt, form.message or "")
+        product, service = detect_interest("", form.message or "")
 
     # ---------- log lead (dedup handled inside) ----------
     await sync_qualified_lead({
@@ -2,33 +2,51 @@
 FastAPI entry-point that hands every incoming chat turn to the MCP dispatcher.
 
 • One POST  /v1/mcp/message     – main chat endpoint
+• One POST  /v1/mcp/message/stream – same turn as Server-Sent Events
 • One GET   /v1/mcp/skills      – quick health / debugging
+• One GET   /v1/mcp/metrics     – per-skill latency / errors / tokens (Prometheus)
+• One POST  /v1/mcp/batch       – many turns, results streamed back as NDJSON
+• One GET   /v1/mcp/llm         – LLM gateway lanes: limits, queueing, tokens
+• One GET   /v1/mcp/prompts     – loaded prompt templates and their token counts
+• One GET   /v1/mcp/classifiers – cascade classifiers: calls resolved per tier
 
 The router:
-  1.  Builds / updates a Conversation object per user-id
-  2.  Delegates routing to mcp.dispatcher.Dispatcher
+  1.  Builds / updates a Conversation object per user-id (cached in-process)
+  2.  Delegates routing to mcp.dispatcher.Dispatcher under a per-turn
+      deadline (MCP_TURN_BUDGET_SECONDS, services.deadline)
   3.  Persists memory + lead logs via helpers in services.supabase_service
 """
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import uuid
 from time import perf_counter
 
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
-from mcp.dispatcher import Dispatcher
-from mcp.skill_loader import SkillLoader
-from mcp.schema import Conversation, Turn
-from models.request_models import ChatRequest
+from config.settings import MCP_BATCH_CONCURRENCY, MCP_BATCH_MAX_TURNS, MCP_TURN_BUDGET_SECONDS
+from mcp.dispatcher import BatchOutcome, Dispatcher, TurnRunner
+from mcp.metrics import METRICS
+from mcp.registry import REGISTRY
+from mcp.schema import Conversation, Turn, Result
+from models.request_models import BatchRequest, ChatRequest
 from models.response_models import ChatResponse
 
-from services.supabase_service import (
-    get_conversation_history,
-    upsert_conversation_memory,
-    insert_lead_log,
-)
+from services.write_behind import WRITE_BEHIND, queue_lead_log
+from services.semantic_cache import RESPONSE_CACHE
+from services.completion_cache import COMPLETION_CACHE
+from services.conversation_snapshot import ConversationSnapshot
+from services.conversation_cache import CONVERSATION_CACHE
+from services.cascade import CASCADES
+from services.deadline import turn_budget
+from services.llm_gateway import GATEWAY
+from services.prompt_registry import PROMPTS
+from services.single_flight import COMPLETION_FLIGHTS, EMBEDDING_FLIGHTS
+from services.token_stream import TokenStream, sse_event, SSE_HEADERS
 
 # -------------------------------------------------------------------- #
 #  FastAPI plumbing
@@ -36,16 +54,14 @@ from services.supabase_service import (
 router = APIRouter(prefix="/mcp", tags=["mcp"])
 LOGGER = logging.getLogger("mcp.router")
 
-# One global Dispatcher instance (skills loaded once at startup)
+# One global Dispatcher instance – skills come from the shared registry
 _DISPATCHER: Dispatcher | None = None
 
 
 def _get_dispatcher() -> Dispatcher:
     global _DISPATCHER
     if _DISPATCHER is None:
-        skills_root = Dispatcher.default_skills_root()
-        loaded      = SkillLoader(skills_root).load_all()
-        _DISPATCHER = Dispatcher(loaded)        # class we just added
+        _DISPATCHER = Dispatcher()
     return _DISPATCHER
 
 
@@ -56,6 +72,7 @@ def _get_dispatcher() -> Dispatcher:
 @router.get("/skills", summary="List active MCP skills")
 async def list_skills(dispatcher: Dispatcher = Depends(_get_dispatcher)):
     return {
+        "version": REGISTRY.current.version,
         "count": len(dispatcher.skills),
         "skills": [
             {
@@ -69,6 +86,46 @@ async def list_skills(dispatcher: Dispatcher = Depends(_get_dispatcher)):
     }
 
 
+@router.get("/metrics", summary="Per-skill metrics (Prometheus text format)",
+            response_class=PlainTextResponse)
+async def skill_metrics():
+    return PlainTextResponse(METRICS.render(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/persistence", summary="Write-behind queue depth and lag")
+async def persistence_stats():
+    return WRITE_BEHIND.stats()
+
+
+@router.get("/llm", summary="LLM gateway: per-model limits, queueing, retries, tokens")
+async def llm_stats():
+    return GATEWAY.stats()
+
+
+@router.get("/prompts", summary="Prompt templates: token counts, prefix-cache eligibility")
+async def prompt_stats():
+    return PROMPTS.stats()
+
+
+@router.get("/classifiers", summary="Cascade classifiers: calls resolved per tier")
+async def classifier_stats():
+    return {name: cascade.stats() for name, cascade in sorted(CASCADES.items())}
+
+
+@router.get("/cache", summary="Response / completion cache hit rates")
+async def cache_stats():
+    return {
+        "semantic":   RESPONSE_CACHE.stats(),
+        "completion": COMPLETION_CACHE.stats(),
+        "conversation": CONVERSATION_CACHE.stats(),
+        "single_flight": {
+            "completions": COMPLETION_FLIGHTS.stats(),
+            "embeddings":  EMBEDDING_FLIGHTS.stats(),
+        },
+    }
+
+
 @router.post(
     "/message",
     response_model=ChatResponse,
@@ -88,50 +145,138 @@ async def chat_endpoint(payload: ChatRequest,
     5. Return Result to client
     """
     # 0. user_id
-    user_id = payload.user_id or str(uuid.uuid4())
-
-    # 1. Load previous history (strings → Conversation)
-    history_strings  = await get_conversation_history(user_id, as_strings=True)
-    conversation     = Conversation(user_id=user_id)
-    for line in history_strings:
-        # Original history strings include "User:" / "Bot:" prefixes
-        if line.startswith("User: "):
-            conversation.add_turn(
-                Turn(id=str(uuid.uuid4()), text=line[6:])
-            )
-        elif line.startswith("Bot: "):
-            conversation.add_turn(
-                Turn(id=str(uuid.uuid4()), text=line[5:], meta={"role": "bot"})
-            )
-
-    # 2. Append this incoming turn
-    new_turn = Turn(id=str(uuid.uuid4()), text=payload.text)
-    conversation.add_turn(new_turn)
-    LOGGER.info("Step 2: New turn added: %s", new_turn)
-
-    # 3. Dispatch
-    t0      = perf_counter()
-    result  = await dispatcher.dispatch(new_turn, conversation)
+    user_id  = payload.user_id or str(uuid.uuid4())
+    snapshot = ConversationSnapshot(user_id)
+    with snapshot.activate():
+        return await _handle_turn(payload, user_id, snapshot, dispatcher)
+
+
+@router.post("/message/stream", summary="Chat turn as Server-Sent Events")
+async def chat_stream_endpoint(payload: ChatRequest,
+                               dispatcher: Dispatcher = Depends(_get_dispatcher)):
+    """
+    Streaming variant of /message: `token` events while the domain skill
+    generates, then one `done` event with the ChatResponse metadata.
+    """
+    user_id  = payload.user_id or str(uuid.uuid4())
+    snapshot = ConversationSnapshot(user_id)
+    stream   = TokenStream()
+    with snapshot.activate(), stream.activate():
+        task = asyncio.create_task(_handle_turn(payload, user_id, snapshot, dispatcher))
+
+    async def events():
+        try:
+            async for text in stream.drain(task):
+                yield sse_event("token", {"text": text})
+            response = task.result()
+        except HTTPException as exc:
+            yield sse_event("error", {"detail": exc.detail})
+            return
+        except Exception as exc:                         # pragma: no cover
+            LOGGER.exception("Streaming turn crashed: %s", exc)
+            yield sse_event("error", {"detail": "internal error"})
+            return
+        finally:
+            task.cancel()                                # client gone – stop the turn
+        if not stream.emitted:
+            yield sse_event("token", {"text": response.response})
+        yield sse_event("done", response.model_dump())
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/batch", summary="Many chat turns, results as NDJSON")
+async def batch_endpoint(payload: BatchRequest,
+                         dispatcher: Dispatcher = Depends(_get_dispatcher)):
+    """
+    Push many (user_id, text) turns through the pipeline – replaying
+    recorded conversations, backfilling intents, warming caches.
+
+    Turns of one user_id run in order, up to `concurrency` turns in
+    flight overall.  Response: one JSON line per turn as it completes
+    ({"type": "result", "index", …}), then {"type": "report", …} with
+    throughput and latency percentiles.
+    """
+    if len(payload.turns) > MCP_BATCH_MAX_TURNS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MCP_BATCH_MAX_TURNS} turns per batch",
+        )
+    batch = dispatcher.dispatch_batch(
+        [(t.user_id, t.text) for t in payload.turns],
+        concurrency = payload.concurrency or MCP_BATCH_CONCURRENCY,
+        run         = _pipeline_runner(dispatcher) if payload.persist else None,
+    )
+
+    async def lines():
+        async for outcome in batch:
+            yield _ndjson(_batch_line(outcome))
+        report = batch.report()
+        LOGGER.info("Batch finished: %s", report)
+        yield _ndjson({"type": "report", **report})
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _pipeline_runner(dispatcher: Dispatcher) -> TurnRunner:
+    """One batch turn through the same path as POST /message."""
+    async def run(user_id: str, text: str) -> ChatResponse:
+        snapshot = ConversationSnapshot(user_id)
+        with snapshot.activate():
+            return await _handle_turn(ChatRequest(user_id=user_id, text=text),
+                                      user_id, snapshot, dispatcher)
+    return run
+
+
+def _batch_line(outcome: BatchOutcome) -> dict:
+    response = outcome.response
+    if isinstance(response, BaseModel):
+        response = response.model_dump()
+    elif isinstance(response, Result):
+        response = response.to_dict()
+    return {
+        "type":       "result",
+        "index":      outcome.index,
+        "user_id":    outcome.user_id,
+        "latency_ms": outcome.latency_ms,
+        "error":      outcome.error,
+        "response":   response,
+    }
+
+
+def _ndjson(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+async def _handle_turn(payload: ChatRequest, user_id: str,
+                       snapshot: ConversationSnapshot,
+                       dispatcher: Dispatcher) -> ChatResponse:
+    t0 = perf_counter()
+    with turn_budget(MCP_TURN_BUDGET_SECONDS):   # skills / LLM / Pinecone get what's left
+        # 1. Conversation from the in-process cache (Supabase only on a miss)
+        conversation = await CONVERSATION_CACHE.conversation(snapshot)
+
+        # 2. Append this incoming turn
+        new_turn = Turn(id=conversation.next_turn_id, text=payload.text)
+        conversation.add_turn(new_turn)
+        LOGGER.info("Step 2: New turn added: %s", new_turn)
+
+        # 3. Dispatch (a turn out of budget comes back as a partial Result)
+        result = await dispatcher.dispatch(new_turn, conversation)
     result.latency_ms = int((perf_counter() - t0) * 1_000)
     LOGGER.info("Step 3: Result: %s", result)
 
-    # 4. Persist conversation memory (async – don’t block response)
+    # 4. Persist this turn + memory (async – don’t block response)
     try:
-        # Build human-readable history strings for storage
-        hist_strings = []
-        for turn in conversation.turns:
-            prefix = "User: " if turn.meta.get("role") != "bot" else "Bot: "
-            hist_strings.append(prefix + turn.text)
-
-        await upsert_conversation_memory(
-            user_id=user_id,
+        await snapshot.save_turn(
+            payload.text, result.text if not result.error else "",
             memory={
                 "last_skill": result.routed_skill,
                 "finished":   result.finished,
             },
-            history=hist_strings,
         )
-        LOGGER.info("Step 4: Conversation memory updated")
+        await CONVERSATION_CACHE.store(snapshot)          # write-through
+        LOGGER.info("Step 4: Conversation memory queued")
 
         # If the skill logged a lead (follow-up skill does this) – insert
         if result.routed_skill == "follow_up" and result.finished:
@@ -143,8 +288,8 @@ async def chat_endpoint(payload: ChatRequest,
                 "message":  conversation.memory.get("message", ""),
                 "channel":  ["email"],
             }
-            await insert_lead_log(lead_payload)
-            LOGGER.info("Step 5: Lead logged")
+            await queue_lead_log(lead_payload)
+            LOGGER.info("Step 5: Lead queued")
     except Exception as exc:            # no 500 for the user – just log
         LOGGER.exception("Memory / lead persistence failed: %s", exc)
 
@@ -156,4 +301,15 @@ async def chat_endpoint(payload: ChatRequest,
         )
 
     # 6. Return
-    return ChatResponse(**result.to_dict())
+    return _to_chat_response(result, conversation)
+
+
+def _to_chat_response(result: Result, conversation: Conversation) -> ChatResponse:
+    """Map a skill Result onto the public ChatResponse schema."""
+    return ChatResponse(
+        response     = result.text,
+        intent       = conversation.extras.get("intent", ""),
+        routed_agent = result.routed_skill,
+        suggested    = result.suggested or None,
+        action       = result.meta.get("action"),
+    )
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import asyncio
 import logging
 import re
 # ────── request / response models ──────
@@ -9,19 +11,24 @@ from models.response_models import ChatResponse
 # ────── helper services ──────
 from services.objection_service import contains_objection          # async bool
 from services.lead_service import detect_service, is_hot_lead      # async str / bool
-from services.supabase_service import upsert_conversation_memory, sync_qualified_lead, get_conversation_memory, get_conversation_history
+from services.write_behind import queue_conversation_memory, queue_qualified_lead
+from services.conversation_snapshot import ConversationSnapshot
 from services.detect_intent_service import is_demo_request, is_positive_response
 
 # ────── AI agents ──────
 from agents.engagement_agent import run_engagement_agent
-from agents.intent_agent import run_intent_agent
+from agents.intent_agent import ROUTED_INTENTS, classify_with_llm
 from agents.context_agent import retrieve_context
 from agents.sales_agent import run_sales_agent
 from agents.objection_agent import run_objection_agent
-from agents.summary_agent import run_summary_agent
 from agents.info_agent import run_info_agent
 from agents.follow_up_agent import run_follow_up_agent
+from agents.summary_agent import update_rolling_summary
 from services.factual_detector_service import is_pure_factual
+from services.intent_model import classify_intent
+from services.fanout import FanOut
+from services.semantic_cache import RESPONSE_CACHE
+from services.token_stream import TokenStream, sse_event, SSE_HEADERS
 from config.logging import setup_logging
 
 def build_updated_history(existing_history: list, user_query: str, bot_response: str) -> list:
@@ -39,41 +46,32 @@ def build_updated_history(existing_history: list, user_query: str, bot_response:
     return existing_history + [f"User: {user_query}", f"Bot: {bot_response}"]
 
 
-async def get_last_bot_messages(user_id: str, count: int = 2) -> list:
+async def get_last_bot_messages(snapshot: ConversationSnapshot, count: int = 2) -> list:
     """
     Fetch the last N bot messages from stored conversation history.
     
     Args:
-        user_id: User ID to fetch history for
+        snapshot: Request-scoped conversation snapshot (row is loaded once)
         count: Number of recent bot messages to return
         
     Returns:
         List of recent bot messages (newest first)
     """
     try:
-        # Get structured history from Supabase
-        structured_history = await get_conversation_history(user_id, as_strings=False)
-        
-        if not structured_history:
-            return []
-        
-        # Extract bot messages from structured format, newest first
-        bot_messages = []
-        for conversation in reversed(structured_history):  # Start from newest
-            if isinstance(conversation, dict) and conversation.get("bot"):
-                bot_messages.append(conversation["bot"].lower())
-                if len(bot_messages) >= count:
-                    break
-        
-        return bot_messages
-        
+        return await snapshot.last_bot_messages(count)
     except Exception as e:
         logging.error(f"Error fetching last bot messages: {e}")
-        # Fallback: extract from current request history if Supabase fails
-        fallback_messages = [
-            l.lower() for l in reversed([msg for msg in [] if msg.lower().startswith("bot:")])
-        ][:count]
-        return fallback_messages
+        return []
+
+async def _classify_intent(user_query: str, summary_task) -> str:
+    """
+    Local classifier first – it only needs the query.  The summary is
+    awaited just for the LLM fallback, which starts the moment it lands.
+    """
+    label = await classify_intent(user_query, accept=ROUTED_INTENTS)
+    if label:
+        return label
+    return await classify_with_llm(user_query, await summary_task)
 
 setup_logging()
 
@@ -84,7 +82,69 @@ message_router = APIRouter()
 
 
 @message_router.post("/message", response_model=ChatResponse)
-async def chat_controller(req: QueryRequest):
+async def chat_controller(req: QueryRequest, bt: BackgroundTasks):
+    snapshot = ConversationSnapshot(req.user_id, history=req.history)
+    with snapshot.activate():
+        response = await _route_message(req, snapshot)
+
+    _schedule_summary(bt, req, snapshot, response)
+    return response
+
+
+@message_router.post("/message/stream")
+async def chat_stream_controller(req: QueryRequest, bt: BackgroundTasks):
+    """
+    Server-Sent Events variant of /message.
+
+    `token` events carry markdown-formatted reply text as the LLM generates
+    it; a final `done` event carries the full ChatResponse (routed_agent,
+    intent, suggested, action).  Failures end the stream with `error`; a
+    client that disconnects cancels the turn.
+    """
+    snapshot = ConversationSnapshot(req.user_id, history=req.history)
+    stream   = TokenStream()
+    with snapshot.activate(), stream.activate():
+        task = asyncio.create_task(_route_message(req, snapshot))
+
+    async def events():
+        try:
+            async for text in stream.drain(task):
+                yield sse_event("token", {"text": text})
+            response = task.result()
+        except HTTPException as exc:
+            yield sse_event("error", {"detail": exc.detail})
+            return
+        except Exception as exc:
+            logging.exception("Streaming turn crashed: %s", exc)
+            yield sse_event("error", {"detail": "internal error"})
+            return
+        finally:
+            task.cancel()                       # client gone / generator closed – stop the turn
+        if not stream.emitted:                  # canned reply – nothing streamed
+            yield sse_event("token", {"text": response.response})
+        _schedule_summary(bt, req, snapshot, response)
+        yield sse_event("done", response.model_dump())
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def _schedule_summary(bt: BackgroundTasks, req: QueryRequest,
+                      snapshot: ConversationSnapshot, response: ChatResponse) -> None:
+    """Fold this turn into the rolling summary after the reply is sent."""
+    full_history = build_updated_history(req.history, req.query, response.response)
+    bt.add_task(_refresh_summary, snapshot, full_history)
+
+
+async def _refresh_summary(snapshot: ConversationSnapshot, full_history: list) -> None:
+    try:
+        row = await snapshot.row()
+    except Exception:
+        logging.exception("Rolling summary skipped – memory row unavailable")
+        return
+    await update_rolling_summary(snapshot.user_id, row, full_history)
+
+
+async def _route_message(req: QueryRequest, snapshot: ConversationSnapshot) -> ChatResponse:
     try:
          # ========== 0. First message → Engagement ==========
         if not req.history and re.match(r"^\s*(hi|hello|hey|greetings|howdy|yo)\b", req.query, re.I):
@@ -94,118 +154,121 @@ async def chat_controller(req: QueryRequest):
             if not response or not isinstance(response, str):
                 raise HTTPException(status_code=500, detail="Engagement Agent failed to respond")
             
-            # Build history for first message
-            full_history = build_updated_history([], req.query, response)
-            await upsert_conversation_memory(
-                user_id=req.user_id,
+            # Persist the first turn
+            await snapshot.save_turn(
+                req.query, response,
                 memory={
                     "intent": "Engagement",
                     "product": "",
                     "service": "",
                     "qualified": False,
                     "last_agent": "EngagementAgent"
-                },
-                history=full_history
+                }
             )
             return ChatResponse(response=response, routed_agent="engagement")
 
-        # ========== 1. Objection shortcut ==========
-        if await contains_objection(req.query):
-            logging.info("Objection detected, routing to Objection Agent")
-            summary = await run_summary_agent(req.history)
-            response = await run_objection_agent(req.query, summary)
-            logging.info(f"Objection Agent response: {response}")
-            if not response or not isinstance(response, str):
-                raise HTTPException(status_code=500, detail="Objection Agent returned invalid response")
-                           # → persist memory (not yet qualified)
-            full_history = build_updated_history(req.history, req.query, response)
-            await upsert_conversation_memory(
-                user_id=req.user_id,
-                memory={
-                    "intent": "Objection",
-                    "product": "",
-                    "service": "",
-                    "qualified": False,
-                    "last_agent": "ObjectionAgent"
-                },
-                history=full_history
-            )
-            return ChatResponse(response=response, routed_agent="objection")
-        
-        # =====================================================================
-        # 1. DEMO-FLOW (follow-up agent) – Only for explicit demo requests and ongoing collections
-        # =====================================================================
-        # ------------------------------------------------------------------
-        # 1) pull last assistant line & memory
-        # ------------------------------------------------------------------
-        memory_row   = await get_conversation_memory(req.user_id) or {}
-        assistant_ln = (await get_last_bot_messages(req.user_id, 1) or [""])[0].lower()
-        user_text    = req.query.lower().strip()
-
-        # ------------------------------------------------------------------
-        # 2) demo intent detection (RapidFuzz + exact)
-        # ------------------------------------------------------------------
-        explicit_demo_request     = is_demo_request(user_text)
-        bot_offered_demo          = is_demo_request(assistant_ln)
-        user_accepted_offer       = is_positive_response(user_text)
-        demo_offered_and_accepted = bot_offered_demo and user_accepted_offer
-
-        # ------------------------------------------------------------------
-        # 3) when to launch contact-form CTA
-        # ------------------------------------------------------------------
-        if explicit_demo_request or demo_offered_and_accepted:
-            logging.info("Demo request detected, routing to CTA Agent")
-            reply = ("Great! I can get that demo scheduled. "
-                    "Please fill in the quick form for us so our team "
-                    "will reach out as soon as possible.")
-
-            full_history = build_updated_history(req.history, req.query, reply)
-            await upsert_conversation_memory(
-                user_id=req.user_id,
-                memory={
-                    "intent":     "Demo Booking",
-                    "product":    "",
-                    "service":    "",
-                    "qualified":  True,
-                    "last_agent": "CTA",
-                    "demo_stage": "collecting_info"
-                },
-                history=full_history
-            )
-            return ChatResponse(
-                response     = reply,
-                intent       = "Demo Booking",
-                routed_agent = "CTA",
-                action       = "contact_form"
-            )
-
-        # ------------------------------------------------------------------
-        # 4) If user was mid-demo but asks unrelated question → clear state
-        # ------------------------------------------------------------------
-        if (memory_row.get("last_agent") == "CTA" and
-            memory_row.get("demo_stage") == "collecting_info"):
-
-            # simple heuristic: anything longer than 5 tokens & starting with a WH-word
-            first = user_text.split()[0] if user_text else ""
-            unrelated = first in {"what", "where", "how", "why", "when", "who"} or len(user_text.split()) > 5
-
-            if unrelated:
-                await upsert_conversation_memory(
-                    user_id=req.user_id,
+        # ========== 1. Fan-out: every independent lookup starts now ==========
+        # Routing below awaits only what the chosen branch needs; the rest is
+        # cancelled when the scope exits.
+        async with FanOut("message") as fan:
+            objection_t = fan.start("objection", contains_objection(req.query))
+            memory_t    = fan.start("memory",    snapshot.row())
+            last_bot_t  = fan.start("last_bot",  get_last_bot_messages(snapshot, 1))
+            summary_t   = fan.start("summary",   snapshot.summary())
+            intent_t    = fan.start("intent",    _classify_intent(req.query, summary_t))
+
+            # ========== 1a. Objection shortcut ==========
+            if await objection_t:
+                logging.info("Objection detected, routing to Objection Agent")
+                summary = await summary_t
+                response = await run_objection_agent(req.query, history=summary)
+                logging.info(f"Objection Agent response: {response}")
+                if not response or not isinstance(response, str):
+                    raise HTTPException(status_code=500, detail="Objection Agent returned invalid response")
+                               # → persist memory (not yet qualified)
+                await snapshot.save_turn(
+                    req.query, response,
                     memory={
-                        "intent": "General Inquiry",
+                        "intent": "Objection",
                         "product": "",
                         "service": "",
                         "qualified": False,
-                        "last_agent": "InfoAgent",
-                        "demo_stage": ""
-                    },
-                    history=req.history
+                        "last_agent": "ObjectionAgent"
+                    }
+                )
+                return ChatResponse(response=response, routed_agent="objection")
+
+            # =====================================================================
+            # 1b. DEMO-FLOW (follow-up agent) – Only for explicit demo requests and ongoing collections
+            # =====================================================================
+            # ------------------------------------------------------------------
+            # 1) pull last assistant line & memory
+            # ------------------------------------------------------------------
+            memory_row   = await memory_t or {}
+            assistant_ln = (await last_bot_t or [""])[0].lower()
+            user_text    = req.query.lower().strip()
+
+            # ------------------------------------------------------------------
+            # 2) demo intent detection (RapidFuzz + exact)
+            # ------------------------------------------------------------------
+            explicit_demo_request     = is_demo_request(user_text)
+            bot_offered_demo          = is_demo_request(assistant_ln)
+            user_accepted_offer       = is_positive_response(user_text)
+            demo_offered_and_accepted = bot_offered_demo and user_accepted_offer
+
+            # ------------------------------------------------------------------
+            # 3) when to launch contact-form CTA
+            # ------------------------------------------------------------------
+            if explicit_demo_request or demo_offered_and_accepted:
+                logging.info("Demo request detected, routing to CTA Agent")
+                reply = ("Great! I can get that demo scheduled. "
+                        "Please fill in the quick form for us so our team "
+                        "will reach out as soon as possible.")
+
+                await snapshot.save_turn(
+                    req.query, reply,
+                    memory={
+                        "intent":     "Demo Booking",
+                        "product":    "",
+                        "service":    "",
+                        "qualified":  True,
+                        "last_agent": "CTA",
+                        "demo_stage": "collecting_info"
+                    }
+                )
+                return ChatResponse(
+                    response     = reply,
+                    intent       = "Demo Booking",
+                    routed_agent = "CTA",
+                    action       = "contact_form"
                 )
 
-        # ========== 2. Intent classification ==========
-        conv_summary = await run_summary_agent(req.history)
-        intent = await run_intent_agent(req.query, conv_summary)
+            # ------------------------------------------------------------------
+            # 4) If user was mid-demo but asks unrelated question → clear state
+            # ------------------------------------------------------------------
+            if (memory_row.get("last_agent") == "CTA" and
+                memory_row.get("demo_stage") == "collecting_info"):
+
+                # simple heuristic: anything longer than 5 tokens & starting with a WH-word
+                first = user_text.split()[0] if user_text else ""
+                unrelated = first in {"what", "where", "how", "why", "when", "who"} or len(user_text.split()) > 5
+
+                if unrelated:
+                    await queue_conversation_memory(
+                        user_id=req.user_id,
+                        memory={
+                            "intent": "General Inquiry",
+                            "product": "",
+                            "service": "",
+                            "qualified": False,
+                            "last_agent": "InfoAgent",
+                            "demo_stage": ""
+                        }
+                    )
+
+            # ========== 2. Intent classification ==========
+            conv_summary = await summary_t
+            intent = await intent_t
         logging.info(f"Intent = {intent}")
 
         # --------- Cold ----------
@@ -213,19 +276,20 @@ async def chat_controller(req: QueryRequest):
             logging.info("Cold intent detected, routing to Info Agent")
             quick_ctx = await retrieve_context(req.query)
             if quick_ctx["chunks"]:
-                info_reply = await run_info_agent(req.query, quick_ctx["chunks"])
+                info_reply = await RESPONSE_CACHE.answer(
+                    "info", req.query, quick_ctx["meta"],
+                    lambda: run_info_agent(req.query, quick_ctx["chunks"]),
+                )
                 logging.info(f"Info Agent response: {info_reply}")
 
                 # Persist as Info Request (not qualified)
-                full_history = build_updated_history(req.history, req.query, info_reply)
-                await upsert_conversation_memory(
-                    user_id=req.user_id,
+                await snapshot.save_turn(
+                    req.query, info_reply,
                     memory={
                         "intent": "Info Request",
                         "qualified": False,
                         "last_agent": "InfoAgent"
-                    },
-                    history=full_history
+                    }
                 )
                 return ChatResponse(
                     response=info_reply,
@@ -234,15 +298,13 @@ async def chat_controller(req: QueryRequest):
                 )
             # Persist neutral response
             neutral_response = "Glad to help! Let me know what you're exploring — products, services, or just browsing."
-            full_history = build_updated_history(req.history, req.query, neutral_response)
-            await upsert_conversation_memory(
-                user_id=req.user_id,
+            await snapshot.save_turn(
+                req.query, neutral_response,
                 memory={
                     "intent": "Cold",
                     "qualified": False,
                     "last_agent": "InfoAgent"
-                },
-                history=full_history
+                }
             )
             return ChatResponse(
                 response=neutral_response,
@@ -258,15 +320,13 @@ async def chat_controller(req: QueryRequest):
                 logging.warning("No RAG context found.")
                 # Persist neutral response when no context found
                 neutral_response = "Tell me a bit more so I can point you to the right solution."
-                full_history = build_updated_history(req.history, req.query, neutral_response)
-                await upsert_conversation_memory(
-                    user_id=req.user_id,
+                await snapshot.save_turn(
+                    req.query, neutral_response,
                     memory={
                         "intent": intent,
                         "qualified": False,
                         "last_agent": "InfoAgent"
-                    },
-                    history=full_history
+                    }
                 )
                 return ChatResponse(
                     response=neutral_response,
@@ -278,7 +338,11 @@ async def chat_controller(req: QueryRequest):
 
             context_txt = "\n\n".join(context["chunks"])
             # logging.info(f"Sales Agent context text: {context_txt}")
-            reply = await run_sales_agent(req.query, context_txt, conv_summary)
+            reply = await RESPONSE_CACHE.answer(
+                "sales", req.query, context["meta"],
+                lambda: run_sales_agent(req.query, context["meta"], conv_summary),
+                vary=conv_summary or "",        # the prompt carries the visitor's summary
+            )
             # logging.info(f"Sales Agent response: {reply}")
 
             # Detect product / service mentioned
@@ -297,16 +361,14 @@ async def chat_controller(req: QueryRequest):
             logging.info(f"Sales Agent memory: {memory}")
 
             # ---------- Persist memory ----------
-            full_history = build_updated_history(req.history, req.query, reply)
-            await upsert_conversation_memory(
-                user_id=req.user_id,
-                memory=memory,
-                history=full_history
+            await snapshot.save_turn(
+                req.query, reply,
+                memory=memory
             )
 
             # ---------- Push hot lead if intent escalates ----------
             if await is_hot_lead(intent):
-                await sync_qualified_lead({
+                await queue_qualified_lead({
                     "user_id": req.user_id,
                     "email": None,                   # capture later
                     "intent": intent,
@@ -322,19 +384,17 @@ async def chat_controller(req: QueryRequest):
         if intent == "Ready to engage":
             # Persist & push lead immediately
             cta_response = "Awesome! Would you like to book a demo or speak to our expert team directly?"
-            full_history = build_updated_history(req.history, req.query, cta_response)
-            await upsert_conversation_memory(
-                user_id=req.user_id,
+            await snapshot.save_turn(
+                req.query, cta_response,
                 memory={
                     "intent": intent,
                     "product": "",
                     "service": "",
                     "qualified": True,
                     "last_agent": "CTA"
-                },
-                history=full_history
+                }
             )
-            await sync_qualified_lead({
+            await queue_qualified_lead({
                 "user_id": req.user_id,
                 "email": None,
                 "intent": intent,
@@ -353,15 +413,13 @@ async def chat_controller(req: QueryRequest):
 
         # --------- Fallback ----------
         fallback_response = "I'm here to help, but need a bit more detail. Could you tell me what you're looking for?"
-        full_history = build_updated_history(req.history, req.query, fallback_response)
-        await upsert_conversation_memory(
-            user_id=req.user_id,
+        await snapshot.save_turn(
+            req.query, fallback_response,
             memory={
                 "intent": "Unknown",
                 "qualified": False,
                 "last_agent": "FallbackAgent"
-            },
-            history=full_history
+            }
         )
         return ChatResponse(
             response=fallback_response,
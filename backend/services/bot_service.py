@@ -1,5 +1,4 @@
 from fastapi import FastAPI, Request
-from openai import OpenAI
 from pinecone import Pinecone, ServerlessSpec
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -15,14 +14,14 @@ import hashlib
 from pydantic import BaseModel
 import time
 from services.pinecone_service import store_documents
+from services.semantic_cache import RESPONSE_CACHE
+from services.llm_gateway import GATEWAY
 
 app = FastAPI()
 
 
-OPENAI_API_KEY = os.getenv("OPENAIIND")
 PINECONE_API_KEY = os.getenv("PINECONEIND")
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
 # Initialize Pinecone (replace with your API key and index name)
 pc = Pinecone(api_key=PINECONE_API_KEY)
 index_name = "indrasol-website-content"
@@ -41,10 +40,6 @@ index = pc.Index(index_name)
 hashes = {}
 
 
-# Initialize OpenAI
-def get_openai_client():
-    return openai_client
-
 def get_pinecone_index():
     return index
 
@@ -71,11 +66,10 @@ async def split_content(content, chunk_size=500):
     logging.info(f"Split content into {len(final_chunks)} chunks")
     return [chunk.strip() for chunk in final_chunks if chunk.strip()]
 
-# Create embeddings using OpenAI
+# Create embeddings using OpenAI (shared gateway – pooled, rate-limited)
 async def create_embedding(text):
-    client = get_openai_client()
-    response =  client.embeddings.create(input=text, model="text-embedding-ada-002")
-    return response.data[0].embedding
+    vectors, _ = await GATEWAY.embed([text], model="text-embedding-ada-002")
+    return vectors[0]
 
 
 # Compute hash of content
@@ -124,6 +118,7 @@ async def store_embeddings(chunks: list[str], namespace: str, source_id: str):
                 }],
                 namespace=namespace
             )
+            RESPONSE_CACHE.invalidate([vector_id])
             logging.info(f"Upserted vector {vector_id} in namespace '{namespace}'")
         except Exception as e:
             logging.error(f"Failed to upsert vector for {source_id}, chunk {i}: {e}")
@@ -225,6 +220,7 @@ async def refresh_url(url: str, content: str | None = None):
     
     # Upsert new vectors
     index.upsert(vectors=new_vectors, namespace="website")
+    RESPONSE_CACHE.invalidate(existing_ids + [v["id"] for v in new_vectors])
     
     # Update hash
     hash_value = compute_hash(content)
@@ -310,6 +306,7 @@ def delete_all_pinecone_data():
         
         # Delete all vectors using delete with delete_all=True
         index.delete(delete_all=True)
+        RESPONSE_CACHE.invalidate()
         
         logging.info("All vectors deleted from Pinecone index successfully.")
     except Exception as e:
@@ -0,0 +1,223 @@
+"""
+Cascade classifier for cheap one-word labels.
+
+Objection, factual-question and lead-stage checks each used to send
+every unclear message to a hosted model.  A Cascade asks three tiers in
+order and stops at the first that is sure enough:
+
+    1. rules    – regexes → label (confidence 1.0)
+    2. lexical  – in-process TF-IDF nearest seed example per label;
+                  answers when the best example is similar enough (the
+                  cascade's threshold), clearly ahead of every other
+                  label's best (MIN_MARGIN) and shares at least
+                  MIN_SHARED_TERMS terms with the text (memoised per text)
+    3. llm      – a small hosted model, only for what is left
+
+    OBJECTION = Cascade(
+        "objection",
+        rules    = [(r"\\b(expensive|budget)\\b", "OBJECTION")],
+        examples = {"OBJECTION": [...], "NO_OBJECTION": [...]},
+        prompt   = 'Classify … Return ONLY the label.\\n\\nUser: "{text}"',
+        default  = "NO_OBJECTION",
+        held_out = {"OBJECTION": [...], "NO_OBJECTION": [...]},
+    )
+    decision = await OBJECTION.classify(text)     # .label .tier .confidence
+
+Thresholds are cosine similarities: CASCADE_LOCAL_THRESHOLD, the
+cascade's own `threshold`, per cascade in CASCADE_THRESHOLDS.  Pick them
+with `evaluate()` on *held_out* examples (phrasings that are not seeds):
+the lowest threshold with no wrong in-process answer.  Its coverage is
+the expected in-process rate – `stats()` reports it next to the live
+count of calls each tier resolved (GET /v1/routes/mcp/classifiers).
+"""
+from __future__ import annotations
+
+import logging
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Pattern, Sequence, Tuple, Union
+
+from config.settings import CASCADE_LOCAL_THRESHOLD, CASCADE_THRESHOLDS
+from services.openai_service import run_openai_prompt
+
+_LOG = logging.getLogger("cascade")
+
+MIN_SIMILARITY   = 0.15         # below this the lexical tier has nothing to go on
+MIN_MARGIN       = 0.2          # over the best example of any other label
+MIN_SHARED_TERMS = 2            # one shared word ("who", "talk") is a coincidence
+MEMO_SIZE        = 2048
+
+_WORD = re.compile(r"[a-z0-9']+")
+_STOP = frozenset("a an and are as at be do for i in is it me my of on or our so the "
+                  "to we you your this that with".split())
+
+
+@dataclass(frozen=True, slots=True)
+class Decision:
+    label:      str
+    tier:       str             # rules | lexical | llm | error
+    confidence: float
+
+
+# ---------------------------------------------------------------------- #
+#  Tier 2 – lexical scorer
+# ---------------------------------------------------------------------- #
+def _terms(text: str) -> List[str]:
+    words = [w for w in _WORD.findall(text.lower()) if w not in _STOP]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class LexicalScorer:
+    """Nearest TF-IDF seed example; (label, similarity) or None when unsure."""
+
+    def __init__(self, examples: Mapping[str, Sequence[str]]):
+        docs = [(label, _terms(t)) for label, texts in examples.items() for t in texts]
+        df = Counter(term for _, terms in docs for term in set(terms))
+        self.idf = {t: math.log((1 + len(docs)) / (1 + n)) + 1 for t, n in df.items()}
+        self.labels = list(examples)
+        self.examples = [(label, self._vector(terms)) for label, terms in docs]
+
+    def _vector(self, terms: List[str]) -> Dict[str, float]:
+        tf = Counter(t for t in terms if t in self.idf)
+        return _unit({t: (1 + math.log(n)) * self.idf[t] for t, n in tf.items()})
+
+    def score(self, text: str) -> Optional[Tuple[str, float]]:
+        vec = self._vector(_terms(text))
+        if not vec:
+            return None
+        best: Dict[str, Tuple[float, int]] = {}            # label → (similarity, shared terms)
+        for label, example in self.examples:
+            sim = sum(w * example.get(t, 0.0) for t, w in vec.items())
+            if sim > best.get(label, (0.0, 0))[0]:
+                best[label] = (sim, len(vec.keys() & example.keys()))
+        ranked = sorted(best.items(), key=lambda kv: kv[1][0], reverse=True)
+        if not ranked:
+            return None
+        label, (top, shared) = ranked[0]
+        runner_up = ranked[1][1][0] if len(ranked) > 1 else 0.0
+        if top < MIN_SIMILARITY or top - runner_up < MIN_MARGIN or shared < MIN_SHARED_TERMS:
+            return None
+        return label, top
+
+
+def _unit(vec: Mapping[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    return {t: v / norm for t, v in vec.items()} if norm else {}
+
+
+# ---------------------------------------------------------------------- #
+#  Cascade
+# ---------------------------------------------------------------------- #
+class Cascade:
+    def __init__(
+        self,
+        name: str,
+        *,
+        rules:     Sequence[Tuple[Union[str, Pattern[str]], str]] = (),
+        examples:  Optional[Mapping[str, Sequence[str]]] = None,
+        prompt:    Optional[str] = None,           # "{text}" is filled in
+        default:   str,
+        labels:    Optional[Sequence[str]] = None, # accepted LLM answers (default: examples' labels)
+        model:     str = "gpt-4o-mini",
+        threshold: Optional[float] = None,
+        held_out:  Optional[Mapping[str, Sequence[str]]] = None,
+    ):
+        self.name      = name
+        self.rules     = [(re.compile(p, re.I) if isinstance(p, str) else p, label) for p, label in rules]
+        self.scorer    = LexicalScorer(examples) if examples else None
+        self.prompt    = prompt
+        self.default   = default
+        self.labels    = list(labels or (examples or {}).keys() or [default])
+        self.model     = model
+        self.threshold = float(CASCADE_THRESHOLDS.get(name, threshold or CASCADE_LOCAL_THRESHOLD))
+        self._memo: "OrderedDict[str, Optional[Tuple[str, float]]]" = OrderedDict()
+        self._counters = Counter()
+        self.expected  = self.evaluate(held_out) if held_out else None
+        CASCADES[name] = self
+
+    async def classify(self, text: str) -> Decision:
+        decision = await self._decide(text.strip())
+        self._counters[decision.tier] += 1
+        _LOG.debug("%s: %r → %s (%s, %.2f)", self.name, text[:60],
+                   decision.label, decision.tier, decision.confidence)
+        return decision
+
+    async def _decide(self, text: str) -> Decision:
+        for pattern, label in self.rules:
+            if pattern.search(text):
+                return Decision(label, "rules", 1.0)
+
+        scored = self._lexical(text)
+        if scored and scored[1] >= self.threshold:
+            return Decision(scored[0], "lexical", scored[1])
+
+        if self.prompt is None:
+            return Decision(scored[0] if scored else self.default, "lexical", scored[1] if scored else 0.0)
+        try:
+            answer = await run_openai_prompt(
+                self.prompt.format(text=text), model=self.model, max_tokens=5, temperature=0,
+                hedge=True,                     # a few tokens – a backup is cheap
+            )
+        except Exception as exc:
+            _LOG.warning("%s: hosted classifier failed (%s) – using %s", self.name, exc, self.default)
+            return Decision(scored[0] if scored else self.default, "error", 0.0)
+        return Decision(self._parse(answer), "llm", 1.0)
+
+    def _lexical(self, text: str) -> Optional[Tuple[str, float]]:
+        if self.scorer is None:
+            return None
+        key = text.lower()
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            self._counters["lexical_memo_hits"] += 1
+            return self._memo[key]
+        scored = self._memo[key] = self.scorer.score(text)
+        if len(self._memo) > MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return scored
+
+    def evaluate(self, held_out: Mapping[str, Sequence[str]]) -> Dict[str, Any]:
+        """Rules + lexical tier on labelled texts: share answered in-process, and how often right."""
+        total = answered = right = 0
+        for truth, texts in held_out.items():
+            for text in texts:
+                total += 1
+                label = next((l for p, l in self.rules if p.search(text)), None)
+                if label is None and self.scorer is not None:
+                    scored = self.scorer.score(text.strip())
+                    if scored and scored[1] >= self.threshold:
+                        label = scored[0]
+                if label is not None:
+                    answered += 1
+                    right += label == truth
+        return {
+            "examples":        total,
+            "in_process_rate": round(answered / total, 3) if total else 0.0,
+            "accuracy":        round(right / answered, 3) if answered else None,
+        }
+
+    def _parse(self, answer: str) -> str:
+        word = (answer or "").strip().strip(".\"'`").lower()
+        if not word:
+            return self.default
+        for label in sorted(self.labels, key=len, reverse=True):     # NO_OBJECTION before OBJECTION
+            if word.startswith(label.lower()) or label.lower().startswith(word):
+                return label
+        return self.default
+
+    def stats(self) -> Dict[str, Any]:
+        tiers = {t: self._counters[t] for t in ("rules", "lexical", "llm", "error")}
+        total = sum(tiers.values())
+        return {
+            **tiers,
+            "lexical_memo_hits": self._counters["lexical_memo_hits"],
+            "in_process_rate":   round((tiers["rules"] + tiers["lexical"]) / total, 3) if total else 0.0,
+            "threshold":         self.threshold,
+            "held_out":          self.expected,
+        }
+
+
+# Every cascade built in this worker process, by name
+CASCADES: Dict[str, Cascade] = {}
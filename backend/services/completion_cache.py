@@ -0,0 +1,222 @@
+"""
+Exact-match cache for chat completions.
+
+Sits under both OpenAI helpers (`openai_service.run_openai_prompt` and
+`openai_client_service.async_chat`).  The key is a hash of
+(model, messages, temperature, max_tokens); lookups go through tiers in
+order and a lower-tier hit is copied into the tiers above it:
+
+    MemoryTier   – per-worker LRU, microseconds
+    SQLiteTier   – optional, shared by all workers on the host and
+                   survives restarts (COMPLETION_CACHE_SQLITE_PATH)
+
+Policy per call (`cache=` on either helper):
+    None  (default) → cache only deterministic calls (temperature == 0)
+    True            → cache regardless of temperature (e.g. greetings)
+    False           → never cache
+`cache_ttl=` overrides COMPLETION_CACHE_TTL_SECONDS for that call.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.settings import (
+    COMPLETION_CACHE_TTL_SECONDS,
+    COMPLETION_CACHE_MAX_ENTRIES,
+    COMPLETION_CACHE_SQLITE_PATH,
+)
+
+_LOG = logging.getLogger("completion_cache")
+
+Completion = Tuple[str, Dict[str, Any]]          # (content, usage)
+
+
+# ──────────────────────────────────────────────────────────────────────
+#  Tiers
+# ──────────────────────────────────────────────────────────────────────
+class MemoryTier:
+    name = "memory"
+
+    def __init__(self, max_entries: int = COMPLETION_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple[float, Completion]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Completion]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Completion, ttl: int) -> None:
+        self._data[key] = (time.time() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteTier:
+    name = "sqlite"
+    _PURGE_EVERY = 500                              # stores between expiry sweeps
+
+    def __init__(self, path: str):
+        self.path   = path
+        self._lock  = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stores = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " key TEXT PRIMARY KEY, content TEXT NOT NULL,"
+                " usage TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+        return self._conn
+
+    async def get(self, key: str) -> Optional[Completion]:
+        def _get():
+            with self._lock:
+                return self._db().execute(
+                    "SELECT content, usage FROM completions WHERE key = ? AND expires > ?",
+                    (key, time.time()),
+                ).fetchone()
+        row = await asyncio.to_thread(_get)
+        return (row[0], json.loads(row[1])) if row else None
+
+    async def set(self, key: str, value: Completion, ttl: int) -> None:
+        content, usage = value
+
+        def _set():
+            with self._lock:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)",
+                    (key, content, json.dumps(usage), time.time() + ttl),
+                )
+                self._stores += 1
+                if self._stores % self._PURGE_EVERY == 0:
+                    db.execute("DELETE FROM completions WHERE expires <= ?", (time.time(),))
+                db.commit()
+        await asyncio.to_thread(_set)
+
+
+# ──────────────────────────────────────────────────────────────────────
+#  Cache front
+# ──────────────────────────────────────────────────────────────────────
+class CompletionCache:
+    def __init__(self, tiers: List[Any], default_ttl: int = COMPLETION_CACHE_TTL_SECONDS):
+        self.tiers       = tiers
+        self.default_ttl = default_ttl
+        self._counters   = {"misses": 0, "stores": 0, "errors": 0,
+                            **{f"hits_{t.name}": 0 for t in tiers}}
+
+    @staticmethod
+    def key_for(*, model: str, messages: list, temperature: float, max_tokens: int) -> str:
+        blob = json.dumps(
+            {"model": model, "messages": messages,
+             "temperature": temperature, "max_tokens": max_tokens},
+            sort_keys=True, ensure_ascii=False,
+        )
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    @staticmethod
+    def wanted(temperature: float, cache: Optional[bool]) -> bool:
+        return cache if cache is not None else temperature == 0
+
+    async def get(self, key: str) -> Optional[Completion]:
+        for depth, tier in enumerate(self.tiers):
+            try:
+                value = await tier.get(key)
+            except Exception as exc:
+                self._counters["errors"] += 1
+                _LOG.warning("%s tier read failed: %s", tier.name, exc)
+                continue
+            if value is not None:
+                self._counters[f"hits_{tier.name}"] += 1
+                for upper in self.tiers[:depth]:          # promote
+                    await upper.set(key, value, self.default_ttl)
+                return value
+        self._counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Completion, ttl: Optional[int] = None) -> None:
+        for tier in self.tiers:
+            try:
+                await tier.set(key, value, ttl or self.default_ttl)
+            except Exception as exc:
+                self._counters["errors"] += 1
+                _LOG.warning("%s tier write failed: %s", tier.name, exc)
+        self._counters["stores"] += 1
+
+    async def through(
+        self,
+        produce: Callable[[], Awaitable[Completion]],
+        *,
+        model: str,
+        messages: list,
+        temperature: float,
+        max_tokens: int,
+        cache: Optional[bool] = None,
+        cache_ttl: Optional[int] = None,
+        sink=None,
+    ) -> Completion:
+        """
+        Return a cached (content, usage) or call `produce()` and store it.
+        A hit is replayed into *sink* so streaming clients still get text.
+        """
+        if not self.wanted(temperature, cache):
+            return await produce()
+
+        key = self.key_for(model=model, messages=messages,
+                           temperature=temperature, max_tokens=max_tokens)
+        hit = await self.get(key)
+        if hit is not None:
+            content, usage = hit
+            if sink is not None:
+                await sink.feed(content)
+                await sink.flush()
+            return content, {**usage, "cached": True}
+
+        content, usage = await produce()
+        if content:
+            await self.set(key, (content, usage), cache_ttl)
+        return content, usage
+
+    def stats(self) -> Dict[str, Any]:
+        hits    = sum(v for k, v in self._counters.items() if k.startswith("hits_"))
+        lookups = hits + self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_rate":       round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.tiers[0]) if self.tiers else 0,
+            "tiers":          [t.name for t in self.tiers],
+        }
+
+
+def _default_tiers() -> List[Any]:
+    tiers: List[Any] = [MemoryTier()]
+    if COMPLETION_CACHE_SQLITE_PATH:
+        tiers.append(SQLiteTier(COMPLETION_CACHE_SQLITE_PATH))
+    return tiers
+
+
+# One cache per worker process (SQLite tier, if any, is shared)
+COMPLETION_CACHE = CompletionCache(_default_tiers())
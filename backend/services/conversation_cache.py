@@ -0,0 +1,191 @@
+"""
+In-process cache of live conversations for the MCP router.
+
+Every MCP turn used to read the memory row and the recent turns from
+Supabase and rebuild a Conversation from them.  Entries here hold the
+compact Conversation (mcp.schema) keyed by user_id – its structured form
+for the snapshot is derived on demand – and are written through after each turn (`store()` right after
+`snapshot.save_turn()`), so an active chat needs no history reads.
+
+Version = conversation_memory.turn_count.  A hit on an entry confirmed or
+written within CONVERSATION_CACHE_REVALIDATE_SECONDS costs no Supabase
+round-trip.  Staleness – another worker answered this visitor in
+between – is caught by:
+
+  • the write: the turn append returns the seq it stored.  At the seq we
+    asked for, the version is confirmed (`WRITE_BEHIND.on_turn_stored`);
+    moved to a later one, someone else wrote first and the entry is
+    invalidated (`WRITE_BEHIND.on_turn_conflict`)
+  • after the window, a one-column turn_count read on the next hit; a
+    stored count above ours → reload
+
+The cost when several workers serve one visitor (no sticky sessions):
+within the window a worker may answer from a history that misses the
+other workers' latest turns.  That reply is still stored – at the next
+free seq – and the entry is dropped as soon as the write reports the
+conflict, so the turn after it sees the full history.
+
+    conversation = await CONVERSATION_CACHE.conversation(snapshot)
+    ...dispatch, snapshot.save_turn(...)...
+    await CONVERSATION_CACHE.store(snapshot)
+
+Bounded: least-recently-used entries are evicted past
+CONVERSATION_CACHE_MAX_ENTRIES, idle ones expire after
+CONVERSATION_CACHE_TTL_SECONDS.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from config.settings import (
+    CONVERSATION_CACHE_MAX_ENTRIES,
+    CONVERSATION_CACHE_TTL_SECONDS,
+    CONVERSATION_CACHE_REVALIDATE_SECONDS,
+)
+from mcp.schema import Conversation
+from services.conversation_snapshot import ConversationSnapshot
+from services.supabase_service import get_turn_count
+from services.write_behind import WRITE_BEHIND
+
+_LOG = logging.getLogger("conversation_cache")
+
+
+@dataclass(slots=True)
+class _Entry:
+    conversation: Conversation
+    version:      int                       # turn_count the entry reflects
+    expires:      float
+    checked:      float                     # last time the version was confirmed
+
+
+class ConversationCache:
+    def __init__(
+        self,
+        *,
+        max_entries: int   = CONVERSATION_CACHE_MAX_ENTRIES,
+        ttl:         int   = CONVERSATION_CACHE_TTL_SECONDS,
+        revalidate:  float = CONVERSATION_CACHE_REVALIDATE_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self.revalidate  = revalidate
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._conflicted: set = set()           # invalidated while a turn was in flight
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidated": 0}
+
+    # ------------------------------------------------------------------ #
+    #  Public API
+    # ------------------------------------------------------------------ #
+    async def conversation(self, snapshot: ConversationSnapshot) -> Conversation:
+        """
+        A private copy of the visitor's Conversation (safe to append to).
+        On a hit the snapshot is primed, so save_turn() needs no reads.
+        """
+        user_id = snapshot.user_id
+        entry   = self._entries.get(user_id)
+        now     = time.monotonic()
+
+        if entry is not None and entry.expires <= now:
+            self._drop(user_id)
+            entry = None
+        if entry is not None and not await self._current(user_id, entry, now):
+            self._counters["stale"] += 1
+            self._drop(user_id)
+            entry = None
+
+        if entry is None:
+            self._counters["misses"] += 1
+            self._conflicted.discard(user_id)
+            entry = self._put(user_id, await snapshot.structured_history(),
+                              await snapshot.turn_count())
+        else:
+            self._counters["hits"] += 1
+            self._entries.move_to_end(user_id)
+            entry.expires = now + self.ttl
+            snapshot.prime(entry.conversation.to_structured(), entry.version)
+
+        return entry.conversation.copy()
+
+    async def store(self, snapshot: ConversationSnapshot) -> None:
+        """Write-through: cache the snapshot's state right after save_turn()."""
+        if snapshot.user_id in self._conflicted:       # our view lost a race – reload next turn
+            self._conflicted.discard(snapshot.user_id)
+            self._drop(snapshot.user_id)
+            return
+        self._put(snapshot.user_id, await snapshot.structured_history(),
+                  await snapshot.turn_count())
+
+    def confirm(self, user_id: str, version: int) -> None:
+        """A turn write reported *version* – current if it is ours, stale if newer."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        if version > entry.version:
+            self._counters["invalidated"] += 1
+            self._drop(user_id)
+        elif version == entry.version:
+            entry.checked = time.monotonic()
+
+    def invalidate(self, user_id: str) -> None:
+        if len(self._conflicted) >= self.max_entries:   # visitors who never came back
+            self._conflicted.clear()
+        self._conflicted.add(user_id)
+        if user_id in self._entries:
+            self._counters["invalidated"] += 1
+            self._drop(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+            "entries":  len(self._entries),
+            "capacity": self.max_entries,
+        }
+
+    # ------------------------------------------------------------------ #
+    #  Internals
+    # ------------------------------------------------------------------ #
+    async def _current(self, user_id: str, entry: _Entry, now: float) -> bool:
+        if now - entry.checked < self.revalidate:
+            return True
+        try:
+            stored = await get_turn_count(user_id)
+        except Exception as exc:
+            _LOG.warning("turn_count probe failed for %s – reloading: %s", user_id, exc)
+            return False
+        # below ours = our own writes still queued in write-behind
+        if stored > entry.version:
+            _LOG.info("Cached conversation for %s is stale (%s > %s)",
+                      user_id, stored, entry.version)
+            return False
+        entry.checked = now
+        return True
+
+    def _put(self, user_id: str, turns: List[Dict[str, Any]], version: int) -> _Entry:
+        now   = time.monotonic()
+        entry = _Entry(
+            conversation = Conversation.from_structured(user_id, turns),
+            version      = version,
+            expires      = now + self.ttl,
+            checked      = now,
+        )
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+        return entry
+
+    def _drop(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+
+
+# One cache per worker process
+CONVERSATION_CACHE = ConversationCache()
+WRITE_BEHIND.on_turn_conflict(CONVERSATION_CACHE.invalidate)
+WRITE_BEHIND.on_turn_stored(CONVERSATION_CACHE.confirm)
@@ -0,0 +1,223 @@
+"""
+Request-scoped view of one visitor's `conversation_memory` row.
+
+A turn used to hit Supabase several times for the same row (memory,
+then history for the last bot line, …).  A ConversationSnapshot loads the
+row and the recent turns once and memoises everything derived from them:
+
+    snap = ConversationSnapshot(user_id, history=req.history)
+    with snap.activate():                 # agents / skills can find it
+        row   = await snap.row()
+        last  = await snap.last_bot_messages(1)
+        summ  = await snap.summary()      # rolling summary from the row
+        await snap.save_turn(query, reply, memory={...})
+
+Concurrent callers (e.g. fan-out branches) share one in-flight load; a
+caller being cancelled only stops waiting – the load itself is cancelled
+once no caller is left (an abandoned summary is not paid for).
+"""
+from __future__ import annotations
+
+import asyncio
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config.settings import CONVERSATION_TURNS_LIMIT
+from services.supabase_service import get_conversation_memory, get_recent_turns, decode_history
+from services.detect_intent_service import detect_interest
+from services.write_behind import (
+    WRITE_BEHIND,
+    queue_conversation_memory,
+    queue_conversation_turns,
+)
+
+_CURRENT: ContextVar[Optional["ConversationSnapshot"]] = ContextVar(
+    "conversation_snapshot", default=None
+)
+
+
+class ConversationSnapshot:
+    def __init__(self, user_id: str, history: Optional[List[str]] = None):
+        self.user_id = user_id
+        self.request_history: List[str] = list(history or [])
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self._memo:  Dict[Any, Any] = {}
+
+    # ------------------------------------------------------------------ #
+    #  Context plumbing
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def current(user_id: Optional[str] = None) -> Optional["ConversationSnapshot"]:
+        """Active snapshot for this request (optionally only if it matches *user_id*)."""
+        snap = _CURRENT.get()
+        if snap is not None and user_id is not None and snap.user_id != user_id:
+            return None
+        return snap
+
+    @contextmanager
+    def activate(self):
+        token = _CURRENT.set(self)
+        try:
+            yield self
+        finally:
+            _CURRENT.reset(token)
+
+    # ------------------------------------------------------------------ #
+    #  Shared one-shot loads
+    # ------------------------------------------------------------------ #
+    async def _once(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # shield: a cancelled caller must not cancel a load others still await
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():             # nobody is waiting any more
+                    task.cancel()
+                    if self._tasks.get(key) is task:
+                        del self._tasks[key]    # the next caller starts afresh
+
+    async def row(self) -> Optional[Dict[str, Any]]:
+        """
+        The conversation_memory row (None for a new visitor), with any
+        writes still queued in WRITE_BEHIND laid over it.
+        """
+        async def _load() -> Optional[Dict[str, Any]]:
+            row     = await get_conversation_memory(self.user_id)
+            pending = WRITE_BEHIND.pending_memory(self.user_id)
+            if pending:
+                row = {**(row or {"user_id": self.user_id}), **pending}
+            return row
+
+        return await self._once("row", _load)
+
+    def update(self, fields: Dict[str, Any]) -> None:
+        """Merge a just-persisted patch so later reads in this request see it."""
+        task = self._tasks.get("row")
+        if task is None or not task.done() or task.exception() is not None:
+            return
+        row = task.result()
+        if row is None:
+            row = {"user_id": self.user_id}
+            self._tasks["row"] = _resolved(row)
+        row.update(fields)
+        self._memo.clear()
+
+    async def _turns(self) -> tuple[List[Dict[str, Any]], int]:
+        """(last CONVERSATION_TURNS_LIMIT turns oldest first, total turn count)"""
+        async def _load():
+            row, stored = await asyncio.gather(self.row(), get_recent_turns(self.user_id))
+            row   = row or {}
+            count = int(row.get("turn_count") or 0)
+
+            pending = WRITE_BEHIND.pending_turns(self.user_id)
+
+            if not (count or stored or pending) and row.get("conv_history"):
+                return await self._migrate_legacy(row["conv_history"])
+
+            by_seq = {t["seq"]: t for t in stored + pending}
+            turns = [by_seq[k] for k in sorted(by_seq)][-CONVERSATION_TURNS_LIMIT:]
+            if turns:
+                count = max(count, turns[-1]["seq"] + 1)
+            return turns, count
+
+        return await self._once("turns", _load)
+
+    def prime(self, turns: List[Dict[str, Any]], count: int) -> None:
+        """Serve turns already known to be current (conversation cache) – no read."""
+        self._tasks["turns"] = _resolved((list(turns), count))
+
+    async def _migrate_legacy(self, conv_history: list) -> tuple[List[Dict[str, Any]], int]:
+        """Row predates conversation_turns – serve its JSONB history and backfill."""
+        pairs = decode_history(conv_history, as_strings=False)
+        turns = [
+            {"seq": i, "id": f"legacy:{i}", "user": p.get("user", ""), "bot": p.get("bot", "")}
+            for i, p in enumerate(pairs)
+        ]
+        await queue_conversation_turns(self.user_id, turns)       # raises turn_count too
+        return turns[-CONVERSATION_TURNS_LIMIT:], len(turns)
+
+    async def save_turn(self, user_text: str, bot_text: str, memory: Dict[str, Any]) -> None:
+        """
+        Append one user/bot pair and queue the memory patch with it.
+        turn_count is not part of the patch: the database raises it with
+        the turn insert, so a concurrent turn from another worker can
+        neither overwrite it nor lose its own pair.
+        """
+        turns, count = await self._turns()
+        turn  = {"seq": count, "id": uuid.uuid4().hex, "user": user_text, "bot": bot_text}
+
+        await queue_conversation_turns(self.user_id, [turn])
+        if memory:
+            await queue_conversation_memory(self.user_id, memory)
+
+        self.update({**memory, "turn_count": count + 1})
+        self._tasks["turns"] = _resolved(((turns + [turn])[-CONVERSATION_TURNS_LIMIT:], count + 1))
+
+    # ------------------------------------------------------------------ #
+    #  Derived values (memoised)
+    # ------------------------------------------------------------------ #
+    async def structured_history(self) -> List[Dict[str, Any]]:
+        """Recent turns as [{"seq", "user", "bot"}], oldest first."""
+        turns, _ = await self._turns()
+        return turns
+
+    async def turn_count(self) -> int:
+        _, count = await self._turns()
+        return count
+
+    async def history_strings(self) -> List[str]:
+        if "strings" not in self._memo:
+            self._memo["strings"] = decode_history(await self.structured_history(), as_strings=True)
+        return self._memo["strings"]
+
+    async def last_bot_messages(self, count: int = 2) -> List[str]:
+        """Last *count* stored bot messages, lower-cased, newest first."""
+        key = ("last_bot", count)
+        if key not in self._memo:
+            bot_messages = []
+            for pair in reversed(await self.structured_history()):
+                if isinstance(pair, dict) and pair.get("bot"):
+                    bot_messages.append(pair["bot"].lower())
+                    if len(bot_messages) >= count:
+                        break
+            self._memo[key] = bot_messages
+        return self._memo[key]
+
+    async def summary(self) -> str:
+        """
+        Rolling summary persisted on the row (kept current off the critical
+        path by agents.summary_agent.update_rolling_summary).  Rows without
+        one yet fall back to summarising the tail of the request history.
+        """
+        from agents.summary_agent import run_summary_agent      # avoid import cycle
+
+        async def _load() -> str:
+            row = await self.row() or {}
+            if row.get("conv_summary"):
+                return row["conv_summary"]
+            return await run_summary_agent(self.request_history)
+
+        return await self._once("summary", _load)
+
+    async def interest(self, *extra: str) -> tuple[str, str]:
+        """(product, service) detected over the stored history plus *extra* text."""
+        key = ("interest", extra)
+        if key not in self._memo:
+            history_txt = "\n".join((await self.history_strings())[-30:])
+            self._memo[key] = detect_interest(history_txt, *extra)
+        return self._memo[key]
+
+
+def _resolved(value: Any) -> asyncio.Future:
+    fut = asyncio.get_event_loop().create_future()
+    fut.set_result(value)
+    return fut
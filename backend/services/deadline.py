@@ -0,0 +1,79 @@
+"""
+Per-turn latency budget.
+
+The router opens a budget for the turn; everything awaited inside it –
+the dispatcher, each skill, the OpenAI and Pinecone helpers – sees the
+same absolute deadline through a ContextVar and can ask what is left:
+
+    with turn_budget(MCP_TURN_BUDGET_SECONDS):
+        result = await dispatch(turn, convo)
+
+    timeout = clamp(skill.timeout)          # min(own timeout, time left)
+    resp    = await within(client_call())   # wait_for(…, remaining())
+
+Outside a budget `clamp()` / `within()` change nothing.  When the budget
+is what cut a call short, BudgetExhausted (a TimeoutError) is raised so
+callers can tell it from an ordinary timeout.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("turn_deadline", default=None)
+
+
+class BudgetExhausted(asyncio.TimeoutError):
+    """The turn's latency budget ran out."""
+
+
+@contextmanager
+def turn_budget(seconds: float):
+    """Deadline *seconds* from now (never later than an enclosing one)."""
+    deadline = time.monotonic() + seconds
+    outer = _DEADLINE.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _DEADLINE.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current turn (None when no budget is active)."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def clamp(timeout: Optional[float]) -> Optional[float]:
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+async def within(aw: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Await *aw* for at most min(*timeout*, remaining budget)."""
+    limit = clamp(timeout)
+    if limit is None:
+        return await aw
+    if limit <= 0:
+        if asyncio.iscoroutine(aw):
+            aw.close()                                  # never started
+        raise BudgetExhausted("turn budget exhausted")
+    try:
+        return await asyncio.wait_for(aw, limit)
+    except asyncio.TimeoutError:
+        if expired():
+            raise BudgetExhausted("turn budget exhausted") from None
+        raise
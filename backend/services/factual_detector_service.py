@@ -1,8 +1,7 @@
 import re
-from functools import lru_cache
 from typing import Final
 
-from services.openai_service import run_openai_prompt   # already retry-wrapped
+from services.cascade import Cascade
 
 # ── 1. Regex heuristics ────────────────────────────────────────────
 _WH_PREFIX: Final = r"^(where|what|when|who|which|how\s+(?:many|long|much)|do you|does it|is there|are there)"
@@ -14,12 +13,70 @@ _FACT_KEYWORDS: Final = (
 
 _regex_factual = re.compile(fr"{_WH_PREFIX}.*({ _FACT_KEYWORDS })", re.I)
 
-@lru_cache(maxsize=1024)
-def _regex_is_factual(text: str) -> bool:
-    return bool(_regex_factual.search(text.strip()))
 
+# ── 2. In-process scorer, then LLM fallback for nuance ─────────────
+_EXAMPLES = {
+    "FACTUAL": [
+        "where is your office",
+        "what certifications do you have",
+        "how long does setup take",
+        "is there a free trial",
+        "which cloud platforms do you support",
+        "how much does securetrack cost",
+        "do you integrate with jira",
+        "what time zone is your team in",
+        "how long is the demo",
+        "are you soc2 compliant",
+    ],
+    "NONFACTUAL": [
+        "we struggle with audit prep",
+        "I'm worried about ai risks in our product",
+        "our team is too small for this",
+        "just browsing",
+        "that sounds interesting",
+        "we need help securing our data pipelines",
+        "I want to talk to someone",
+        "what do you think about our approach",
+        "hello there",
+        "it seems expensive",
+    ],
+}
+
+# held-out phrasings (not seeds) – calibrate the threshold on these.
+# "how does securetrack work" asks for an explanation, not a fact; it
+# scores 0.64 against "how much does securetrack cost", hence 0.7:
+# 7 of 24 answered in-process, none wrong; the rest go to the LLM
+_HELD_OUT = {
+    "FACTUAL": [
+        "where is your office located",
+        "are you iso 27001 certified",
+        "is there a free trial for bizradar",
+        "how much does bizradar cost",
+        "do you support azure",
+        "how long does onboarding take",
+        "who founded indrasol",
+        "what certifications does your team hold",
+        "does securetrack integrate with slack",
+        "when was indrasol founded",
+        "what is the price of securetrack",
+    ],
+    "NONFACTUAL": [
+        "how does securetrack work",
+        "we are worried about compliance",
+        "hi",
+        "I want to talk to someone about pricing",
+        "our audits take forever",
+        "sounds interesting",
+        "we need help with cloud security",
+        "just looking around",
+        "it seems too expensive",
+        "what do you think we should do",
+        "our team is small",
+        "hello",
+        "I'm concerned about ai model risks",
+    ],
+}
 
-# ── 2. LLM fallback for nuance ─────────────────────────────────────
 _FALLBACK_PROMPT = """
 Classify the user's question as FACTUAL or NONFACTUAL.
 
@@ -28,21 +85,19 @@ NONFACTUAL = anything else (opinions, needs, pain points, objections, chit-chat)
 
 Return ONLY the label.
 
-User: "{q}"
+User: "{text}"
 """
 
-async def _llm_is_factual(text: str) -> bool:
-    try:
-        resp = await run_openai_prompt(
-            _FALLBACK_PROMPT.format(q=text.replace('"', "'")),
-            model="gpt-3.5-turbo-0125",
-            max_tokens=1,
-            temperature=0
-        )
-        return resp.strip().upper().startswith("FACTUAL")
-    except Exception:
-        # if LLM fails, fall back to heuristic decision
-        return False
+FACTUAL_CASCADE = Cascade(
+    "factual",
+    rules    = [(_regex_factual, "FACTUAL")],
+    examples = _EXAMPLES,
+    prompt   = _FALLBACK_PROMPT,
+    default  = "NONFACTUAL",
+    model    = "gpt-3.5-turbo-0125",
+    threshold = 0.7,
+    held_out = _HELD_OUT,
+)
 
 
 # ── 3. Public helper ──────────────────────────────────────────────
@@ -50,6 +105,4 @@ async def is_pure_factual(text: str) -> bool:
     """
     Returns True if message is probably a stand-alone factual query.
     """
-    if _regex_is_factual(text):
-        return True
-    return await _llm_is_factual(text)
+    return (await FACTUAL_CASCADE.classify(text.replace('"', "'"))).label == "FACTUAL"
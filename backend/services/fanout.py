@@ -0,0 +1,67 @@
+"""
+Fan-out helper – start independent lookups at once, await them in the
+order the caller's routing needs, cancel whatever is left when routing
+has made up its mind.
+
+    async with FanOut("chat") as fan:
+        objection = fan.start("objection", contains_objection(text))
+        memory    = fan.start("memory",    get_conversation_memory(uid))
+        if await objection:
+            ...                     # memory is cancelled on exit
+
+Unlike ``asyncio.TaskGroup`` a failing branch does NOT tear down its
+siblings: a branch the chosen route never awaits must not be able to
+fail the turn.  Exceptions surface only where a task is awaited.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from time import perf_counter
+from typing import Any, Awaitable, Dict
+
+_LOG = logging.getLogger("fanout")
+
+
+class FanOut:
+    def __init__(self, label: str):
+        self.label = label
+        self._tasks:   Dict[str, asyncio.Task] = {}
+        self._started: Dict[str, float] = {}
+        self._elapsed: Dict[str, float] = {}
+
+    async def __aenter__(self) -> "FanOut":
+        return self
+
+    async def __aexit__(self, *exc_info) -> bool:
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+        # collect results so no "exception was never retrieved" warnings
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._log_timings()
+        return False
+
+    # ------------------------------------------------------------------ #
+    def start(self, name: str, coro: Awaitable[Any]) -> asyncio.Task:
+        """Schedule *coro* immediately and return its task."""
+        self._started[name] = perf_counter()
+        task = asyncio.ensure_future(coro)
+        task.add_done_callback(lambda _t, n=name: self._mark_done(n))
+        self._tasks[name] = task
+        return task
+
+    def _mark_done(self, name: str) -> None:
+        self._elapsed[name] = perf_counter() - self._started[name]
+
+    def _log_timings(self) -> None:
+        parts = []
+        for name, task in self._tasks.items():
+            ms = int(self._elapsed.get(name, 0.0) * 1000)
+            if task.cancelled():
+                parts.append(f"{name}=cancelled@{ms}ms")
+            elif task.exception() is not None:
+                parts.append(f"{name}=error@{ms}ms")
+            else:
+                parts.append(f"{name}={ms}ms")
+        _LOG.info("fan-out[%s] %s", self.label, " ".join(parts))
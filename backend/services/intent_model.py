@@ -0,0 +1,278 @@
+"""
+Local intent classifier – nearest centroid over query embeddings.
+
+Every turn used to spend a large-model round-trip just to pick one of a
+handful of labels.  The labelled examples in
+knowledge_base/intent_examples.jsonl are embedded offline; one centroid
+per label is stored in knowledge_base/intent_centroids.json.  At request
+time the visitor's message is embedded (same model as retrieval, so the
+vector is usually already memoised) and compared with the centroids.
+Only when the softmax confidence of the best label is below
+INTENT_LOCAL_THRESHOLD does the caller fall back to the LLM.
+
+    label = await classify_intent(text)          # None → ask the LLM
+
+Offline commands (run from backend/):
+
+    python -m services.intent_model train   [--examples F] [--out F]
+    python -m services.intent_model report  [--examples F] [--threshold T]
+
+`report` scores the examples leave-one-out against their gold labels and
+against what the current LLM classifier answers, with latency for both.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import INTENT_LOCAL_THRESHOLD
+from services.pinecone_service import embed_text, EMBED_MODEL
+
+_LOG = logging.getLogger("intent_model")
+
+KB_DIR        = Path(__file__).parent.parent / "knowledge_base"
+EXAMPLES_PATH = KB_DIR / "intent_examples.jsonl"
+MODEL_PATH    = KB_DIR / "intent_centroids.json"
+
+SOFTMAX_TEMP = 0.05            # cosine gaps are small; sharpen before softmax
+
+
+# ──────────────────────────────────────────────────────────────────────
+#  Model
+# ──────────────────────────────────────────────────────────────────────
+class IntentModel:
+    def __init__(self, labels: List[str], centroids: np.ndarray, *,
+                 embed_model: str = EMBED_MODEL, meta: Optional[dict] = None):
+        self.labels      = labels
+        self.centroids   = centroids            # (n_labels, dim), unit rows
+        self.embed_model = embed_model
+        self.meta        = meta or {}
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, labels: List[str]) -> "IntentModel":
+        names = sorted(set(labels))
+        rows  = [_unit(vectors[[i for i, l in enumerate(labels) if l == n]].mean(axis=0))
+                 for n in names]
+        return cls(names, np.stack(rows), meta={
+            "examples":   len(labels),
+            "trained_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    def predict(self, vector: np.ndarray) -> Tuple[str, float]:
+        """(best label, softmax confidence) for a unit-normalised vector."""
+        return _best(self.centroids @ vector, self.labels)
+
+    # ---- persistence ---------------------------------------------------
+    @classmethod
+    def load(cls, path: Path = MODEL_PATH) -> Optional["IntentModel"]:
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text())
+        if data.get("embed_model") != EMBED_MODEL:
+            _LOG.warning("Intent model was trained with %s – retrain for %s",
+                         data.get("embed_model"), EMBED_MODEL)
+            return None
+        return cls(data["labels"], np.asarray(data["centroids"], dtype=np.float32),
+                   embed_model=data["embed_model"], meta=data.get("meta"))
+
+    def save(self, path: Path = MODEL_PATH) -> None:
+        path.write_text(json.dumps({
+            "embed_model": self.embed_model,
+            "labels":      self.labels,
+            "centroids":   [[round(float(x), 6) for x in row] for row in self.centroids],
+            "meta":        self.meta,
+        }))
+
+
+# ──────────────────────────────────────────────────────────────────────
+#  Request-time API
+# ──────────────────────────────────────────────────────────────────────
+_MODEL: Optional[IntentModel] = None
+_LOADED = False
+_COUNTERS = {"local": 0, "fallback": 0, "unavailable": 0}
+
+
+def _model() -> Optional[IntentModel]:
+    global _MODEL, _LOADED
+    if not _LOADED:
+        _LOADED = True
+        try:
+            _MODEL = IntentModel.load()
+        except Exception as exc:
+            _LOG.exception("Could not load intent model: %s", exc)
+        if _MODEL is None:
+            _LOG.info("No local intent model – every turn uses the LLM classifier")
+    return _MODEL
+
+
+async def classify_intent(
+    text: str,
+    accept: Optional[Iterable[str]] = None,
+    threshold: float = INTENT_LOCAL_THRESHOLD,
+) -> Optional[str]:
+    """
+    Local label for *text*, or None when the caller should ask the LLM
+    (no model, low confidence, or a label outside *accept*).
+    """
+    model = _model()
+    if model is None or not text.strip():
+        _COUNTERS["unavailable"] += 1
+        return None
+    try:
+        label, confidence = model.predict(_unit(await embed_text(text)))
+    except Exception as exc:
+        _LOG.warning("Local intent classification failed: %s", exc)
+        _COUNTERS["unavailable"] += 1
+        return None
+
+    if confidence < threshold or (accept is not None and label not in set(accept)):
+        _LOG.info("Local intent %s (%.2f) not confident – LLM fallback", label, confidence)
+        _COUNTERS["fallback"] += 1
+        return None
+    _LOG.info("Local intent %s (%.2f)", label, confidence)
+    _COUNTERS["local"] += 1
+    return label
+
+
+def stats() -> Dict[str, object]:
+    total = sum(_COUNTERS.values())
+    return {
+        **_COUNTERS,
+        "local_rate": round(_COUNTERS["local"] / total, 3) if total else 0.0,
+        "threshold":  INTENT_LOCAL_THRESHOLD,
+        "model":      (_MODEL.meta if _MODEL else None),
+    }
+
+
+# ──────────────────────────────────────────────────────────────────────
+#  Offline: train / report
+# ──────────────────────────────────────────────────────────────────────
+def _read_examples(path: Path) -> Tuple[List[str], List[str]]:
+    texts, labels = [], []
+    for line in path.read_text().splitlines():
+        if line.strip():
+            row = json.loads(line)
+            texts.append(row["text"])
+            labels.append(row["label"])
+    return texts, labels
+
+
+async def _embed_all(texts: List[str]) -> np.ndarray:
+    return np.stack([_unit(await embed_text(t)) for t in texts])
+
+
+async def train(examples: Path = EXAMPLES_PATH, out: Path = MODEL_PATH) -> IntentModel:
+    texts, labels = _read_examples(examples)
+    model = IntentModel.fit(await _embed_all(texts), labels)
+    model.save(out)
+    print(f"Trained {len(model.labels)} labels on {len(texts)} examples → {out}")
+    return model
+
+
+async def report(examples: Path = EXAMPLES_PATH,
+                 threshold: float = INTENT_LOCAL_THRESHOLD) -> dict:
+    """Leave-one-out accuracy + agreement with the LLM classifier, with latency."""
+    from agents.intent_agent import classify_with_llm          # avoid import cycle
+
+    texts, labels = _read_examples(examples)
+    names = sorted(set(labels))
+
+    embed_ms: List[float] = []
+    vectors = []
+    for t in texts:
+        t0 = time.perf_counter()
+        vectors.append(_unit(await embed_text(t)))
+        embed_ms.append((time.perf_counter() - t0) * 1000)
+    vectors = np.stack(vectors)
+
+    sums   = {n: vectors[[i for i, l in enumerate(labels) if l == n]].sum(axis=0) for n in names}
+    counts = {n: labels.count(n) for n in names}
+
+    rows, predict_ms, llm_ms = [], [], []
+    for i, (text, gold) in enumerate(zip(texts, labels)):
+        t0 = time.perf_counter()
+        centroids = []
+        for n in names:                                  # leave example i out
+            s, c = sums[n], counts[n]
+            if n == gold:
+                s, c = s - vectors[i], c - 1
+            centroids.append(_unit(s / c) if c else np.zeros_like(s))
+        local, conf = _best(np.stack(centroids) @ vectors[i], names)
+        predict_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        llm = await classify_with_llm(text, "")
+        llm_ms.append((time.perf_counter() - t0) * 1000)
+        rows.append((gold, local, conf, llm))
+
+    confident = [r for r in rows if r[2] >= threshold]
+    result = {
+        "examples":               len(rows),
+        "threshold":              threshold,
+        "local_accuracy":         _ratio(r[1] == r[0] for r in rows),
+        "llm_accuracy":           _ratio(r[3] == r[0] for r in rows),
+        "local_vs_llm_agreement": _ratio(r[1] == r[3] for r in rows),
+        "confident_share":        _ratio(r[2] >= threshold for r in rows),
+        "confident_accuracy":     _ratio(r[1] == r[0] for r in confident),
+        "latency_ms": {
+            "embed":   _percentiles(embed_ms),
+            "predict": _percentiles(predict_ms),
+            "llm":     _percentiles(llm_ms),
+        },
+        "misses": [
+            {"text": texts[i], "gold": g, "local": l, "confidence": round(c, 3), "llm": m}
+            for i, (g, l, c, m) in enumerate(rows) if l != g
+        ],
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return result
+
+
+# ──────────────────────────────────────────────────────────────────────
+#  helpers
+# ──────────────────────────────────────────────────────────────────────
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm else v
+
+
+def _best(sims: np.ndarray, labels: List[str]) -> Tuple[str, float]:
+    z = (sims - sims.max()) / SOFTMAX_TEMP
+    p = np.exp(z) / np.exp(z).sum()
+    top = int(np.argmax(p))
+    return labels[top], float(p[top])
+
+
+def _ratio(flags: Iterable[bool]) -> float:
+    flags = list(flags)
+    return round(sum(flags) / len(flags), 3) if flags else 0.0
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    return {"p50": round(float(np.percentile(values, 50)), 2),
+            "p95": round(float(np.percentile(values, 95)), 2)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train / evaluate the local intent classifier")
+    parser.add_argument("command", choices=["train", "report"])
+    parser.add_argument("--examples", type=Path, default=EXAMPLES_PATH)
+    parser.add_argument("--out", type=Path, default=MODEL_PATH)
+    parser.add_argument("--threshold", type=float, default=INTENT_LOCAL_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        asyncio.run(train(args.examples, args.out))
+    else:
+        asyncio.run(report(args.examples, args.threshold))
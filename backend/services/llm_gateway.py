@@ -0,0 +1,379 @@
+"""
+One async gateway for every OpenAI chat and embedding call.
+
+    content, usage = await GATEWAY.chat(messages, model="gpt-4.1",
+                                        temperature=0.2, max_tokens=350)
+    async for delta in GATEWAY.chat_stream(messages, model="gpt-4.1", usage=usage):
+        ...
+    vectors, usage = await GATEWAY.embed(["some text"], model="text-embedding-3-small")
+
+  • one AsyncOpenAI client over a shared, pooled httpx connection pool
+    (LLM_MAX_CONNECTIONS) – no thread pool, no per-module clients
+  • per-model lanes: a concurrency semaphore plus RPM / TPM token buckets
+    (LLM_DEFAULT_* or LLM_MODEL_LIMITS).  A request that would exceed the
+    budget waits its turn instead of earning a 429.  TPM is charged with
+    an estimate up front (prompt chars / 4 + max_tokens) and the unused
+    part is returned once the real usage is known.
+  • one retry policy: exponential back-off with jitter on timeouts,
+    connection errors, 429 and 5xx for up to LLM_RETRY_MAX_SECONDS
+    (streams are only retried until the first chunk)
+  • opt-in hedging for non-streamed chat (hedge=True or LLM_HEDGE): when
+    the first attempt has held its slot for longer than the
+    LLM_HEDGE_PERCENTILE of the model's recent latencies (both measured
+    from slot acquisition, so queueing is not slowness), an identical
+    second request starts; the first to finish wins and the other is
+    cancelled.  No hedge while the lane has callers waiting for capacity
+    or the call is retrying.  Each hedgeable call earns LLM_HEDGE_BUDGET
+    of a hedge, so extra requests stay under that share; a cancelled
+    loser's TPM estimate is counted as `lost_tokens`
+  • usage comes back as a plain dict and is aggregated per model in
+    `stats()` (served at GET /v1/routes/mcp/llm), hedge / win rates included
+
+Higher-level helpers (openai_client_service.async_chat,
+openai_service.run_openai_prompt, pinecone_service.embed_text) add the
+completion cache, token streaming and the turn deadline on top.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import backoff
+import httpx
+from openai import (AsyncOpenAI, APIConnectionError, APITimeoutError,
+                    InternalServerError, RateLimitError)
+
+from config.settings import (
+    OPENAI_API_KEY,
+    LLM_MAX_CONNECTIONS,
+    LLM_REQUEST_TIMEOUT_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+    LLM_DEFAULT_CONCURRENCY,
+    LLM_DEFAULT_RPM,
+    LLM_DEFAULT_TPM,
+    LLM_MODEL_LIMITS,
+    LLM_HEDGE,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_BUDGET,
+    LLM_HEDGE_MIN_SAMPLES,
+)
+
+_LOG = logging.getLogger("llm_gateway")
+
+RETRY_EXC = (APITimeoutError, APIConnectionError, RateLimitError, InternalServerError)
+
+LATENCY_WINDOW = 200            # recent chat latencies per model (hedge delay)
+MAX_HEDGE_CREDIT = 5.0          # unspent hedge budget that may pile up
+
+
+class _TokenBucket:
+    """*per_minute* units, refilled continuously; take() queues (FIFO) for capacity."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level    = self.capacity
+        self.rate     = per_minute / 60.0
+        self._stamp   = time.monotonic()
+        self._lock    = asyncio.Lock()
+
+    async def take(self, amount: float) -> None:
+        if self.capacity <= 0:                      # 0 → unlimited
+            return
+        amount = min(float(amount), self.capacity)  # oversized requests still pass
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                await asyncio.sleep((amount - self.level) / self.rate)
+
+    def give_back(self, amount: float) -> None:
+        if self.capacity > 0:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level  = min(self.capacity, self.level + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+
+class _Lane:
+    """Concurrency + RPM/TPM limits and usage counters for one model."""
+
+    def __init__(self, model: str, *, concurrency: int, rpm: int, tpm: int):
+        self.model     = model
+        self.limits    = {"concurrency": concurrency, "rpm": rpm, "tpm": tpm}
+        self._slots    = asyncio.Semaphore(max(1, concurrency))
+        self._rpm      = _TokenBucket(rpm)
+        self._tpm      = _TokenBucket(tpm)
+        self.in_flight = 0
+        self.waiting   = 0
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.latencies: "deque[float]" = deque(maxlen=LATENCY_WINDOW)
+        self._hedge_credit = 0.0
+
+    @asynccontextmanager
+    async def slot(self, estimate: int) -> AsyncIterator[Dict[str, Any]]:
+        """Wait for capacity; the caller fills the yielded dict with the usage."""
+        t0 = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._rpm.take(1)
+            await self._tpm.take(estimate)
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.counters["wait_seconds"] += time.monotonic() - t0
+        self.counters["requests"] += 1
+        self.in_flight += 1
+        usage: Dict[str, Any] = {}
+        try:
+            yield usage
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            spent = usage.get("total_tokens") or (
+                usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+            for fld in ("prompt_tokens", "completion_tokens"):
+                self.counters[fld] += usage.get(fld) or 0
+            if usage and spent < estimate:
+                self._tpm.give_back(estimate - spent)
+
+    # ---- hedging -------------------------------------------------------
+    def hedge_delay(self) -> Optional[float]:
+        """LLM_HEDGE_PERCENTILE of recent latencies (None until there are enough)."""
+        if len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(0, math.ceil(LLM_HEDGE_PERCENTILE / 100 * len(ordered)) - 1)
+        return ordered[rank]
+
+    def earn_hedge(self) -> None:
+        self.counters["hedgeable"] += 1
+        self._hedge_credit = min(MAX_HEDGE_CREDIT, self._hedge_credit + LLM_HEDGE_BUDGET)
+
+    def take_hedge(self) -> bool:
+        if self._hedge_credit < 1:
+            self.counters["hedges_denied"] += 1
+            return False
+        self._hedge_credit -= 1
+        self.counters["hedges"] += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.counters["requests"]
+        hedgeable, hedges = self.counters["hedgeable"], self.counters["hedges"]
+        delay = self.hedge_delay()
+        return {
+            **self.limits,
+            "in_flight":       self.in_flight,
+            "waiting":         self.waiting,
+            "requests":        int(requests),
+            "errors":          int(self.counters["errors"]),
+            "retries":         int(self.counters["retries"]),
+            "prompt_tokens":   int(self.counters["prompt_tokens"]),
+            "completion_tokens": int(self.counters["completion_tokens"]),
+            "avg_wait_ms":     round(self.counters["wait_seconds"] / requests * 1000, 1) if requests else 0.0,
+            "hedge": {
+                "delay_ms":  round(delay * 1000, 1) if delay is not None else None,
+                "hedgeable": int(hedgeable),
+                "hedged":    int(hedges),
+                "denied":    int(self.counters["hedges_denied"]),
+                "wins":      int(self.counters["hedge_wins"]),
+                "skipped":   int(self.counters["hedges_skipped"]),
+                "lost_tokens": int(self.counters["hedge_lost_tokens"]),
+                "hedge_rate": round(hedges / hedgeable, 3) if hedgeable else 0.0,
+                "win_rate":   round(self.counters["hedge_wins"] / hedges, 3) if hedges else 0.0,
+            },
+        }
+
+
+class _Run:
+    """One logical request (all its retries) inside a hedged call."""
+
+    __slots__ = ("attempts", "started")
+
+    def __init__(self) -> None:
+        self.attempts = 0
+        self.started  = asyncio.Event()                  # an attempt holds its slot
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        *,
+        api_key:         Optional[str] = OPENAI_API_KEY,
+        max_connections: int   = LLM_MAX_CONNECTIONS,
+        timeout:         float = LLM_REQUEST_TIMEOUT_SECONDS,
+        retry_seconds:   float = LLM_RETRY_MAX_SECONDS,
+    ):
+        self._http = httpx.AsyncClient(
+            limits  = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections),
+            timeout = timeout,
+        )
+        # retries are ours (one policy, visible in stats) – not the SDK's
+        self.client = AsyncOpenAI(api_key=api_key, http_client=self._http, max_retries=0)
+        self.retry_seconds = retry_seconds
+        self._lanes: Dict[str, _Lane] = {}
+
+    # ------------------------------------------------------------------ #
+    #  Calls
+    # ------------------------------------------------------------------ #
+    async def chat(self, messages: List[Dict[str, Any]], *, model: str,
+                   temperature: float = 0.4, max_tokens: int = 400,
+                   hedge: Optional[bool] = None) -> Tuple[str, Dict[str, Any]]:
+        """(content, usage) of one chat completion; *hedge* defaults to LLM_HEDGE."""
+        lane = self.lane(model)
+        estimate = _estimate(messages, max_tokens)
+
+        def _call(run: _Run) -> Awaitable[Tuple[str, Dict[str, Any]]]:
+            async def _attempt() -> Tuple[str, Dict[str, Any]]:
+                run.attempts += 1
+                async with lane.slot(estimate) as usage:
+                    run.started.set()
+                    t0 = time.monotonic()
+                    resp = await self.client.chat.completions.create(
+                        model=model, messages=messages,
+                        temperature=temperature, max_tokens=max_tokens,
+                    )
+                    lane.latencies.append(time.monotonic() - t0)
+                    usage.update(_usage(resp))
+                    return (resp.choices[0].message.content or "").strip(), dict(usage)
+            return self._retrying(lane, _attempt)
+
+        if LLM_HEDGE if hedge is None else hedge:
+            return await self._hedged(lane, _call, estimate)
+        return await _call(_Run())
+
+    async def chat_stream(self, messages: List[Dict[str, Any]], *, model: str,
+                          temperature: float = 0.4, max_tokens: int = 400,
+                          usage: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Content deltas as they arrive; *usage* (if given) is filled at the end."""
+        lane = self.lane(model)
+        async def _open():
+            return await self.client.chat.completions.create(
+                model=model, messages=messages,
+                temperature=temperature, max_tokens=max_tokens,
+                stream=True, stream_options={"include_usage": True},
+            )
+
+        async with lane.slot(_estimate(messages, max_tokens)) as spent:
+            stream = await self._retrying(lane, _open)
+            async for chunk in stream:
+                if chunk.usage:
+                    spent.update(chunk.usage.model_dump())
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            if usage is not None:
+                usage.update(spent)
+
+    async def embed(self, texts: List[str], *, model: str) -> Tuple[List[List[float]], Dict[str, Any]]:
+        """(one vector per text, usage)."""
+        lane = self.lane(model)
+
+        async def _attempt() -> Tuple[List[List[float]], Dict[str, Any]]:
+            async with lane.slot(sum(len(t) for t in texts) // 4 + 1) as usage:
+                resp = await self.client.embeddings.create(input=texts, model=model)
+                usage.update(_usage(resp))
+                return [d.embedding for d in resp.data], dict(usage)
+
+        return await self._retrying(lane, _attempt)
+
+    # ------------------------------------------------------------------ #
+    #  Plumbing
+    # ------------------------------------------------------------------ #
+    def lane(self, model: str) -> _Lane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            limits = LLM_MODEL_LIMITS.get(model, {})
+            lane = self._lanes[model] = _Lane(
+                model,
+                concurrency = int(limits.get("concurrency", LLM_DEFAULT_CONCURRENCY)),
+                rpm         = int(limits.get("rpm", LLM_DEFAULT_RPM)),
+                tpm         = int(limits.get("tpm", LLM_DEFAULT_TPM)),
+            )
+        return lane
+
+    async def _retrying(self, lane: _Lane, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        def _on_backoff(details):
+            lane.counters["retries"] += 1
+            _LOG.warning("OpenAI back-off (%s): attempt %s %s",
+                         lane.model, details["tries"], details["exception"])
+
+        retrying = backoff.on_exception(
+            backoff.expo, RETRY_EXC,
+            max_time=self.retry_seconds, jitter=backoff.full_jitter,
+            on_backoff=_on_backoff,
+        )(attempt)
+        return await retrying()
+
+    async def _hedged(self, lane: _Lane, call: Callable[[_Run], Awaitable[Any]],
+                      estimate: int) -> Any:
+        """*call*, plus an identical backup once its request runs past the hedge delay."""
+        lane.earn_hedge()
+        runs  = [_Run()]
+        first = asyncio.ensure_future(call(runs[0]))
+        tasks = [first]
+        try:
+            delay = lane.hedge_delay()
+            if delay is not None:
+                # the clock starts once the first attempt holds its slot
+                started = asyncio.ensure_future(runs[0].started.wait())
+                await asyncio.wait([first, started], return_when=asyncio.FIRST_COMPLETED)
+                started.cancel()
+                if not first.done():
+                    await asyncio.wait(tasks, timeout=delay)
+            if not first.done() and delay is not None:
+                if lane.waiting or runs[0].attempts > 1:     # queued demand / backing off
+                    lane.counters["hedges_skipped"] += 1
+                elif lane.take_hedge():
+                    _LOG.info("Hedging %s request after %.0f ms", lane.model, delay * 1000)
+                    runs.append(_Run())
+                    tasks.append(asyncio.ensure_future(call(runs[1])))
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):       # the original wins a tie
+                    if task.exception() is None:
+                        if task is not first:
+                            lane.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task, run in zip(tasks, runs):
+                if not task.done():
+                    task.cancel()                        # the loser
+                    if run.started.is_set():             # billed for what it sent
+                        lane.counters["hedge_lost_tokens"] += estimate
+
+    def stats(self) -> Dict[str, Any]:
+        return {model: lane.stats() for model, lane in sorted(self._lanes.items())}
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+def _estimate(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+    """Rough TPM charge before the call: ~4 chars per token + the completion cap."""
+    return sum(len(str(m.get("content", ""))) for m in messages) // 4 + max_tokens
+
+
+def _usage(resp: Any) -> Dict[str, Any]:
+    return resp.usage.model_dump() if getattr(resp, "usage", None) else {}
+
+
+# One gateway (client + connection pool) per worker process
+GATEWAY = LLMGateway()
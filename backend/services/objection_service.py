@@ -1,5 +1,5 @@
 import re
-from functools import lru_cache
+from services.cascade import Cascade
 
 # --- legacy keywords (fast, free) -----------
 _OBJECTION_KEYWORDS = [
@@ -22,31 +22,85 @@ security, integration, timeline, or "already using another vendor".
 
 Return ONLY the label.
 
-User: "{sentence}"
+User: "{text}"
 """
 
-@lru_cache(maxsize=512)   # memoise identical queries
-def _regex_hit(text: str) -> bool:
-    return bool(_regex_pattern.search(text))
+# --- seed phrases for the in-process scorer ---
+_EXAMPLES = {
+    "OBJECTION": [
+        "seems steep for our startup",
+        "we don't have the money for this right now",
+        "not sure this fits our stack",
+        "we're locked into a contract with another vendor",
+        "sounds like a lot of work to roll out",
+        "our security team would never sign off on that",
+        "maybe next year, not a priority now",
+        "we tried something similar and it didn't work",
+        "I doubt it integrates with our systems",
+        "we can build this in-house",
+    ],
+    "NO_OBJECTION": [
+        "tell me about securetrack",
+        "what services do you offer",
+        "can I book a demo",
+        "how does bizradar work",
+        "sounds great, what are the next steps",
+        "who are your customers",
+        "what do you do in ai security",
+        "I'd like to talk to an expert",
+        "do you have case studies",
+        "thanks, that helps",
+    ],
+}
 
-async def _llm_objection_check(text: str) -> bool:
-    """
-    One cheap OpenAI call (~1¢ per 1K tokens) that returns True/False.
-    """
-    prompt = _CLASSIFIER_PROMPT.format(sentence=text.strip())
-    try:
-        result = await run_openai_prompt(prompt, model="gpt-3.5-turbo-0125", max_tokens=1, temperature=0)
-        return result.strip().upper().startswith("OBJECTION")
-    except Exception as e:
-        # if LLM fails, opt-out to regex
-        return _regex_hit(text)
+# --- held-out phrasings (not seeds) – calibrate the threshold on these ---
+# 0.5: 9 of 24 answered in-process, none wrong; the rest go to the LLM
+_HELD_OUT = {
+    "OBJECTION": [
+        "that's way over our budget",
+        "we already have a vendor for this",
+        "not sure we can justify the cost",
+        "our team doesn't have time to implement this",
+        "I don't think it works with our setup",
+        "legal would have concerns",
+        "we'd rather build it ourselves",
+        "the timing isn't right for us",
+        "seems steep for a company our size",
+        "this looks complicated to integrate",
+        "we're happy with our current tool",
+        "we have no money set aside for this",
+    ],
+    "NO_OBJECTION": [
+        "who founded indrasol",
+        "I want to talk to someone about pricing",
+        "can we book a demo next week",
+        "tell me about bizradar",
+        "what industries do you work with",
+        "do you offer penetration testing",
+        "great, send me more info",
+        "how does securetrack work",
+        "I'd like to speak with an expert",
+        "what services do you have for ai",
+        "do you have any case studies in healthcare",
+        "thanks",
+    ],
+}
+
+# keywords → in-process scorer → gpt-3.5 only for what is left
+OBJECTION_CASCADE = Cascade(
+    "objection",
+    rules    = [(_regex_pattern, "OBJECTION")],
+    examples = _EXAMPLES,
+    prompt   = _CLASSIFIER_PROMPT,
+    default  = "NO_OBJECTION",
+    model    = "gpt-3.5-turbo-0125",
+    held_out = _HELD_OUT,
+)
 
 # PUBLIC API ------------------------------------------------------------------
 async def contains_objection(text: str) -> bool:
     """
-    Fast path: regex.  If it fires -> True (cheap).
-    Else call LLM for nuanced phrases ("Seems steep for our startup").
+    Keyword regex, then the in-process scorer, then one cheap OpenAI call
+    for nuanced phrases ("Seems steep for our startup") – see services.cascade.
     """
-    if _regex_hit(text):
-        return True
-    return await _llm_objection_check(text)
\ No newline at end of file
+    return (await OBJECTION_CASCADE.classify(text)).label == "OBJECTION"
\ No newline at end of file
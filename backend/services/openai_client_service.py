@@ -1,41 +1,134 @@
 # common/openai_client.py
-"""Shared OpenAI helper – async, retrying, typed."""
+"""Shared OpenAI helper – async, retrying, typed (calls go through services.llm_gateway)."""
 from __future__ import annotations
-import asyncio, logging, backoff
-from openai import AsyncOpenAI, APIError, APIConnectionError, APITimeoutError
-from config.settings import OPENAI_API_KEY
+import logging
+from services.llm_gateway import GATEWAY
+from services.token_stream import current_sink
+from services.completion_cache import COMPLETION_CACHE
+from services.deadline import within
+from services.single_flight import COMPLETION_FLIGHTS
 
 _LOG = logging.getLogger("openai")
-_CLIENT = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-_RETRY_EXC = (APITimeoutError, APIError, APIConnectionError)
 
-
-def _on_backoff(details):                       # nice log line for every retry
-    _LOG.warning("OpenAI back-off: attempt %s %s", details["tries"], details["exception"])
-
-
-@backoff.on_exception(backoff.expo, _RETRY_EXC,
-                      max_time=30, jitter=backoff.full_jitter,
-                      on_backoff=_on_backoff)
 async def async_chat(
     messages: list[dict],
     *,
     model: str = "gpt-4o-mini",
     temperature: float = 0.4,
-    max_tokens: int = 400
+    max_tokens: int = 400,
+    stream: bool = False,
+    cache: bool | None = None,
+    cache_ttl: int | None = None,
+    hedge: bool | None = None
 ) -> tuple[str, dict]:
     """
     Coroutine – returns (content, usage_stats)
 
     `usage_stats` is already a plain dict → safe to JSON-serialise if you
     want to store per-request token counts.
+
+    With ``stream=True`` and a TokenStream active for the request, deltas
+    are forwarded to the client as they arrive (no retry once streaming).
+
+    ``cache`` / ``cache_ttl`` control the completion cache: by default only
+    temperature-0 calls are cached; pass ``cache=True`` / ``False`` to force.
+
+    Inside a turn budget (services.deadline) the call – retries included –
+    is abandoned when the budget runs out (raises BudgetExhausted).
+
+    Identical calls already in flight are shared – see chat_completion().
+
+    ``hedge=True`` sends a backup request when the call is slower than is
+    usual for the model (non-streamed calls only; default LLM_HEDGE) – see
+    services.llm_gateway.
     """
-    resp = await _CLIENT.chat.completions.create(
-        model         = model,
-        messages      = messages,
-        temperature   = temperature,
-        max_tokens    = max_tokens
-    )
-    usage = resp.usage.model_dump() if resp.usage else {}
-    return resp.choices[0].message.content.strip(), usage
+    sink = current_sink() if stream else None
+    return await within(chat_completion(
+        messages, model=model, temperature=temperature, max_tokens=max_tokens,
+        cache=cache, cache_ttl=cache_ttl, sink=sink, hedge=hedge,
+    ))
+
+
+async def chat_completion(
+    messages: list[dict],
+    *,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    cache: bool | None = None,
+    cache_ttl: int | None = None,
+    sink=None,
+    hedge: bool | None = None
+) -> tuple[str, dict]:
+    """
+    Completion path shared by async_chat and run_openai_prompt:
+    single-flight → completion cache → gateway (streamed into *sink*).
+
+    Concurrent identical calls (same model / messages / temperature /
+    max_tokens) share one upstream request; a caller that got another's
+    result has the text replayed into its own *sink*, and its usage is
+    marked ``coalesced`` so the tokens are not counted twice.
+    """
+    async def _produce() -> tuple[str, dict]:
+        if sink is not None:
+            return await stream_to_sink(sink, messages, model=model,
+                                        temperature=temperature, max_tokens=max_tokens)
+        return await _complete(messages, model=model, temperature=temperature,
+                               max_tokens=max_tokens, hedge=hedge)
+
+    key = COMPLETION_CACHE.key_for(model=model, messages=messages,
+                                   temperature=temperature, max_tokens=max_tokens)
+    (content, usage), shared = await COMPLETION_FLIGHTS.do(key, lambda: COMPLETION_CACHE.through(
+        _produce, model=model, messages=messages, temperature=temperature,
+        max_tokens=max_tokens, cache=cache, cache_ttl=cache_ttl, sink=sink,
+    ))
+    if not shared:
+        return content, usage
+    if sink is not None:
+        await sink.feed(content)
+        await sink.flush()
+    return content, {**usage, "coalesced": True}
+
+
+async def _complete(
+    messages: list[dict],
+    *,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    hedge: bool | None = None
+) -> tuple[str, dict]:
+    # pooled, rate-limited, retried (and optionally hedged) by the gateway
+    return await GATEWAY.chat(messages, model=model, temperature=temperature,
+                              max_tokens=max_tokens, hedge=hedge)
+
+
+async def async_chat_stream(
+    messages: list[dict],
+    *,
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.4,
+    max_tokens: int = 400,
+    usage: dict | None = None
+):
+    """
+    Async generator – yields content deltas as they arrive.
+
+    Pass a dict as *usage* to have it filled with the token counts that
+    OpenAI reports in the final chunk.
+    """
+    async for delta in GATEWAY.chat_stream(messages, model=model, temperature=temperature,
+                                           max_tokens=max_tokens, usage=usage):
+        yield delta
+
+
+async def stream_to_sink(sink, messages: list[dict], **kwargs) -> tuple[str, dict]:
+    """Pipe a streamed completion into *sink*; returns (content, usage) like async_chat."""
+    usage: dict = {}
+    parts: list[str] = []
+    async for delta in async_chat_stream(messages, usage=usage, **kwargs):
+        parts.append(delta)
+        await sink.feed(delta)
+    await sink.flush()
+    return "".join(parts).strip(), usage
@@ -1,51 +1,42 @@
-import os, asyncio,backoff, logging
+import logging
 from config.logging import setup_logging
-from config.settings import OPENAI_API_KEY
-from openai import OpenAI, APIError, APIConnectionError, APITimeoutError
+from services.token_stream import current_sink
+from services.openai_client_service import chat_completion
+from services.deadline import within
+from services.prompt_registry import PROMPTS
 
 setup_logging()
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
-    
-def _log_backoff(details):
-    logging.warning(
-        "OpenAI retry %s for %s: %s",
-        details["tries"],
-        details["target"].__name__,
-        details["exception"]
-    )
-
-@backoff.on_exception(
-    backoff.expo,                                 # exponential 1,2,4,8…
-    (APITimeoutError, APIError, APIConnectionError),
-    max_time=20,
-    jitter=backoff.full_jitter,
-    on_backoff=logging.exception
-)
-def _sync_completion(model: str, messages: list, temperature: float, max_tokens: int):
-    return openai_client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
-        max_tokens=max_tokens
-    )
 
 async def run_openai_prompt(
     prompt: str,
     model: str = "gpt-4o",
     temperature: float = 0.7,
     max_tokens: int = 300,
-    system_prompt: str = "You are a helpful AI assistant."
+    system_prompt: str = "You are a helpful AI assistant.",
+    stream: bool = False,
+    cache: bool | None = None,
+    cache_ttl: int | None = None,
+    template: str | None = None,
+    hedge: bool | None = None
 ) -> str:
-    resp = await asyncio.to_thread(
-        _sync_completion,
-        model=model,
-        messages=[
+    if template:
+        # static template (services.prompt_registry) leads, *prompt* is only
+        # the per-call part – identical prefixes across calls
+        messages = PROMPTS.messages(template, prompt, persona=system_prompt)
+    else:
+        messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt}
-        ],
-        temperature=temperature,
-        max_tokens=max_tokens
-    )
-    return resp.choices[0].message.content.strip()
\ No newline at end of file
+        ]
+    # stream=True: forward tokens when the request is served as SSE
+    sink = current_sink() if stream else None
+
+    # identical in-flight calls are shared, temperature-0 calls are cached by
+    # default (cache=True/False overrides); async, pooled and rate-limited by
+    # services.llm_gateway; bounded by the turn budget (services.deadline)
+    content, _ = await within(chat_completion(
+        messages, model=model, temperature=temperature, max_tokens=max_tokens,
+        cache=cache, cache_ttl=cache_ttl, sink=sink, hedge=hedge,
+    ))
+    return content
\ No newline at end of file
@@ -2,33 +2,45 @@
 Pinecone service – async batching, retry, rich metadata
 """
 import os, asyncio, logging, hashlib
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 
 from tenacity import retry, wait_exponential, stop_after_attempt
-from openai import OpenAI
 
 from pinecone import Pinecone, ServerlessSpec
-from config.settings import PINECONE_API_KEY,OPENAI_API_KEY
+from config.settings import PINECONE_API_KEY
+from services.deadline import within
+from services.llm_gateway import GATEWAY
+from services.single_flight import EMBEDDING_FLIGHTS
 
 # ── constants ─────────────────────────────────────────────────────────
 EMBED_MODEL  = "text-embedding-3-small"   # 1536-d, 3× Ada quality
 EMBED_DIM    = 1536
 BATCH_SIZE   = 100
+EMBED_CACHE_SIZE = 512                     # recent query embeddings kept per worker
 
 logger = logging.getLogger("pinecone_service")
 
-# ── OpenAI client (reuse global) ──────────────────────────────────────
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# ── Embeddings (shared services.llm_gateway client) ───────────────────
+_embed_cache: "OrderedDict[str, List[float]]" = OrderedDict()
 
 async def embed_text(text: str) -> List[float]:
-    """Returns 1536-d embedding list."""
-    resp = await asyncio.to_thread(
-        lambda: openai_client.embeddings.create(
-            input=text,
-            model=EMBED_MODEL
-        )
+    """
+    Returns 1536-d embedding list (recent texts are memoised; concurrent
+    requests for the same text share one call).
+    """
+    cached = _embed_cache.get(text)
+    if cached is not None:
+        _embed_cache.move_to_end(text)
+        return cached
+
+    (vectors, _), _ = await within(             # bounded by the turn budget
+        EMBEDDING_FLIGHTS.do(text, lambda: GATEWAY.embed([text], model=EMBED_MODEL))
     )
-    return resp.data[0].embedding
+    _embed_cache[text] = vectors[0]
+    if len(_embed_cache) > EMBED_CACHE_SIZE:
+        _embed_cache.popitem(last=False)
+    return vectors[0]
 
 # ── Pinecone client & index ───────────────────────────────────────────
 pc  = Pinecone(api_key=PINECONE_API_KEY)
@@ -67,10 +79,13 @@ async def store_documents(
     doc_type: str = "benefit"
 ):
     """Batch-upsert text chunks with rich metadata."""
-    batch = []
+    from services.semantic_cache import RESPONSE_CACHE      # avoid import cycle
+
+    batch, ids = [], []
     for i, chunk in enumerate(chunks):
         vec = await embed_text(chunk)
         vid = f"{hashlib.md5((source_id + str(i)).encode()).hexdigest()}"
+        ids.append(vid)
         batch.append({
             "id": vid,
             "values": vec,
@@ -86,6 +101,7 @@ async def store_documents(
             batch.clear()
     if batch:
         _upsert_batch(batch, namespace)
+    RESPONSE_CACHE.invalidate(ids)          # answers built on the old text
     logger.info("Upserted %s vectors in '%s'", len(chunks), namespace)
 
 async def query_pinecone(
@@ -94,11 +110,12 @@ async def query_pinecone(
     filters: Optional[Dict[str, Any]] = None,
     top_k: int = 5
 ) -> List[Dict[str, Any]]:
-    """Returns list of matches with metadata."""
+    """Returns list of matches with metadata (within the turn budget, if any)."""
     vec = await embed_text(query)
-    res = _query(vec, top_k, namespace, filters or {})
+    res = await within(asyncio.to_thread(_query, vec, top_k, namespace, filters or {}))
     return [
         {
+            "id": m["id"],
             "text": m["metadata"]["text"],
             "source": m["metadata"].get("source"),
             "category": m["metadata"].get("category"),
@@ -0,0 +1,146 @@
+"""
+Prompt templates, loaded once per worker.
+
+Agents and skills used to open() their prompt file on every call and
+splice the template and the visitor's text into one user message.  The
+registry reads `prompts/*.txt` and `skills/*/` templates at import time
+and renders calls so the static part is always the same leading segment:
+
+    messages = PROMPTS.messages("skills/sales/sales_prompt", dynamic)
+    # [{"role": "system", "content": <persona + template>},   ← identical every call
+    #  {"role": "user",   "content": dynamic}]                 ← message, RAG, history
+
+  • names are paths relative to backend/ without the suffix
+    ("prompts/intent_prompt", "skills/objection/prompt")
+  • a file whose mtime changed is re-read on the next use (checked at most
+    every PROMPT_RELOAD_SECONDS) – edit a prompt without a restart
+  • `stats()` gives per-template token counts (GET /v1/routes/mcp/prompts);
+    OpenAI only discounts cached prefixes of PREFIX_CACHE_MIN_TOKENS or
+    more, `cacheable` says which prefixes qualify
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.settings import PROMPT_RELOAD_SECONDS
+from services.tokens import count_tokens, exact
+
+_LOG = logging.getLogger("prompt_registry")
+
+ROOT     = Path(__file__).resolve().parent.parent
+PATTERNS = ("prompts/*.txt", "skills/*/*.txt", "skills/*/prompt.md")
+
+PREFIX_CACHE_MIN_TOKENS = 1024
+DEFAULT_PERSONA = "You are a helpful AI assistant."
+
+
+@dataclass(slots=True)
+class PromptTemplate:
+    name:    str
+    path:    Path
+    text:    str
+    mtime:   float
+    tokens:  int
+    checked: float = field(default_factory=time.monotonic)
+    loads:   int   = 1
+    uses:    int   = 0
+
+
+class PromptRegistry:
+    def __init__(self, root: Path = ROOT, *, reload_seconds: float = PROMPT_RELOAD_SECONDS):
+        self.root = root
+        self.reload_seconds = reload_seconds
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    # ------------------------------------------------------------------ #
+    #  Loading
+    # ------------------------------------------------------------------ #
+    def load(self) -> None:
+        """(Re-)scan PATTERNS under root."""
+        for pattern in PATTERNS:
+            for path in sorted(self.root.glob(pattern)):
+                self._read(self._name(path), path)
+        _LOG.info("Loaded %d prompt templates", len(self._templates))
+
+    def get(self, name: str) -> PromptTemplate:
+        tmpl = self._templates.get(name)
+        if tmpl is None:                                # added after start-up
+            path = next((p for p in (self.root / f"{name}.txt", self.root / f"{name}.md")
+                         if p.is_file()), None)
+            if path is None:
+                raise FileNotFoundError(f"No prompt template {name!r} under {self.root}")
+            tmpl = self._read(name, path)
+        elif time.monotonic() - tmpl.checked >= self.reload_seconds:
+            tmpl = self._refresh(tmpl)
+        tmpl.uses += 1
+        return tmpl
+
+    def _refresh(self, tmpl: PromptTemplate) -> PromptTemplate:
+        tmpl.checked = time.monotonic()
+        try:
+            mtime = tmpl.path.stat().st_mtime
+        except OSError:                                 # deleted – keep serving the last copy
+            return tmpl
+        if mtime != tmpl.mtime:
+            _LOG.info("Prompt %s changed on disk – reloading", tmpl.name)
+            tmpl = self._read(tmpl.name, tmpl.path)
+        return tmpl
+
+    def _read(self, name: str, path: Path) -> PromptTemplate:
+        text = path.read_text(encoding="utf-8").strip()
+        with self._lock:
+            old = self._templates.get(name)
+            tmpl = self._templates[name] = PromptTemplate(
+                name, path, text, path.stat().st_mtime, count_tokens(text),
+                loads = old.loads + 1 if old else 1,
+                uses  = old.uses if old else 0,
+            )
+        return tmpl
+
+    def _name(self, path: Path) -> str:
+        return path.relative_to(self.root).with_suffix("").as_posix()
+
+    # ------------------------------------------------------------------ #
+    #  Rendering
+    # ------------------------------------------------------------------ #
+    def text(self, name: str) -> str:
+        return self.get(name).text
+
+    def system(self, name: str, persona: Optional[str] = DEFAULT_PERSONA) -> str:
+        """The static segment: *persona* line, then the template."""
+        text = self.text(name)
+        return f"{persona}\n\n{text}" if persona else text
+
+    def messages(self, name: str, dynamic: str, *,
+                 persona: Optional[str] = DEFAULT_PERSONA) -> List[Dict[str, str]]:
+        """Static template as the system message, everything per-call last."""
+        return [
+            {"role": "system", "content": self.system(name, persona)},
+            {"role": "user",   "content": dynamic},
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tokenizer": "tiktoken" if exact() else "chars/4",
+            "templates": {
+                name: {
+                    "tokens":    t.tokens,
+                    "chars":     len(t.text),
+                    "cacheable": t.tokens >= PREFIX_CACHE_MIN_TOKENS,
+                    "loads":     t.loads,
+                    "uses":      t.uses,
+                }
+                for name, t in sorted(self._templates.items())
+            },
+        }
+
+
+# One set of templates per worker process
+PROMPTS = PromptRegistry()
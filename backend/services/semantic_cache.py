@@ -0,0 +1,272 @@
+"""
+Semantic response cache for RAG answers (info / sales).
+
+Visitors keep asking the same few questions in slightly different words.
+An answer is reused when
+
+  • the new query's embedding is within SEMANTIC_CACHE_THRESHOLD (cosine)
+    of a cached query, **and**
+  • retrieval returned the same chunk IDs and the same `vary` text, under
+    the same knowledge-base version (context key),
+
+so a hit skips the gpt-4.1 completion entirely.  Entries expire after
+SEMANTIC_CACHE_TTL_SECONDS, the least-recently-used ones are evicted past
+SEMANTIC_CACHE_MAX_ENTRIES, and ingestion calls `invalidate()` with the
+chunk IDs it rewrote.
+
+Each worker has its own cache.  `invalidate()` drops the local entries
+and bumps the shared version in Supabase (knowledge_base_version); every
+worker re-reads it at most every SEMANTIC_CACHE_VERSION_SECONDS on lookup
+and clears its entries when it moved, so replaced chunks stop being
+served everywhere within that window.  While the version can't be read
+the cache is bypassed.
+
+    reply = await RESPONSE_CACHE.answer(
+        "info", query, ctx["meta"],
+        lambda: run_info_agent(query, ctx["chunks"]),
+    )
+
+Answers are shared across visitors.  A reply whose prompt carries
+anything about the visitor (conversation summary, intent, …) must pass it
+as `vary`, so it is only reused for a visitor in the same state:
+
+    reply = await RESPONSE_CACHE.answer(
+        "sales", query, ctx["meta"],
+        lambda: run_sales_agent(query, ctx["meta"], summary),
+        vary=summary,
+    )
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config.settings import (
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL_SECONDS,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_VERSION_SECONDS,
+)
+from services.pinecone_service import embed_text
+from services.supabase_service import bump_knowledge_base_version, get_knowledge_base_version
+
+_LOG = logging.getLogger("semantic_cache")
+
+
+@dataclass(slots=True)
+class _Entry:
+    scope:       str
+    context_key: str
+    vector:      np.ndarray               # unit-normalised query embedding
+    answer:      str
+    chunk_ids:   frozenset
+    expires:     float
+
+
+def context_key(chunk_ids: Iterable[str], vary: str = "", version: int = 0) -> str:
+    """Order-independent hash of the retrieved chunk IDs (plus *vary* and the KB version)."""
+    parts = [*sorted(chunk_ids), "\x1e", vary, "\x1e", str(version)]
+    return hashlib.sha1("\x1f".join(parts).encode()).hexdigest()
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        *,
+        threshold:   float = SEMANTIC_CACHE_THRESHOLD,
+        ttl:         int   = SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries: int   = SEMANTIC_CACHE_MAX_ENTRIES,
+        version_ttl: float = SEMANTIC_CACHE_VERSION_SECONDS,
+    ):
+        self.threshold   = threshold
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self.version_ttl = version_ttl
+        self._version: Optional[int] = None               # shared knowledge-base version
+        self._version_read = float("-inf")
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()     # LRU order
+        self._by_context: Dict[tuple, set] = defaultdict(set)        # (scope, key) → entry ids
+        self._next_id = 0
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidated": 0}
+        )
+
+    # ------------------------------------------------------------------ #
+    #  Public API
+    # ------------------------------------------------------------------ #
+    async def answer(
+        self,
+        scope: str,
+        query: str,
+        matches: List[Dict[str, Any]],
+        compute: Callable[[], Awaitable[str]],
+        *,
+        vary: str = "",
+    ) -> str:
+        """
+        Cached answer for *query* over *matches*, else `compute()` and store
+        it.  *vary*: per-visitor prompt input the answer depends on.
+        """
+        chunk_ids = [m["id"] for m in matches if m.get("id")]
+        if not chunk_ids:
+            return await compute()
+
+        version = await self._kb_version()
+        if version is None:
+            return await compute()
+        ckey = context_key(chunk_ids, vary, version)
+        try:
+            vector = _normalise(await embed_text(query))
+        except Exception as exc:
+            _LOG.warning("Embedding failed – bypassing cache: %s", exc)
+            return await compute()
+
+        cached = self.lookup(scope, vector, ckey)
+        if cached is not None:
+            return cached
+
+        reply = await compute()
+        if reply and reply.strip():
+            self.store(scope, vector, ckey, reply, chunk_ids)
+        return reply
+
+    def lookup(self, scope: str, vector: np.ndarray, ckey: str) -> Optional[str]:
+        now  = time.monotonic()
+        ids  = [i for i in list(self._by_context.get((scope, ckey), ())) if self._fresh(i, now)]
+        best = None
+        if ids:
+            sims = np.stack([self._entries[i].vector for i in ids]) @ vector
+            pos  = int(np.argmax(sims))
+            if sims[pos] >= self.threshold:
+                best = ids[pos]
+                _LOG.info("Semantic cache hit [%s] sim=%.3f", scope, float(sims[pos]))
+
+        if best is None:
+            self._counters[scope]["misses"] += 1
+            return None
+        self._counters[scope]["hits"] += 1
+        self._entries.move_to_end(best)
+        return self._entries[best].answer
+
+    def store(self, scope: str, vector: np.ndarray, ckey: str,
+              answer: str, chunk_ids: Iterable[str]) -> None:
+        entry_id, self._next_id = self._next_id, self._next_id + 1
+        self._entries[entry_id] = _Entry(
+            scope       = scope,
+            context_key = ckey,
+            vector      = vector,
+            answer      = answer,
+            chunk_ids   = frozenset(chunk_ids),
+            expires     = time.monotonic() + self.ttl,
+        )
+        self._by_context[(scope, ckey)].add(entry_id)
+        self._counters[scope]["stores"] += 1
+
+        while len(self._entries) > self.max_entries:
+            oldest, entry = next(iter(self._entries.items()))
+            self._drop(oldest)
+            self._counters[entry.scope]["evictions"] += 1
+
+    def invalidate(self, chunk_ids: Optional[Iterable[str]] = None) -> int:
+        """
+        Drop entries built on any of *chunk_ids* (all entries when None).
+        Called by ingestion whenever Pinecone chunks are rewritten.
+        """
+        if chunk_ids is None:
+            doomed = list(self._entries)
+        else:
+            changed = set(chunk_ids)
+            doomed  = [i for i, e in self._entries.items() if e.chunk_ids & changed]
+        for entry_id in doomed:
+            self._counters[self._entries[entry_id].scope]["invalidated"] += 1
+            self._drop(entry_id)
+        if doomed:
+            _LOG.info("Semantic cache: invalidated %s entries", len(doomed))
+        self._publish()
+        return len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        scopes = {}
+        for scope, c in self._counters.items():
+            lookups = c["hits"] + c["misses"]
+            scopes[scope] = {**c, "hit_rate": round(c["hits"] / lookups, 3) if lookups else 0.0}
+        return {
+            "entries":   len(self._entries),
+            "capacity":  self.max_entries,
+            "threshold": self.threshold,
+            "ttl":       self.ttl,
+            "kb_version": self._version,
+            "scopes":    scopes,
+        }
+
+    # ------------------------------------------------------------------ #
+    #  Internals
+    # ------------------------------------------------------------------ #
+    async def _kb_version(self) -> Optional[int]:
+        """Shared knowledge-base version, re-read every version_ttl seconds (None if unknown)."""
+        now = time.monotonic()
+        if now - self._version_read < self.version_ttl:
+            return self._version
+        try:
+            version = await get_knowledge_base_version()
+        except Exception as exc:
+            _LOG.warning("Knowledge-base version unavailable – bypassing cache: %s", exc)
+            return None
+        if self._version is not None and version != self._version:
+            _LOG.info("Knowledge base changed (v%s → v%s) – clearing %s entries",
+                      self._version, version, len(self._entries))
+            for entry_id in list(self._entries):
+                self._counters[self._entries[entry_id].scope]["invalidated"] += 1
+                self._drop(entry_id)
+        self._version, self._version_read = version, now
+        return version
+
+    def _publish(self) -> None:
+        """Bump the shared version so the other workers drop their entries too."""
+        self._version_read = float("-inf")               # re-read it on the next lookup
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:                             # sync ingestion path
+            _bump()
+        else:
+            loop.run_in_executor(None, _bump)
+
+    def _fresh(self, entry_id: int, now: float) -> bool:
+        if self._entries[entry_id].expires > now:
+            return True
+        self._drop(entry_id)
+        return False
+
+    def _drop(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        bucket = self._by_context.get((entry.scope, entry.context_key))
+        if bucket is not None:
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._by_context[(entry.scope, entry.context_key)]
+
+
+def _bump() -> None:
+    try:
+        _LOG.info("Knowledge-base version bumped to %s", bump_knowledge_base_version())
+    except Exception as exc:
+        _LOG.error("Could not bump the knowledge-base version – other workers keep "
+                   "their cached answers until SEMANTIC_CACHE_TTL_SECONDS: %s", exc)
+
+
+def _normalise(vector: List[float]) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm else v
+
+
+# One cache per worker process
+RESPONSE_CACHE = SemanticCache()
@@ -0,0 +1,75 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+A campaign burst sends dozens of identical first messages within a second;
+without this each one starts its own completion / embedding.  Concurrent
+callers with the same key share ONE in-flight task instead:
+
+    (content, usage), shared = await COMPLETION_FLIGHTS.do(key, produce)
+
+  • the first caller (leader) starts `produce()`; later callers await it
+  • the entry is dropped the moment the task resolves – nothing is kept,
+    so there is no staleness (that is what completion_cache is for)
+  • errors are shared too; a caller that is cancelled (e.g. its turn
+    budget ran out) only stops waiting – the task is cancelled once no
+    caller is left
+
+`stats()` counts leaders and coalesced callers (GET /v1/routes/mcp/cache).
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task    = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._counters = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, produce: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """(result, shared) – *shared* is True when another caller's call was reused."""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if shared:
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["leaders"] += 1
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(produce()))
+            flight.task.add_done_callback(lambda _, k=key, f=flight: self._landed(k, f))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()                # nobody is waiting any more
+
+    def _landed(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            flight.task.exception()                 # retrieved by the waiters
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self._counters["leaders"] + self._counters["coalesced"]
+        return {
+            **self._counters,
+            "coalesced_rate": round(self._counters["coalesced"] / calls, 3) if calls else 0.0,
+            "in_flight":      len(self._flights),
+        }
+
+
+# One registry of in-flight calls per worker process
+COMPLETION_FLIGHTS = SingleFlight("completions")
+EMBEDDING_FLIGHTS  = SingleFlight("embeddings")
@@ -1,6 +1,6 @@
 import re, logging
 from email_validator import validate_email, EmailNotValidError
-from services.openai_service import run_openai_prompt
+from services.cascade import Cascade
 
 
 # ---------- regex helpers ----------
@@ -74,14 +74,33 @@ def is_name(text:str)->bool:
     
     return all(w.lower() not in banned for w in words)
 
-# ---------- LLM fallback ----------
+# ---------- cascade fallback (rules → in-process scorer → LLM) ----------
+STAGE_CASCADE = Cascade(
+    "lead_stage",
+    rules    = [(LONG_FREE, "message")],
+    examples = {
+        "name":    ["my name is john", "i'm priya", "this is alex from sales", "call me sam"],
+        "company": ["i work at acme", "we are globex", "from initech", "our company is umbrella"],
+        "message": ["need help with soc2", "cloud security review", "ai risk assessment",
+                    "pentest for our app"],
+        "other":   ["no", "hmm", "what?", "not now", "skip", "later"],
+    },
+    prompt   = ("Classify the following snippet into "
+                "[name, email, company, message, other]. "
+                "Return only the label.\n\nSnippet: ```{text}```"),
+    labels   = ["name", "email", "company", "message", "other"],
+    default  = "other",
+    # only what detect_stage() could not match as e-mail / name / company / yes
+    held_out = {
+        "message": ["need help with iso 27001", "cloud security assessment", "ai red teaming",
+                    "pentest for our api"],
+        "other":   ["nope", "hmm ok", "maybe later", "what?"],
+    },
+)
+
 async def llm_classify(free_text:str)->str:
     """Returns one of name/email/company/message/other."""
-    prompt = (f"Classify the following snippet into "
-              f"[name, email, company, message, other]. "
-              f"Return only the label.\n\nSnippet: ```{free_text}```")
-    resp = await run_openai_prompt(prompt, model="gpt-4o-mini")
-    return resp.choices[0].message.content.strip().lower()
+    return (await STAGE_CASCADE.classify(free_text)).label
 
 # ---------- main detector ----------
 async def detect_stage(collected:dict, current:str, history:str)->str:
@@ -8,7 +8,19 @@ from datetime import datetime, timezone, timedelta
 import logging
 
 from db.supabase import safe_supabase_operation, get_supabase_client
-from config.settings import ROLLING_WINDOW_MIN
+from config.settings import ROLLING_WINDOW_MIN, CONVERSATION_TURNS_LIMIT
+
+# Lead de-duplication window.  Rows carry a `dedup_key` of
+# "<email or user_id>:<window index>" with a unique index on it, so the
+# database rejects a repeat inside the same window – no select needed.
+DEDUP_WINDOW = timedelta(minutes=int(ROLLING_WINDOW_MIN or 10))
+
+
+def lead_dedup_key(identity: str | None, at: datetime | None = None) -> str:
+    """Time-bucketed conflict target for lead_logs / qualified_leads."""
+    at = at or datetime.now(timezone.utc)
+    bucket = int(at.timestamp() // DEDUP_WINDOW.total_seconds())
+    return f"{(identity or '').strip().lower()}:{bucket}"
 
 def convert_history_to_structured(history_strings: list) -> list:
     """
@@ -69,51 +81,46 @@ def convert_structured_to_history_strings(structured_history: list) -> list:
     return history_strings
 
 
-async def upsert_conversation_memory(user_id: str, memory: dict, history: list = None):
+async def upsert_conversation_memory(user_id: str, memory: dict):
     """
     Insert a new row or update an existing one in `conversation_memory`.
+    One round-trip: PostgREST upsert on the `user_id` conflict target, so
+    concurrent tabs can never create a second row for the same visitor.
+    The transcript itself lives in `conversation_turns` (see below).
     
     Args:
         user_id (str): Visitor/session UUID.
-        memory (dict): Fields {intent, product, qualified, last_agent}.
-        history (list): Chat history to store as JSONB.
+        memory (dict): Fields {intent, product, qualified, last_agent}; turn_count is
+                       raised by append_conversation_turns.
     """
-    supabase = get_supabase_client()
-    # ----- 1 / Check if row exists -----
-    check = lambda: (supabase
-            .from_("conversation_memory")
-            .select("user_id")
-            .eq("user_id", user_id)
-            .execute()
-    )
-    existing = await safe_supabase_operation(check, "Failed to check conversation_memory")
-
-    # Add/update timestamp and history
     memory["updated_at"] = datetime.utcnow().isoformat()
-    if history is not None:
-        # Convert string history to structured JSONB format
-        memory["conv_history"] = convert_history_to_structured(history)
+    return await upsert_conversation_memories([{**memory, "user_id": user_id}])
 
-    # ----- 2 / Insert or update -----
-    if existing.data:                          
-        update_op = lambda: (
-            supabase
-                .from_("conversation_memory")
-                .update(memory)
-                .eq("user_id", user_id)
-                .execute()
-        )
-        return await safe_supabase_operation(update_op, "Failed to update conversation_memory")
 
-    else:                                               
-        insert_payload = {**memory, "user_id": user_id}
-        insert_op = lambda: (
+async def upsert_conversation_memories(rows: list[dict]) -> list:
+    """
+    Bulk upsert into `conversation_memory` (rows must carry `user_id`).
+    Only the columns present are written; rows are grouped by column set so
+    a missing column is never overwritten with NULL.
+    Raises on failure so the caller can retry.
+    """
+    supabase = get_supabase_client()
+    groups: dict[tuple, list] = {}
+    for row in rows:
+        row.setdefault("updated_at", datetime.utcnow().isoformat())
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    stored = []
+    for batch in groups.values():
+        upsert_op = lambda batch=batch: (
             supabase
                 .from_("conversation_memory")
-                .insert(insert_payload)
+                .upsert(batch, on_conflict="user_id")
                 .execute()
         )
-        return await safe_supabase_operation(insert_op, "Failed to insert conversation_memory")
+        resp = await safe_supabase_operation(upsert_op, "Failed to upsert conversation_memory")
+        stored.extend(resp.data or [])
+    return stored
     
 
 async def get_conversation_memory(user_id: str):
@@ -132,23 +139,61 @@ async def get_conversation_memory(user_id: str):
     resp = await safe_supabase_operation(fetch, "Failed fetching conversation_memory")
     return resp.data[0] if resp.data else None
 
-async def get_conversation_history(user_id: str, as_strings: bool = True):
+
+async def get_turn_count(user_id: str) -> int:
     """
-    Fetch just the conversation history for a given user_id. Returns empty list if not found.
-    
+    Stored conversation_memory.turn_count (0 for a new visitor) – a
+    one-column read used as the version of a cached conversation.
+    """
+    supabase = get_supabase_client()
+    fetch = lambda: (
+        supabase
+            .from_("conversation_memory")
+            .select("turn_count")
+            .eq("user_id", user_id)
+            .limit(1)
+            .execute()
+    )
+    resp = await safe_supabase_operation(fetch, "Failed fetching turn_count")
+    return int(resp.data[0].get("turn_count") or 0) if resp.data else 0
+
+async def get_knowledge_base_version() -> int:
+    """Shared counter bumped on every ingestion (db/migrations/005)."""
+    supabase = get_supabase_client()
+    fetch = lambda: (
+        supabase
+            .from_("knowledge_base_version")
+            .select("version")
+            .eq("id", 1)
+            .limit(1)
+            .execute()
+    )
+    resp = await safe_supabase_operation(fetch, "Failed fetching knowledge_base_version")
+    return int(resp.data[0].get("version") or 0) if resp.data else 0
+
+
+def bump_knowledge_base_version() -> int:
+    """
+    Increment the shared knowledge-base version; returns the new value.
+    Blocking – ingestion runs it in a thread when called from async code.
+    """
+    resp = get_supabase_client().rpc("bump_knowledge_base_version").execute()
+    return int(resp.data or 0)
+
+def decode_history(history: list | None, as_strings: bool = True) -> list:
+    """
+    Normalise a stored `conv_history` value (structured or old string format).
+
     Args:
-        user_id: The user ID to fetch history for
+        history: Raw JSONB value from the row (may be None).
         as_strings: If True, returns ["User: msg", "Bot: response"] format.
                    If False, returns [{"user": "msg", "bot": "response"}] format.
     """
-    memory = await get_conversation_memory(user_id)
-    if not memory or not memory.get("conv_history"):
+    if not history:
         return []
-    
-    history = memory.get("conv_history", [])
-    
+
     # Check if history is already in structured format
-    if history and isinstance(history[0], dict):
+    if isinstance(history[0], dict):
         # It's structured format
         if as_strings:
             return convert_structured_to_history_strings(history)
@@ -161,52 +206,91 @@ async def get_conversation_history(user_id: str, as_strings: bool = True):
         else:
             return convert_history_to_structured(history)
 
-async def sync_qualified_lead(lead: dict):
+
+async def get_conversation_history(user_id: str, as_strings: bool = True):
     """
-    Adds a row into qualified_leads.
-    Expects fields:
-      user_id, email (str|None), intent, product, qualified (bool), last_message
+    Fetch the recent conversation history for a given user_id. Returns empty list if not found.
+    
+    Args:
+        user_id: The user ID to fetch history for
+        as_strings: If True, returns ["User: msg", "Bot: response"] format.
+                   If False, returns [{"user": "msg", "bot": "response"}] format.
     """
-    supabase = get_supabase_client()
+    turns = await get_recent_turns(user_id)
+    if not turns:                               # row not migrated yet
+        memory = await get_conversation_memory(user_id) or {}
+        turns  = decode_history(memory.get("conv_history"), as_strings=False)
+    return decode_history(turns, as_strings)
 
-    email = lead.get("email", "")
-    now   = datetime.now(timezone.utc)
-    start = (now - timedelta(minutes=10)).isoformat()
 
-    try:
-        existing = (
-                supabase
-                .from_("qualified_leads")
-                .select("user_id", count="exact")
-                .eq("email", email)
-                .gte("submitted_at", start)
-                .execute()
-            )
-        if existing.data and len(existing.data) > 0:
-            logging.info("Lead for <%s> logged < %s min ago – skipping.", email, ROLLING_WINDOW_MIN)
-            return existing.data[0]["user_id"]
+# -------------------------------------------------------------------------
+# conversation_turns – append-only transcript, one row per (user_id, seq)
+# -------------------------------------------------------------------------
+async def get_recent_turns(user_id: str, limit: int = CONVERSATION_TURNS_LIMIT) -> list:
+    """
+    Last *limit* turns for *user_id*, oldest first, as
+    [{"seq": 0, "user": "msg", "bot": "response"}, …].
+    """
+    supabase = get_supabase_client()
+    fetch = lambda: (
+        supabase
+            .from_("conversation_turns")
+            .select("seq, user_text, bot_text")
+            .eq("user_id", user_id)
+            .order("seq", desc=True)
+            .limit(limit)
+            .execute()
+    )
+    resp = await safe_supabase_operation(fetch, "Failed fetching conversation_turns")
+    return [
+        {"seq": r["seq"], "user": r.get("user_text") or "", "bot": r.get("bot_text") or ""}
+        for r in reversed(resp.data or [])
+    ]
 
-        payload = {
-            "user_id": lead["user_id"],
-            "email": lead.get("email"),
-            "intent": lead["intent"],
-            "product": lead["product"],
-            "service": lead["service"],
-            "qualified": True,
-            "last_message": lead.get("last_message", ""),
-            "submitted_at": datetime.utcnow().isoformat()
+
+async def insert_conversation_turns(turns: list[dict]) -> list:
+    """
+    Append turns ({"user_id", "seq", "id", "user", "bot"}) in one request via the
+    append_conversation_turns function (db/migrations/004): the database
+    picks the seq under a per-visitor lock – the requested one, or the next
+    free one when another writer already took it – and raises turn_count
+    in the same transaction.  A retry (same "id") of a stored turn keeps its seq.
+    Returns [{"user_id", "requested_seq", "seq"}, …].  Raises on failure so
+    the caller can retry.
+    """
+    if not turns:
+        return []
+    supabase = get_supabase_client()
+    rows = [
+        {
+            "user_id":   t["user_id"],
+            "seq":       t["seq"],
+            "turn_id":   t.get("id"),
+            "user_text": t.get("user", ""),
+            "bot_text":  t.get("bot", ""),
         }
+        for t in turns
+    ]
+    insert_op = lambda: (
+        supabase
+            .rpc("append_conversation_turns", {"p_rows": rows})
+            .execute()
+    )
+    resp = await safe_supabase_operation(insert_op, "Failed to insert conversation_turns")
+    return resp.data or []
 
-        insert_op = lambda: (
-            supabase
-                .from_("qualified_leads")
-                .insert(payload)
-                .execute()
-        )
-        resp = await safe_supabase_operation(insert_op, "Failed to insert qualified_lead")
-        lead_id = resp.data[0]["user_id"]
-        logging.info("Lead stored user_id=%s for <%s>", lead_id, email)
-        return resp
+async def sync_qualified_lead(lead: dict):
+    """
+    Adds a row into qualified_leads (skipped if the same e-mail – or user
+    when there is none – was pushed within DEDUP_WINDOW).
+    Expects fields:
+      user_id, email (str|None), intent, product, qualified (bool), last_message
+    """
+    try:
+        rows = await sync_qualified_leads([lead])
+        if rows:
+            logging.info("Lead stored user_id=%s for <%s>", rows[0]["user_id"], lead.get("email"))
+        return rows[0] if rows else None
     except Exception as exc:
             logging.exception("sync_qualified_lead failed: %s", exc)
             return None
@@ -253,49 +337,16 @@ async def fetch_recent_leads(*, email: str, since: datetime) -> dict | None:
 # -------------------------------------------------------------------------
 async def insert_lead_log(lead: dict):
     """
-    Adds a row into qualified_leads.
+    Adds a row into lead_logs (skipped if the same e-mail was logged
+    within DEDUP_WINDOW).
     Expects fields:
-      user_id, email (str|None), intent, product, qualified (bool), last_message
+      user_id, name, email, company, message, channel
     """
-    supabase = get_supabase_client()
-
-    email = lead.get("email", "").lower()
-    now   = datetime.now(timezone.utc)
-    start = (now - timedelta(minutes=10)).isoformat()
-
     try:
-        existing = (
-                supabase
-                .from_("lead_logs")
-                .select("user_id", count="exact")
-                .eq("email", email)
-                .gte("created_at", start)
-                .execute()
-            )
-        if existing.data and len(existing.data) > 0:
-            logging.info("Lead for <%s> logged < %s min ago – skipping.", email, ROLLING_WINDOW_MIN)
-            return existing.data[0]["user_id"]
-
-        payload = {
-            "user_id": lead["user_id"],
-            "name": lead.get("name"),
-            "email": lead.get("email"),
-            "company": lead.get("company"),
-            "message": lead.get("message", ""),
-            "channel": lead.get("channel", ""),
-            "created_at": datetime.utcnow().isoformat()
-        }
-
-        insert_op = lambda: (
-            supabase
-                .from_("lead_logs")
-                .insert(payload)
-                .execute()
-        )
-        resp = await safe_supabase_operation(insert_op, "Failed to insert qualified_lead")
-        lead_id = resp.data[0]["user_id"]
-        logging.info("Lead stored user_id=%s for <%s>", lead_id, email)
-        return resp
+        rows = await insert_lead_logs([lead])
+        if rows:
+            logging.info("Lead stored user_id=%s for <%s>", rows[0]["user_id"], lead.get("email"))
+        return rows[0] if rows else None
     except Exception as exc:
             logging.exception("Lead Logging failed: %s", exc)
             return None
@@ -307,20 +358,85 @@ async def insert_lead_log(lead: dict):
 # -------------------------------------------------------------------------
 async def insert_qualified_lead(row: dict) -> dict:
     """
-    Upserts into qualified_leads on the `email` unique index so repeated
-    pushes just refresh the record.
+    Upserts into qualified_leads on the `dedup_key` unique index so repeated
+    pushes within DEDUP_WINDOW just refresh the record.
     Example row keys expected:
         {email,name,company,intent,product,service,last_message,source}
     """
     supabase = get_supabase_client()
-    # Supabase PostgREST recognises Prefer: resolution=merge-duplicates
-    merge_hdr = {"Prefer": "resolution=merge-duplicates,return=representation"}
+    payload  = {**row, "dedup_key": lead_dedup_key(row.get("email") or row.get("user_id"))}
 
     op = lambda: (
         supabase
         .from_("qualified_leads")
-        .insert(row, count="exact", headers=merge_hdr)
+        .upsert(payload, on_conflict="dedup_key")
         .execute()
     )
     resp = await safe_supabase_operation(op, "Failed upserting qualified_lead")
-    return resp.data[0] if resp.data else row   # when merge, PostgREST returns []
+    return resp.data[0] if resp.data else row
+
+
+# -------------------------------------------------------------------------
+# bulk variants – used by the write-behind flusher (services/write_behind.py)
+# -------------------------------------------------------------------------
+async def insert_lead_logs(leads: list[dict]) -> list:
+    """
+    Bulk insert_lead_log(): a single upsert that ignores rows whose
+    `dedup_key` already exists.  Returns only the rows actually stored.
+    Raises on failure so the caller can retry.
+    """
+    rows: dict[str, dict] = {}
+    for lead in leads:
+        key = lead_dedup_key(lead.get("email") or lead["user_id"])
+        rows.setdefault(key, {                    # first one in a batch wins
+            "user_id": lead["user_id"],
+            "name": lead.get("name"),
+            "email": lead.get("email"),
+            "company": lead.get("company"),
+            "message": lead.get("message", ""),
+            "channel": lead.get("channel", ""),
+            "created_at": datetime.utcnow().isoformat(),
+            "dedup_key": key,
+        })
+    return await _insert_ignoring_duplicates("lead_logs", list(rows.values()), len(leads))
+
+
+async def sync_qualified_leads(leads: list[dict]) -> list:
+    """
+    Bulk sync_qualified_lead(): a single upsert that ignores rows whose
+    `dedup_key` already exists.  Returns only the rows actually stored.
+    Raises on failure so the caller can retry.
+    """
+    rows: dict[str, dict] = {}
+    for lead in leads:
+        key = lead_dedup_key(lead.get("email") or lead["user_id"])
+        rows.setdefault(key, {
+            "user_id": lead["user_id"],
+            "email": lead.get("email"),
+            "intent": lead["intent"],
+            "product": lead["product"],
+            "service": lead["service"],
+            "qualified": True,
+            "last_message": lead.get("last_message", ""),
+            "submitted_at": datetime.utcnow().isoformat(),
+            "dedup_key": key,
+        })
+    return await _insert_ignoring_duplicates("qualified_leads", list(rows.values()), len(leads))
+
+
+async def _insert_ignoring_duplicates(table: str, rows: list[dict], requested: int) -> list:
+    if not rows:
+        return []
+    supabase = get_supabase_client()
+    insert_op = lambda: (
+        supabase
+            .from_(table)
+            .upsert(rows, on_conflict="dedup_key", ignore_duplicates=True)
+            .execute()
+    )
+    resp   = await safe_supabase_operation(insert_op, f"Failed to insert {table}")
+    stored = resp.data or []
+    if len(stored) < requested:
+        logging.info("%s: %s of %s leads already logged < %s min ago – skipped.",
+                     table, requested - len(stored), requested, int(DEDUP_WINDOW.total_seconds() // 60))
+    return stored
@@ -0,0 +1,175 @@
+"""
+Per-section token budgets for LLM prompts.
+
+RAG chunks and history used to be joined into the prompt whole, so the
+prompt size (and with it latency and cost) depended on whatever Pinecone
+and the summariser happened to return.  Each caller now has a budget per
+section and packs into it:
+
+    packed = pack("sales", model="gpt-4.1",
+                  instructions = PROMPTS.system(PROMPT, SYSTEM_PROMPT),
+                  context      = matches,           # str | {"text", "score"}
+                  history      = summary,           # str | [turn, …] oldest first
+                  user         = turn.text)
+    packed.context_text("\n\n"), packed.history_text(), packed.user
+
+  • context – highest score first (ties: original order); whole chunks
+    while they fit, the first one that doesn't is cut to the space left
+    (if at least MIN_PIECE_TOKENS), everything after it is dropped
+  • history – most recent line / turn first, the same way; kept in
+    chronological order
+  • user – head of the message, cut at its budget
+  • instructions – the static system prefix is only measured (cutting it
+    would break prefix caching); a template over budget is logged
+
+Same inputs → same prompt.  Budgets: DEFAULT_BUDGETS, overridden per
+caller with PROMPT_TOKEN_BUDGETS.  Every pack() logs its breakdown.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from config.settings import PROMPT_TOKEN_BUDGETS
+from services.tokens import count_tokens, truncate_tokens
+
+_LOG = logging.getLogger("token_budget")
+
+MIN_PIECE_TOKENS = 32                       # smaller remainders aren't worth a cut chunk
+
+
+@dataclass(frozen=True, slots=True)
+class Budget:
+    instructions: int = 1200
+    history:      int = 600
+    context:      int = 1500
+    user:         int = 400
+
+
+DEFAULT_BUDGETS: Dict[str, Budget] = {
+    "sales":     Budget(instructions=1200, history=600, context=1800, user=400),
+    "objection": Budget(instructions=1200, history=500, context=1000, user=300),
+}
+
+
+def budget_for(caller: str) -> Budget:
+    base = DEFAULT_BUDGETS.get(caller, Budget())
+    override = PROMPT_TOKEN_BUDGETS.get(caller) or {}
+    return Budget(**{**asdict(base), **{k: int(v) for k, v in override.items()}})
+
+
+@dataclass(slots=True)
+class Packed:
+    caller:  str
+    budget:  Budget
+    user:    str = ""
+    context: List[str] = field(default_factory=list)
+    history: List[str] = field(default_factory=list)
+    tokens:  Dict[str, int] = field(default_factory=dict)     # used per section
+    dropped: Dict[str, int] = field(default_factory=dict)     # pieces left out / cut
+
+    def context_text(self, sep: str = "\n\n") -> str:
+        return sep.join(self.context)
+
+    def history_text(self, sep: str = "\n") -> str:
+        return sep.join(self.history)
+
+    def breakdown(self) -> Dict[str, Any]:
+        return {
+            "tokens":  dict(self.tokens),
+            "total":   sum(self.tokens.values()),
+            "budget":  asdict(self.budget),
+            "dropped": dict(self.dropped),
+        }
+
+
+Chunk = Union[str, Dict[str, Any]]
+
+
+def pack(
+    caller: str,
+    *,
+    instructions: str = "",
+    context: Union[str, Sequence[Chunk], None] = None,
+    history: Union[str, Sequence[str], None] = None,
+    user: str = "",
+    model: Optional[str] = None,
+    budget: Optional[Budget] = None,
+) -> Packed:
+    budget = budget or budget_for(caller)
+    out = Packed(caller, budget)
+
+    out.tokens["instructions"] = count_tokens(instructions, model) if instructions else 0
+    if out.tokens["instructions"] > budget.instructions:
+        _LOG.warning("%s: instructions use %d tokens (budget %d)",
+                     caller, out.tokens["instructions"], budget.instructions)
+
+    out.user = truncate_tokens(user, budget.user, model)
+    out.tokens["user"] = count_tokens(out.user, model)
+    out.dropped["user"] = int(out.user != user)
+
+    chunks = _ranked(context)
+    out.context, out.tokens["context"], out.dropped["context"] = _fill(
+        chunks, budget.context, model, keep="head")
+
+    lines = _recent_first(history)
+    picked, out.tokens["history"], out.dropped["history"] = _fill(
+        lines, budget.history, model, keep="tail")
+    out.history = picked[::-1]                  # back to chronological order
+
+    _LOG.info(
+        "prompt %s: %d tokens – instructions %d/%d, history %d/%d (%d of %d), "
+        "context %d/%d (%d of %d), user %d/%d",
+        caller, sum(out.tokens.values()),
+        out.tokens["instructions"], budget.instructions,
+        out.tokens["history"], budget.history, len(out.history), len(lines),
+        out.tokens["context"], budget.context, len(out.context), len(chunks),
+        out.tokens["user"], budget.user,
+    )
+    return out
+
+
+# ---------------------------------------------------------------------- #
+#  Helpers
+# ---------------------------------------------------------------------- #
+def _ranked(context: Union[str, Sequence[Chunk], None]) -> List[str]:
+    """Chunk texts, best score first; stable, so equal scores keep their order."""
+    if not context:
+        return []
+    if isinstance(context, str):
+        return [c for c in context.split("\n\n") if c.strip()]
+    scored = []
+    for i, chunk in enumerate(context):
+        text, score = (chunk, 0.0) if isinstance(chunk, str) else (chunk.get("text", ""), chunk.get("score") or 0.0)
+        if text.strip():
+            scored.append((-float(score), i, text.strip()))
+    return [text for _, _, text in sorted(scored)]
+
+
+def _recent_first(history: Union[str, Sequence[str], None]) -> List[str]:
+    if not history:
+        return []
+    if isinstance(history, str):
+        history = history.splitlines()
+    return [h for h in reversed(history) if h.strip()]
+
+
+def _fill(pieces: List[str], limit: int, model: Optional[str], *, keep: str):
+    """Greedy: (kept pieces, tokens used, pieces dropped or cut)."""
+    kept: List[str] = []
+    used = cut = 0
+    for piece in pieces:
+        cost = count_tokens(piece, model)
+        if used + cost <= limit:
+            kept.append(piece)
+            used += cost
+            continue
+        room = limit - used
+        if room >= MIN_PIECE_TOKENS:            # cut the first misfit, then stop
+            piece = truncate_tokens(piece, room, model, keep=keep)
+            kept.append(piece)
+            used += count_tokens(piece, model)
+            cut = 1
+        break
+    return kept, used, len(pieces) - len(kept) + cut
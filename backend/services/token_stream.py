@@ -0,0 +1,152 @@
+"""
+Token streaming for chat replies (Server-Sent Events).
+
+A streaming endpoint activates a TokenStream for the turn; any LLM helper
+called with ``stream=True`` while it is active forwards its deltas here
+instead of buffering the whole completion.  Deltas are held back until a
+sentence boundary so `ensure_markdown` can format complete sentences
+before they are emitted.
+
+    stream = TokenStream()
+    with stream.activate():
+        task = asyncio.create_task(route_turn())
+    async for text in stream.drain(task):
+        yield sse_event("token", {"text": text})
+
+Work that may be thrown away (a speculative skill run) streams into a
+DeferredSink instead.  On commit the buffer is replayed into the real
+stream and everything the run emits afterwards goes straight through:
+
+    deferred = DeferredSink()
+    with use_sink(deferred):
+        task = asyncio.create_task(run_skill())
+    ...
+    await deferred.attach(stream)
+    await task
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from services.bot_response_formatter_md import ensure_markdown
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+_CURRENT: ContextVar[Optional["TokenStream"]] = ContextVar("token_stream", default=None)
+
+# end of sentence followed by the start of the next one, or a line break
+_BOUNDARY = re.compile(r"(?<=[.!?:])\s+(?=[\"'*(\[A-Z0-9])|\n+")
+
+
+def current_sink() -> Optional["TokenStream"]:
+    """TokenStream active for this request, if the caller is streaming."""
+    return _CURRENT.get()
+
+
+@contextmanager
+def use_sink(sink: Any):
+    """Make *sink* (anything with feed/flush) the current one for this context."""
+    token = _CURRENT.set(sink)
+    try:
+        yield sink
+    finally:
+        _CURRENT.reset(token)
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Serialise one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class TokenStream:
+    def __init__(self, *, markdown: bool = True):
+        self.markdown = markdown
+        self.emitted  = False                 # anything sent to the client yet?
+        self._buf     = ""
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+
+    @contextmanager
+    def activate(self):
+        with use_sink(self):
+            yield self
+
+    # ------------------------------------------------------------------ #
+    #  Producer side (LLM helpers)
+    # ------------------------------------------------------------------ #
+    async def feed(self, delta: str) -> None:
+        self._buf += delta
+        last = None
+        for last in _BOUNDARY.finditer(self._buf):
+            pass
+        if last is None:
+            return
+        ready, self._buf = self._buf[:last.start()], self._buf[last.end():]
+        await self._emit(ready, "\n" if "\n" in last.group(0) or self.markdown else " ")
+
+    async def flush(self) -> None:
+        """End of a completion – emit whatever is still buffered."""
+        ready, self._buf = self._buf, ""
+        await self._emit(ready, "")
+
+    async def _emit(self, text: str, tail: str) -> None:
+        if not text.strip():
+            return
+        if self.markdown:
+            text = await ensure_markdown(text)
+        self.emitted = True
+        self._queue.put_nowait(text + tail)
+
+    # ------------------------------------------------------------------ #
+    #  Consumer side (endpoint)
+    # ------------------------------------------------------------------ #
+    async def drain(self, task: asyncio.Future) -> AsyncIterator[str]:
+        """Yield emitted text until *task* (the turn) completes."""
+        while True:
+            getter = asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+                continue
+            getter.cancel()
+            break
+        while not self._queue.empty():
+            yield self._queue.get_nowait()
+
+
+class DeferredSink:
+    """
+    Records feed()/flush() calls until attach() – then replays them into the
+    real sink and forwards every later call to it directly.
+    """
+
+    def __init__(self) -> None:
+        self._ops: List[Tuple[str, str]] = []
+        self._target: Any = None
+
+    async def feed(self, delta: str) -> None:
+        if self._target is not None:
+            await self._target.feed(delta)
+        else:
+            self._ops.append(("feed", delta))
+
+    async def flush(self) -> None:
+        if self._target is not None:
+            await self._target.flush()
+        else:
+            self._ops.append(("flush", ""))
+
+    async def attach(self, sink: Any) -> None:
+        # calls made while a replayed op is awaited are appended – keep going
+        # until the buffer is empty, then go live (no await in between)
+        while self._ops:
+            op, delta = self._ops.pop(0)
+            if op == "feed":
+                await sink.feed(delta)
+            else:
+                await sink.flush()
+        self._target = sink
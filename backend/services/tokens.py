@@ -0,0 +1,66 @@
+"""
+Token counting for prompt sizing.
+
+    n    = count_tokens(text, model="gpt-4.1")
+    head = truncate_tokens(text, 200)                  # first ≤200 tokens
+    tail = truncate_tokens(text, 200, keep="tail")     # last ≤200 tokens
+
+Uses tiktoken when it is installed (and its encoding can be loaded),
+otherwise ~4 characters per token – the same rule of thumb the LLM
+gateway charges TPM with, close enough for budgeting.
+"""
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import Any, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_LOG = logging.getLogger("tokens")
+
+DEFAULT_ENCODING = "o200k_base"            # gpt-4o / gpt-4.1 family
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: Optional[str]) -> Any:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+    except KeyError:                                # model tiktoken doesn't know
+        return _encoding(None)
+    except Exception as exc:                        # e.g. BPE file not downloadable
+        _LOG.warning("tiktoken unavailable (%s) – estimating 4 chars/token", exc)
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    enc = _encoding(model)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, limit: int, model: Optional[str] = None, *,
+                    keep: str = "head") -> str:
+    """At most *limit* tokens of *text* – the start (keep="head") or the end."""
+    if limit <= 0:
+        return ""
+    enc = _encoding(model)
+    if enc is None:
+        if len(text) <= limit * 4:
+            return text
+        return text[:limit * 4] if keep == "head" else text[-limit * 4:]
+    ids = enc.encode(text, disallowed_special=())
+    if len(ids) <= limit:
+        return text
+    return enc.decode(ids[:limit] if keep == "head" else ids[-limit:])
+
+
+def exact() -> bool:
+    """True when counts come from a real tokenizer."""
+    return _encoding(None) is not None
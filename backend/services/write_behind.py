@@ -0,0 +1,379 @@
+"""
+Write-behind persistence for chat turns.
+
+Routers hand conversation-memory, turn and lead writes to WRITE_BEHIND and
+return the reply immediately; a background flusher started in the app
+lifespan pushes them to Supabase.
+
+  • pending memory writes for the same user_id coalesce into one
+  • turn / lead rows are flushed in batches (one request per table)
+  • failed writes are retried with exponential back-off + jitter
+  • bounded: when full, the write happens inline (nothing is dropped)
+  • stop() flushes everything on shutdown, gives the writes that fail one
+    last try within its deadline and logs each one it still has to drop
+  • a turn whose seq another worker had already taken is stored at the
+    next free seq by the database and reported to `on_turn_conflict()`
+    listeners; every other stored turn reports the visitor's new
+    turn_count to `on_turn_stored()` listeners
+
+`pending_memory()` / `pending_turns()` let readers overlay not-yet-flushed
+writes so a visitor's next turn on this worker never sees stale memory.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from config.settings import (
+    WRITE_BEHIND_MAX_PENDING,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_SECONDS,
+    WRITE_BEHIND_MAX_RETRIES,
+)
+from services.supabase_service import (
+    upsert_conversation_memory,
+    upsert_conversation_memories,
+    insert_conversation_turns,
+    insert_lead_logs,
+    sync_qualified_leads,
+)
+
+_LOG = logging.getLogger("write_behind")
+
+MEMORY         = "conversation_memory"
+TURNS          = "conversation_turns"
+LEAD_LOG       = "lead_logs"
+QUALIFIED_LEAD = "qualified_leads"
+
+
+@dataclass
+class _MemoryWrite:
+    fields:   Dict[str, Any]
+    since:    float                       # enqueue time of the oldest merged write
+    attempts: int   = 0
+    not_before: float = 0.0
+
+    def merge_newer(self, newer: Dict[str, Any]) -> None:
+        self.fields.update(newer)
+
+
+@dataclass
+class _RowWrite:
+    table:    str
+    row:      Dict[str, Any]
+    since:    float = field(default_factory=time.monotonic)
+    attempts: int   = 0
+    not_before: float = 0.0
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        *,
+        max_pending:    int   = WRITE_BEHIND_MAX_PENDING,
+        batch_size:     int   = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_SECONDS,
+        max_retries:    int   = WRITE_BEHIND_MAX_RETRIES,
+    ):
+        self.max_pending    = max_pending
+        self.batch_size     = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries    = max_retries
+
+        self._memory: "OrderedDict[str, _MemoryWrite]" = OrderedDict()
+        self._rows:   Deque[_RowWrite] = deque()       # append-only rows
+        self._wake    = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self._counters = {
+            "enqueued": 0, "coalesced": 0, "flushed": 0,
+            "retried": 0, "failed": 0, "inline": 0, "turn_conflicts": 0,
+        }
+        self._last_flush_lag = 0.0
+        self._conflict_listeners: List[Callable[[str], None]] = []
+        self._stored_listeners: List[Callable[[str, int], None]] = []
+
+    # ------------------------------------------------------------------ #
+    #  Lifecycle
+    # ------------------------------------------------------------------ #
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="write-behind")
+            _LOG.info("Write-behind flusher started")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Drain everything pending (bounded by *timeout*), then stop the flusher."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            # wait_for cancelled the flusher; in-flight batches were put back
+            self._drop_pending(f"drain timed out after {timeout:g}s")
+        self._task = None
+        _LOG.info("Write-behind flusher stopped")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping
+
+    # ------------------------------------------------------------------ #
+    #  Producers
+    # ------------------------------------------------------------------ #
+    async def put_memory(self, user_id: str, memory: dict) -> None:
+        """Queue an upsert_conversation_memory() call (same arguments)."""
+        fields = dict(memory)
+
+        if not self.running or (self.depth >= self.max_pending and user_id not in self._memory):
+            self._counters["inline"] += 1
+            await upsert_conversation_memory(user_id=user_id, memory=fields)
+            return
+
+        self._counters["enqueued"] += 1
+        pending = self._memory.get(user_id)
+        if pending is not None:
+            pending.merge_newer(fields)
+            self._counters["coalesced"] += 1
+        else:
+            self._memory[user_id] = _MemoryWrite(fields=fields, since=time.monotonic())
+        self._wake.set()
+
+    async def put_turns(self, user_id: str, turns: list) -> None:
+        """Queue turns ({"seq", "user", "bot"}) for conversation_turns."""
+        for turn in turns:
+            await self._put_row(TURNS, {**turn, "user_id": user_id})
+
+    async def put_lead_log(self, lead: dict) -> None:
+        await self._put_row(LEAD_LOG, lead)
+
+    async def put_qualified_lead(self, lead: dict) -> None:
+        await self._put_row(QUALIFIED_LEAD, lead)
+
+    async def _put_row(self, table: str, row: dict) -> None:
+        if not self.running or self.depth >= self.max_pending:
+            self._counters["inline"] += 1
+            await self._write_rows(table, [row])
+            return
+        self._counters["enqueued"] += 1
+        self._rows.append(_RowWrite(table=table, row=dict(row)))
+        self._wake.set()
+
+    # ------------------------------------------------------------------ #
+    #  Readers
+    # ------------------------------------------------------------------ #
+    def pending_memory(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Fields queued for *user_id* but not yet flushed (None if nothing)."""
+        pending = self._memory.get(user_id)
+        return dict(pending.fields) if pending else None
+
+    def pending_turns(self, user_id: str) -> List[Dict[str, Any]]:
+        """Turns queued for *user_id* but not yet flushed."""
+        return [
+            dict(w.row) for w in self._rows
+            if w.table == TURNS and w.row.get("user_id") == user_id
+        ]
+
+    def on_turn_conflict(self, listener: Callable[[str], None]) -> None:
+        """Call *listener(user_id)* when a queued turn lost to an existing row."""
+        self._conflict_listeners.append(listener)
+
+    def on_turn_stored(self, listener: Callable[[str, int], None]) -> None:
+        """Call *listener(user_id, turn_count)* when turns landed at the seq they asked for."""
+        self._stored_listeners.append(listener)
+
+    @property
+    def depth(self) -> int:
+        return len(self._memory) + len(self._rows)
+
+    def stats(self) -> Dict[str, Any]:
+        now    = time.monotonic()
+        oldest = min(
+            [w.since for w in self._memory.values()] + [w.since for w in self._rows],
+            default=now,
+        )
+        return {
+            "depth":             self.depth,
+            "memory_pending":    len(self._memory),
+            "rows_pending":      len(self._rows),
+            "lag_seconds":       round(now - oldest, 3),
+            "last_flush_lag_seconds": round(self._last_flush_lag, 3),
+            **self._counters,
+        }
+
+    # ------------------------------------------------------------------ #
+    #  Flusher
+    # ------------------------------------------------------------------ #
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            if self._stopping:
+                await self._drain()
+                return
+
+            while await self._flush_once():
+                pass
+
+    async def _drain(self) -> None:
+        """Shutdown: flush everything now, retry the failures once, drop the rest."""
+        for _ in range(2):
+            for write in [*self._memory.values(), *self._rows]:
+                write.not_before = 0.0          # skip the back-off, not the retry
+            while await self._flush_once():     # a failed write is due again only next pass
+                pass
+            if not self.depth:
+                return
+        self._drop_pending("still failing at shutdown")
+
+    def _drop_pending(self, reason: str) -> None:
+        """Log every write that will never reach Supabase, then forget it."""
+        for user_id in self._memory:
+            _LOG.error("Write-behind dropping %s write for %s: %s", MEMORY, user_id, reason)
+        for write in self._rows:
+            _LOG.error("Write-behind dropping %s write for %s: %s",
+                       write.table, write.row.get("user_id"), reason)
+        self._counters["failed"] += self.depth
+        self._memory.clear()
+        self._rows.clear()
+
+    async def _flush_once(self) -> bool:
+        """Flush one batch of due writes; False when nothing was due."""
+        now = time.monotonic()
+
+        memory_batch: List[tuple[str, _MemoryWrite]] = []
+        for user_id, write in list(self._memory.items()):
+            if len(memory_batch) >= self.batch_size:
+                break
+            if write.not_before <= now:
+                memory_batch.append((user_id, self._memory.pop(user_id)))
+
+        row_batch: List[_RowWrite] = []
+        for _ in range(len(self._rows)):
+            if len(row_batch) >= self.batch_size:
+                break
+            write = self._rows.popleft()
+            if write.not_before <= now:
+                row_batch.append(write)
+            else:
+                self._rows.append(write)
+
+        if not memory_batch and not row_batch:
+            return False
+
+        self._last_flush_lag = now - min(
+            [w.since for _, w in memory_batch] + [w.since for w in row_batch]
+        )
+        await asyncio.gather(
+            self._flush_memory(memory_batch),
+            *(self._flush_rows(table, [w for w in row_batch if w.table == table])
+              for table in {w.table for w in row_batch}),
+        )
+        return True
+
+    async def _flush_memory(self, batch: List[tuple[str, _MemoryWrite]]) -> None:
+        if not batch:
+            return
+        try:
+            await upsert_conversation_memories(
+                [{**w.fields, "user_id": uid} for uid, w in batch]
+            )
+            self._counters["flushed"] += len(batch)
+        except asyncio.CancelledError:
+            for user_id, write in batch:           # stop() timed out – keep them for its log
+                self._memory.setdefault(user_id, write)
+            raise
+        except Exception as exc:
+            for user_id, write in batch:
+                if not self._retry(write, exc, MEMORY, user_id):
+                    continue
+                newer = self._memory.pop(user_id, None)
+                if newer is not None:              # keep newer fields on top
+                    write.merge_newer(newer.fields)
+                self._memory[user_id] = write
+
+    async def _flush_rows(self, table: str, writes: List[_RowWrite]) -> None:
+        try:
+            await self._write_rows(table, [w.row for w in writes])
+            self._counters["flushed"] += len(writes)
+        except asyncio.CancelledError:
+            self._rows.extend(writes)
+            raise
+        except Exception as exc:
+            for write in writes:
+                if self._retry(write, exc, table, write.row.get("user_id")):
+                    self._rows.append(write)
+
+    async def _write_rows(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        stored = await _ROW_WRITERS[table](rows)
+        if table != TURNS:
+            return
+        moved = {r["user_id"] for r in stored or [] if r.get("seq") != r.get("requested_seq")}
+        counts: Dict[str, int] = {}
+        for r in stored or []:
+            if r["user_id"] not in moved:
+                counts[r["user_id"]] = max(counts.get(r["user_id"], 0), r["seq"] + 1)
+        for user_id, count in counts.items():
+            for listener in self._stored_listeners:
+                listener(user_id, count)
+        for user_id in moved:
+            self._counters["turn_conflicts"] += 1
+            _LOG.warning("Turn conflict for %s – another writer took the seq, stored at the next one", user_id)
+            for listener in self._conflict_listeners:
+                listener(user_id)
+
+    def _retry(self, write, exc: Exception, table: str, user_id: Optional[str]) -> bool:
+        write.attempts += 1
+        if write.attempts > self.max_retries:
+            self._counters["failed"] += 1
+            _LOG.error("Write-behind giving up on %s write for %s after %s attempts: %s",
+                       table, user_id, write.attempts, exc)
+            return False
+        delay = min(30.0, 0.5 * 2 ** (write.attempts - 1)) * random.uniform(0.5, 1.0)
+        write.not_before = time.monotonic() + delay
+        self._counters["retried"] += 1
+        _LOG.warning("Write-behind retry %s in %.1fs: %s", write.attempts, delay, exc)
+        return True
+
+
+_ROW_WRITERS = {
+    TURNS:          insert_conversation_turns,
+    LEAD_LOG:       insert_lead_logs,
+    QUALIFIED_LEAD: sync_qualified_leads,
+}
+
+# One queue per worker process
+WRITE_BEHIND = WriteBehindQueue()
+
+
+async def queue_conversation_memory(user_id: str, memory: dict) -> None:
+    """Drop-in for upsert_conversation_memory() that returns before the write."""
+    await WRITE_BEHIND.put_memory(user_id, memory)
+
+
+async def queue_conversation_turns(user_id: str, turns: list) -> None:
+    """Drop-in for insert_conversation_turns() that returns before the write."""
+    await WRITE_BEHIND.put_turns(user_id, turns)
+
+
+async def queue_qualified_lead(lead: dict) -> None:
+    """Drop-in for sync_qualified_lead() that returns before the write."""
+    await WRITE_BEHIND.put_qualified_lead(lead)
+
+
+async def queue_lead_log(lead: dict) -> None:
+    """Drop-in for insert_lead_log() that returns before the write."""
+    await WRITE_BEHIND.put_lead_log(lead)
@@ -10,22 +10,21 @@ from __future__ import annotations
 
 import html
 import logging
-from pathlib import Path
 from time import perf_counter
 from typing import Any
 
 from mcp.schema    import Conversation, Result, Skill, Turn
 from services.openai_client_service import async_chat
 from services.bot_response_formatter_md import ensure_markdown
+from services.prompt_registry import PROMPTS
 
 _LOG = logging.getLogger("skill.engagement")
 
-_PROMPT_SYS = Path(__file__).with_name("prompt.md").read_text(encoding="utf-8")
 _FALLBACK   = (
     "👋 Welcome to **Indrasol**! We offer **SecureTrack**, **BizRadar**, and four "
     "security-focused service pillars. Which area interests you today?"
 )
-PROMPT_PATH = Path(__file__).parent.parent / "engagement/engagement_prompt.txt"
+PROMPT = "skills/engagement/engagement_prompt"     # services.prompt_registry
 # --------------------------------------------------------------------------- #
 #  Handler                                                                     #
 # --------------------------------------------------------------------------- #
@@ -33,23 +32,19 @@ async def _handle(turn: Turn, convo: Conversation) -> Result:
     tic = perf_counter()
     _LOG.info("Engagement skill invoked – msg=%r", turn.text[:80])
 
-    sys_prompt = "You are a helpful assistant."
-
-    with open(PROMPT_PATH, "r") as file:
-        prompt_template = file.read()
-
     prompt = (
-        f"{prompt_template}\n\n"
         f"User message: {turn.text}\n\n"
         f"Engagement Agent:"
     )
+    usage: dict = {}
     try:
-        llm_reply = await async_chat(
-            system = sys_prompt,
-            user   = prompt,
-            model  = "gpt-4o-mini",
+        llm_reply, usage = await async_chat(
+            model     = "gpt-4o-mini",
+            messages  = PROMPTS.messages(PROMPT, prompt, persona="You are a helpful assistant."),
             temperature = 0.4,
             max_tokens  = 300,
+            stream      = True,
+            cache       = True,           # greeting depends only on the message
         )
         reply = (llm_reply or "").strip() or _FALLBACK
 
@@ -65,19 +60,9 @@ async def _handle(turn: Turn, convo: Conversation) -> Result:
         routed_skill = "engagement",
         finished     = False,
         latency_ms   = int((perf_counter() - tic) * 1000),
+        meta         = {"openai_usage": usage},
     )
 
-# --------------------------------------------------------------------------- #
-#  Match function                                                              #
-# --------------------------------------------------------------------------- #
-def _match(turn: Turn, convo: Conversation) -> bool:
-    """
-    Trigger only when **this is the very first user turn** in the conversation
-    (i.e., conversation length == 0 before this turn).
-    """
-    return convo.num_user_turns == 0
-
-
 # --------------------------------------------------------------------------- #
 #  Exported Skill object                                                       #
 # --------------------------------------------------------------------------- #
@@ -86,6 +71,5 @@ skill = Skill(
     kind     = "system",
     priority = 50,          # runs before intent / sales / etc.
     timeout  = 20,
-    match    = _match,
-    handle   = _handle,
+    handle   = _handle,     # first user turn only – see manifest triggers
 )
@@ -181,25 +181,6 @@ async def _handle(turn: Turn, convo: Conversation) -> Result:         # noqa: C9
     )
 
 
-# ---------------------------------------------------------------------------- #
-#  Skill.match()                                                               #
-# ---------------------------------------------------------------------------- #
-def _match(turn: Turn, convo: Conversation) -> bool:
-    """
-    Trigger if either:
-      1. We’re **already** collecting info (demo_stage = collecting_info), or
-      2. The current user message explicitly asks to “book a demo / schedule”.
-    """
-    state = convo.state
-    if state.get("demo_stage") == "collecting_info":
-        return True
-
-    txt = turn.text.lower()
-    explicit_kw = ("book demo", "schedule demo", "demo booking",
-                   "book a demo", "schedule a demo")
-    return any(k in txt for k in explicit_kw)
-
-
 # ---------------------------------------------------------------------------- #
 #  Exported Skill object                                                       #
 # ---------------------------------------------------------------------------- #
@@ -208,6 +189,5 @@ skill = Skill(
     kind     = "system",
     priority = 550, 
     timeout  = 30,
-    match    = _match,
-    handle   = _handle,
+    handle   = _handle,     # demo keywords / demo_stage – see manifest triggers
 )
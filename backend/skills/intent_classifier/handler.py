@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-import logging, textwrap
+import logging
 from typing import List
-from pathlib import Path
 
 from mcp.schema          import Skill, Turn, Conversation, Result
 from services.openai_client_service import async_chat
+from services.intent_model import classify_intent
+from services.prompt_registry import PROMPTS
 
 _LOG = logging.getLogger("skill.intent")
 
@@ -18,40 +19,46 @@ INTENTS: List[str] = [
     "Objection",
 ]
 
-SYS_PROMPT = textwrap.dedent(open(__file__.replace("handler.py", "prompt.md")).read())
-PROMPT_PATH = Path(__file__).parent.parent / "intent_classifier/intent_prompt.txt"
-# --------------------------------------------------------------------- #
-#  match() – run once per turn unless intent is already present
-# --------------------------------------------------------------------- #
-def _match(turn: Turn, convo: Conversation) -> bool:
-    return "intent" not in convo.extras
-
-
+PROMPT = "skills/intent_classifier/intent_prompt"     # services.prompt_registry
 # --------------------------------------------------------------------- #
 #  handle() – classifies the turn and stores label in convo.extras
 # --------------------------------------------------------------------- #
 async def _handle(turn: Turn, convo: Conversation) -> Result:
-    try:
+    # local embedding classifier first – no LLM round-trip when confident
+    label = await classify_intent(turn.text, accept=INTENTS)
+    if label:
+        usage = {}
+    else:
+        label, usage = await _llm_label(turn, convo)
 
-        sys_prompt = "You are a helpful assistant."
+    _LOG.info("Intent classifier label: %s", label)
+
+    # ➜ add the label to convo.extras so downstream skills can read it
+    convo.extras["intent"] = label
 
-        with open(PROMPT_PATH, "r") as file:
-            prompt_template = file.read()
-        
+    # Tiny result: nothing to display to user
+    return Result(
+        turn_id      = turn.id,
+        text         = "",             # no visible reply
+        routed_skill = "intent-classifier",
+        finished     = False,
+        meta         = {"intent": label, "openai_usage": usage},
+    )
+
+
+async def _llm_label(turn: Turn, convo: Conversation) -> tuple[str, dict]:
+    try:
         prompt = (
-            f"{prompt_template}\n\n"
             f"User: {turn.text}\n"
             f"History: {convo.state.get('memory_summary', '')}\n→"
         )
 
         label, usage = await async_chat(
             model     = "gpt-4.1",
-            messages  = [
-                {"role": "system", "content": sys_prompt},
-                {"role": "user",   "content": prompt},
-            ],
+            messages  = PROMPTS.messages(PROMPT, prompt, persona="You are a helpful assistant."),
             temperature = 0.5,
             max_tokens  = 10,
+            hedge       = True,      # on the critical path; a backup call is cheap
         )
         label = label.strip()
 
@@ -63,19 +70,7 @@ async def _handle(turn: Turn, convo: Conversation) -> Result:
         _LOG.exception("Intent classifier crashed: %s", exc)
         label, usage = "Cold", {}
 
-    _LOG.info("Intent classifier label: %s", label)
-
-    # ➜ add the label to convo.extras so downstream skills can read it
-    convo.extras["intent"] = label
-
-    # Tiny result: nothing to display to user
-    return Result(
-        turn_id      = turn.id,
-        text         = "",             # no visible reply
-        routed_skill = "intent-classifier",
-        finished     = False,
-        meta         = {"intent": label, "openai_usage": usage},
-    )
+    return label, usage
 
 # --------------------------------------------------------------------- #
 #  Export skill object
@@ -84,6 +79,5 @@ skill = Skill(
     name     = "intent-classifier",
     kind     = "utility",
     priority = 150,
-    match    = _match,
-    handle   = _handle,
+    handle   = _handle,     # once per turn unless intent is present – manifest triggers
 )
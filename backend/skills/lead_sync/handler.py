@@ -134,20 +134,13 @@ async def _handle(turn: Turn, convo: Conversation) -> Result:
     )
 
 
-def _match(turn: Turn, convo: Conversation) -> bool:
-    """
-    Claim the turn ONLY if another component explicitly set
-    extra.select_skill == "lead_sync".  Prevents accidental routing.
-    """
-    return convo.extras.get("select_skill") == "lead_sync"
-
-
-# Exported Skill object – dispatcher picks it up automatically
+# Exported Skill object – dispatcher picks it up automatically, but the
+# manifest only lets it claim a turn when another component explicitly set
+# extras.select_skill == "lead_sync" (prevents accidental routing).
 skill = Skill(
     name     = "lead_sync",
     kind     = "helper",
     priority = 900,
     timeout  = 10,
-    match    = _match,
     handle   = _handle,
 )
@@ -19,9 +19,9 @@ from time import perf_counter
 from typing import Any, Dict, Optional
 
 from mcp.schema import Conversation, Result, Skill, Turn
-from services.supabase_service import (
-    get_conversation_memory, upsert_conversation_memory
-)
+from services.supabase_service import get_conversation_memory
+from services.write_behind import queue_conversation_memory
+from services.conversation_snapshot import ConversationSnapshot
 
 _LOG = logging.getLogger("skill.memory")
 
@@ -34,13 +34,20 @@ async def _read_write(user_id: str,
     Reads current memory, optionally merges `patch`, persists, and
     returns the (possibly updated) row.
     """
-    current = await get_conversation_memory(user_id) or {}
+    snapshot = ConversationSnapshot.current(user_id)
+    if snapshot is not None:
+        current = dict(await snapshot.row() or {})
+    else:
+        current = await get_conversation_memory(user_id) or {}
     _LOG.debug("Fetched memory for %s → %s", user_id, current)
 
     if patch:
         merged = {**current, **patch}
-        await upsert_conversation_memory(user_id=user_id, memory=merged)
-        _LOG.info("Upserted memory for %s → %s", user_id, merged)
+        # only the patch is queued – it coalesces with the turn's other writes
+        await queue_conversation_memory(user_id=user_id, memory=dict(patch))
+        _LOG.info("Queued memory for %s → %s", user_id, merged)
+        if snapshot is not None:
+            snapshot.update(patch)
         current = merged
 
     return current
@@ -99,22 +106,12 @@ async def _handle(turn: Turn, convo: Conversation) -> Result:
     )
 
 
-def _match(turn: Turn, convo: Conversation) -> bool:
-    """
-    Only claim the turn if it *explicitly* looks like a memory request.
-    Keeps the skill out of normal routing.
-    """
-    return turn.text.strip().lower() in {
-        "show memory", "what do you know about me", "show context"
-    }
-
-
-# Exported Skill object (dispatcher will ignore unless _match() == True)
+# Exported Skill object (dispatcher ignores it unless an exact manifest
+# phrase such as "show memory" is typed – keeps it out of normal routing)
 skill = Skill(
     name     = "memory",
     kind     = "helper",
     priority = 900,     # very low priority
     timeout  = 8,
-    match    = _match,
     handle   = _handle,
 )
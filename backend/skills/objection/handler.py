@@ -7,63 +7,55 @@ Problem → Value → Proof → CTA mini-framework.
 from __future__ import annotations
 
 import logging
-from pathlib import Path
 from time import perf_counter
 from typing import Any, List
 
 from mcp.schema   import Skill, Turn, Conversation, Result
 from services.openai_client_service import async_chat
+from services.prompt_registry import PROMPTS
+from services.token_budget import pack
 
-_LOG         = logging.getLogger("skill.objection")
-_PROMPT_TMPL = Path(__file__).with_name("prompt.md").read_text()
+_LOG = logging.getLogger("skill.objection")
 
 FALLBACK = (
     "I understand your hesitation. Most clients felt the same until they saw "
     "how **Indrasol** cut audit prep by **76 %**. Would a brief call help?"
 )
-PROMPT_PATH = Path(__file__).parent.parent / "objection/objection_prompt.txt"
-# ---------------------------------------------------------------------------#
-#  helper – construct system prompt
-# ---------------------------------------------------------------------------#
-def _mk_system_prompt(rag: List[str], summary: str) -> str:
-    rag_block     = "\n".join(f"• {c.strip()}" for c in rag).strip()
-    summary_block = summary.strip()
-    return (
-        f"{_PROMPT_TMPL}\n\n"
-        f"---\n"
-        f"## RAG context\n{rag_block}\n\n"
-        f"## Conversation so far\n{summary_block}"
-    )
-
+PROMPT = "skills/objection/objection_prompt"     # services.prompt_registry
 # ---------------------------------------------------------------------------#
 #  Skill.handle()
 # ---------------------------------------------------------------------------#
 async def _handle(turn: Turn, convo: Conversation) -> Result:
     tic = perf_counter()
 
-    rag_chunks      = convo.state.get("rag_context", [])
-    memory_summary  = convo.state.get("memory_summary", "")
-    sys_prompt      = _mk_system_prompt(rag_chunks, memory_summary)
-    sys_prompt = "You are a helpful assistant."
-
-    with open(PROMPT_PATH, "r") as file:
-        prompt_template = file.read()
-
+    rag_chunks      = convo.extras.get("rag_chunks") or convo.state.get("rag_context", [])
+    rag_scores      = convo.extras.get("rag_scores") or []
+    memory_summary  = convo.extras.get("summary") or convo.state.get("memory_summary", "")
+    sys_prompt      = "You are a helpful assistant."    # template: prompt registry
+
+    packed = pack(
+        "objection", model="gpt-4.1",
+        instructions = PROMPTS.system(PROMPT, sys_prompt),
+        context      = ([{"text": c, "score": s} for c, s in zip(rag_chunks, rag_scores)]
+                        if rag_scores else rag_chunks),
+        history      = memory_summary,
+        user         = turn.text,
+    )
     prompt = (
-        f"{prompt_template}\n\n"
-        f"User Objection: {turn.text}\n\n"
-        f"Context (if needed):\n{rag_chunks}\n\n"
-        f"Chat History (if needed):\n{memory_summary}\n\n"
+        f"User Objection: {packed.user}\n\n"
+        f"Context (if needed):\n{packed.context_text()}\n\n"
+        f"Chat History (if needed):\n{packed.history_text()}\n\n"
         f"Your Response:"
     )
 
+    usage: dict = {}
     try:
-        reply = await async_chat(
-            system=sys_prompt,
-            user  = prompt,
-            model = "gpt-4.1",
-            temp  = 0.4,
-            tokens= 280,
+        reply, usage = await async_chat(
+            model     = "gpt-4.1",
+            messages  = PROMPTS.messages(PROMPT, prompt, persona=sys_prompt),
+            temperature = 0.4,
+            max_tokens  = 280,
+            stream      = True,
         )
         if not reply:
             reply = FALLBACK
@@ -79,6 +71,7 @@ async def _handle(turn: Turn, convo: Conversation) -> Result:
         routed_skill = "objection",
         finished     = False,
         latency_ms   = latency,
+        meta         = {"openai_usage": usage, "prompt_budget": packed.breakdown()},
     )
 
 # ---------------------------------------------------------------------------#
@@ -86,18 +79,13 @@ async def _handle(turn: Turn, convo: Conversation) -> Result:
 # ---------------------------------------------------------------------------#
 def _match(turn: Turn, convo: Conversation) -> bool:
     """
-    Light heuristic: if the *previous* bot message invited a demo / CTA **and**
-    the current user message contains negative sentiment or a classic objection
-    keyword, let this skill handle it.
+    Escape hatch next to the manifest triggers (classic objection keywords):
+    a bare "no" / "not now" counts only if the *previous* bot message
+    invited a demo / CTA.
     """
     txt = turn.text.lower()
 
-    objection_kw = ("too expensive", "price", "budget", "already have",
-                    "not sure", "later", "need approval", "compare", "risk")
-    if any(k in txt for k in objection_kw):
-        return True
-
-    # also trigger if user says "no", "maybe later", etc. right after a CTA
+    # trigger if user says "no", "maybe later", etc. right after a CTA
     if txt in {"no", "not now", "maybe later"}:
         prev_bot = convo.latest_bot_message().lower()
         if any(k in prev_bot for k in ("demo", "schedule", "call")):
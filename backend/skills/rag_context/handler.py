@@ -6,16 +6,17 @@ from mcp.schema import Skill, Turn, Conversation, Result
 _LOG = logging.getLogger("skill.rag_context")
 
 
-def _needs_context(turn: Turn) -> bool:            # very lightweight filter
-    return len(turn.text.split()) > 2              # ignore “yes”, “hi”, …
-
 async def _handle(turn: Turn, convo: Conversation) -> Result:
     filters = {}
     website = await query_pinecone(turn.text, namespace="website", filters=filters)
     matches = website or await query_pinecone(turn.text, namespace="sales", filters=filters)
 
     chunks  = [m["text"] for m in matches]
-    meta    = {"rag_chunks": chunks[:6]}           # keep it small
+    meta    = {
+        "rag_chunks": chunks[:6],                  # keep it small
+        "rag_ids":    [m["id"] for m in matches][:6],
+        "rag_scores": [m["score"] for m in matches][:6],   # token_budget packs best first
+    }
 
     _LOG.info("RAG found %s chunks", len(chunks))
 
@@ -31,6 +32,5 @@ skill = Skill(
     name     = "rag-context",
     kind     = "utility",
     priority = 180,
-    match    = lambda t, c: _needs_context(t),
-    handle   = _handle
+    handle   = _handle,    # 3+ words only (ignore “yes”, “hi”, …) – manifest triggers
 )
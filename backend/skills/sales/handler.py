@@ -6,32 +6,27 @@ Problem → Value → Proof → CTA replies.
 from __future__ import annotations
 
 import logging, textwrap
-from pathlib import Path
 from typing  import List
 
 from mcp.schema import Skill, Turn, Conversation, Result
 from services.openai_client_service import async_chat
+from services.prompt_registry import PROMPTS
+from services.semantic_cache import RESPONSE_CACHE
+from services.token_budget import pack
 
 _LOG = logging.getLogger("skill.sales")
 
-PROMPT_TMPL = Path(__file__).with_name("prompt.md").read_text()
 FALLBACK    = (
     "Indrasol can definitely help. Would you like a quick demo "
     "or a call with an expert?"
 )
 
-PROMPT_PATH = Path(__file__).parent.parent / "sales/sales_prompt.txt"
-
-# ------------------------------------------------------------------ #
-#  match(): fire only when intent was classified as “Interested …”
-# ------------------------------------------------------------------ #
-def _match(turn: Turn, convo: Conversation) -> bool:
-    return convo.extras.get("intent") in {
-        "Interested in Product",
-        "Interested in Services",
-        "Ready to engage",
-        "Info Request"
-    }
+PROMPT = "skills/sales/sales_prompt"          # services.prompt_registry
+SYSTEM_PROMPT = textwrap.dedent("""
+    You are Indrasol’s senior sales engineer.
+    Write in a clear, friendly B2B tone (2-3 short paragraphs max).
+    Always finish with ONE call-to-action sentence.
+    """).strip()
 
 # ------------------------------------------------------------------ #
 #  handle(): build system-prompt ➜ call OpenAI ➜ return Result
@@ -39,35 +34,47 @@ def _match(turn: Turn, convo: Conversation) -> bool:
 async def _handle(turn: Turn, convo: Conversation) -> Result:
     rag  : List[str] = convo.extras.get("rag_chunks", [])
     summ : str       = convo.extras.get("summary", "")
+    scores = convo.extras.get("rag_scores") or []
 
-    rag_block   = "\n".join(f"• {c}" for c in rag) if rag else "—"
-    # sys_prompt  = textwrap.dedent(f"""{PROMPT_TMPL}
-    SYSTEM_PROMPT = """
-        You are Indrasol’s senior sales engineer.
-        Write in a clear, friendly B2B tone (2-3 short paragraphs max).
-        Always finish with ONE call-to-action sentence.
-        """.strip()
-
-    with open(PROMPT_PATH, "r") as file:
-        prompt_template = file.read()
-    
+    # best chunks / latest summary lines that fit the "sales" token budget
+    packed = pack(
+        "sales", model="gpt-4.1",
+        instructions = PROMPTS.system(PROMPT, SYSTEM_PROMPT),
+        context      = [{"text": c, "score": s} for c, s in zip(rag, scores)] if scores else rag,
+        history      = summ,
+        user         = turn.text,
+    )
+    rag_block   = "\n".join(f"• {c}" for c in packed.context) if packed.context else "—"
+    # persona + template are the static system message; per-turn text last
     prompt = (
-        f"{prompt_template}\n\n"
-        f"user_message: {turn.text}\n\n"
+        f"user_message: {packed.user}\n\n"
         f"rag_context:\n{rag_block}\n\n"
-        f"memory_summary:\n{summ}\n\n"
+        f"memory_summary:\n{packed.history_text()}\n\n"
     )
 
-    try:
+    usage: dict = {}
+
+    async def _generate() -> str:
+        nonlocal usage
         reply, usage = await async_chat(
             model     = "gpt-4.1",
-            messages  = [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user",   "content": prompt},
-            ],
+            messages  = PROMPTS.messages(PROMPT, prompt, persona=SYSTEM_PROMPT),
             temperature = 0.2,
             max_tokens  = 350,
+            stream      = True,
         )
+        return reply
+
+    # near-identical question over the same chunks and summary → reuse the answer
+    rag_ids = convo.extras.get("rag_ids", [])
+    try:
+        if rag_ids:
+            reply = await RESPONSE_CACHE.answer(
+                "sales-skill", turn.text, [{"id": i} for i in rag_ids], _generate,
+                vary=summ,
+            )
+        else:
+            reply = await _generate()
     except Exception as exc:                      # noqa: BLE001
         _LOG.exception("OpenAI failed: %s", exc)
         reply, usage = FALLBACK, {}
@@ -80,7 +87,7 @@ async def _handle(turn: Turn, convo: Conversation) -> Result:
         text         = reply.strip(),
         routed_skill = "sales",
         finished     = True,  
-        meta         = {"openai_usage": usage},
+        meta         = {"openai_usage": usage, "prompt_budget": packed.breakdown()},
     )
 
 # ------------------------------------------------------------------ #
@@ -88,6 +95,5 @@ skill = Skill(
     name     = "sales",
     kind     = "domain",
     priority = 500,        # runs after utility skills
-    match    = _match,
-    handle   = _handle,
+    handle   = _handle,    # “Interested …” intents only – see manifest triggers
 )
@@ -48,6 +48,5 @@ skill = Skill(
     name     = "summariser",
     kind     = "utility",
     priority = 190,
-    match    = lambda t, c: True,    # always eligible, _handle decides to skip
-    handle   = _handle
+    handle   = _handle,     # always eligible (manifest), _handle decides to skip
 )